@@ -4,19 +4,23 @@ indicators = {
     "dollar": ["dollar", "美元", "美金"],
     "gold": ["gold", "黄金", "元宝"]
 }
+all_values = []
+lan_map = {}
 
 
-def detect(text: str):
-    all_values = []
+def setup():
     for values in indicators.values():
-        all_values += values
-    rst = KeyWordEntity.recognize(text, all_values)
-    lan_map = {
+        all_values.extend(values)
+    lan_map.update({
         "美元": "dollar",
         "黄金": "gold",
         "dollar": "dollar",
         "gold": "gold"
-    }
+    })
+
+
+def detect(text: str):
+    rst = KeyWordEntity.recognize(text, all_values)
     if len(rst) == 2:
         return lan_map[rst[1]]
     return None
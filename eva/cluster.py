@@ -0,0 +1,498 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import gc
+import itertools
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing.connection import Connection
+from multiprocessing.reduction import recv_handle, send_handle
+
+import jieba
+
+from eva import robot as eva_robot
+from eva.robot import EvaRobot
+from eva.serving import ProcessStats, error_response, predict_response
+from evadm.ring import HashRing
+from evadm.robot import DMRobot
+from evanlu.robot import NLURobot
+
+log = logging.getLogger(__name__)
+# requests of current process, reset in forked workers.
+process_stats = ProcessStats()
+
+
+class WorkerError(Exception):
+    """ Raised when a request failed in the worker.  """
+    pass
+
+
+def process_question(data):
+    start = time.time()
+    with EvaRobot(data["robot_id"], data["project"],
+                  data["project"]) as robot:
+        rst = predict_response(robot.process_question(data["question"]))
+    process_stats.observe(time.time() - start)
+    return rst
+
+
+def process_questions(data):
+    """ Process a batch of valid requests, see `eva.robot.process_questions`.
+
+    Returns
+    -------
+    [dict], response of each request, failed ones with error code 500.
+
+    """
+    rst = []
+    for ret in eva_robot.process_questions(data):
+        if not isinstance(ret, Exception):
+            try:
+                rst.append(predict_response(ret))
+                continue
+            except Exception as e:
+                ret = e
+        log.error("PREDICT_ERROR", exc_info=ret)
+        rst.append(error_response(500, "{0}: {1}".format(
+            ret.__class__.__name__, ret)))
+    return rst
+
+
+def train(data):
+    with EvaRobot(data["robot_id"], data["project"],
+                  data["project"]) as robot:
+        robot.train()
+
+
+def release(name, nodes):
+    """ Release robots belonging to other workers in the ring of `nodes`. """
+    ring = HashRing(nodes)
+    return DMRobot.release_robots(lambda robotid: ring.node(robotid) == name)
+
+
+def adopt(name, states):
+    for robotid, state in states.items():
+        try:
+            DMRobot.adopt_robot(robotid, state)
+        except KeyError:
+            log.warning("ADOPT ROBOT FAILED: [{0}]".format(robotid),
+                        exc_info=True)
+
+
+def stats(name):
+    rst = process_stats.stats()
+    rst.update({
+        "name": name,
+        "robots": DMRobot.stats()
+    })
+    return rst
+
+
+def preload(domains):
+    """ Load domains in the master before workers are forked.
+
+    NLU robots with their models, custom words of jieba and compiled
+    `BizTree` of the domains are loaded once, and shared copy-on-write by
+    all workers instead of being loaded by each worker on it's first
+    request.  Loaded objects are frozen out of garbage collection, so
+    collections in workers don't write to their pages.
+
+    Parameters
+    ----------
+    domains : [str], domain ids.
+
+    Returns
+    -------
+    {domain_id: seconds}, loading time of domains, failed ones are skipped.
+
+    """
+    loaded = {}
+    jieba.initialize()
+    for domain_id in domains:
+        start = time.time()
+        try:
+            NLURobot.preload(domain_id)
+            DMRobot.preload(domain_id)
+        except Exception:
+            log.exception("PRELOAD_ERROR {0}".format(domain_id))
+            continue
+        loaded[domain_id] = time.time() - start
+        log.info("PRELOAD DOMAIN: {0} in {1:.3f}s".format(
+            domain_id, loaded[domain_id]))
+    gc.collect()
+    if hasattr(gc, "freeze"):
+        gc.freeze()
+    return loaded
+
+
+class LocalBackend(object):
+    """ Process requests in current process.  """
+    def process_question(self, data):
+        return process_question(data)
+
+    def process_questions(self, data):
+        return process_questions(data)
+
+    def train(self, data):
+        return train(data)
+
+    def stats(self):
+        return [stats("local")]
+
+
+class WorkerHandle(object):
+    """ A worker process and the pipe to it.
+
+    Requests are pipelined, responses are dispatched to their futures by a
+    reader thread.
+    """
+    def __init__(self, name, template):
+        """
+        Parameters
+        ----------
+        name : str
+        template : WorkerTemplate, forking the worker.
+
+        Raises
+        ------
+        WorkerError, the template exited.
+
+        """
+        self.name = name
+        self._ids = itertools.count()
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._conn, child_conn = multiprocessing.Pipe()
+        try:
+            self.pid = template.fork(name, child_conn)
+        finally:
+            child_conn.close()
+        self._reader = None
+
+    def listen(self):
+        """ Start the thread reading responses.  """
+        self._reader = threading.Thread(target=self._read,
+                                        name="Reader-" + self.name)
+        self._reader.daemon = True
+        self._reader.start()
+        return self
+
+    def send(self, method, *args):
+        """ Send a request.
+
+        Returns
+        -------
+        concurrent.futures.Future.
+
+        """
+        future = Future()
+        with self._lock:
+            request_id = next(self._ids)
+            self._futures[request_id] = future
+            try:
+                self._conn.send((request_id, method, args))
+            except (OSError, ValueError) as e:
+                del self._futures[request_id]
+                future.set_exception(WorkerError("{0}: {1}".format(
+                    self.name, e)))
+        return future
+
+    def call(self, method, *args):
+        return self.send(method, *args).result()
+
+    def _read(self):
+        while True:
+            try:
+                request_id, ok, result = self._conn.recv()
+            except (EOFError, OSError):
+                break
+            with self._lock:
+                future = self._futures.pop(request_id)
+            if ok:
+                future.set_result(result)
+            else:
+                future.set_exception(WorkerError(result))
+        with self._lock:
+            futures, self._futures = self._futures, {}
+        for future in futures.values():
+            future.set_exception(WorkerError("{0} exited".format(self.name)))
+
+    @property
+    def alive(self):
+        """ If the worker is running, the reader stops when it exits.  """
+        return self._reader is not None and self._reader.is_alive()
+
+    def stop(self):
+        try:
+            self.call("stop")
+        except WorkerError:
+            pass
+        if self._reader is not None:
+            self._reader.join(5)
+        self._conn.close()
+
+
+class WorkerTemplate(object):
+    """ A single threaded process forking workers.
+
+    The server runs many threads once started, a process forked from it
+    may inherit a lock held by another thread and deadlock.  The template
+    is forked before any thread is started, after domains are preloaded,
+    and forks all workers including restarted ones, so workers are forked
+    from a single threaded process and share the preloaded objects.
+    """
+    def __init__(self, handlers):
+        context = multiprocessing.get_context("fork")
+        self._conn, child_conn = context.Pipe()
+        self.process = context.Process(target=template_main,
+                                       args=(child_conn, handlers),
+                                       name="WorkerTemplate", daemon=True)
+        self.process.start()
+        child_conn.close()
+        self._lock = threading.Lock()
+
+    def fork(self, name, conn):
+        """ Fork a worker processing requests from `conn`.
+
+        Returns
+        -------
+        int, pid of the worker.
+
+        Raises
+        ------
+        WorkerError, the template exited.
+
+        """
+        with self._lock:
+            try:
+                self._conn.send(name)
+                send_handle(self._conn, conn.fileno(), self.process.pid)
+                return self._conn.recv()
+            except (EOFError, OSError) as e:
+                raise WorkerError("WorkerTemplate: {0}".format(e))
+
+    def stop(self):
+        self._conn.close()
+        self.process.join(5)
+
+
+def template_main(conn, handlers):
+    # workers are not waited by the template.
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+    while True:
+        try:
+            name = conn.recv()
+            fd = recv_handle(conn)
+        except (EOFError, OSError):
+            break
+        pid = os.fork()
+        if pid == 0:
+            conn.close()
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            code = 0
+            try:
+                worker_main(name, Connection(fd), handlers)
+            except BaseException:
+                log.exception("WORKER_EXIT {0}".format(name))
+                code = 1
+            finally:
+                os._exit(code)
+        os.close(fd)
+        conn.send(pid)
+
+
+def worker_main(name, conn, handlers):
+    global process_stats
+    log.info("START WORKER: {0} pid {1}".format(name, os.getpid()))
+    process_stats = ProcessStats()
+    if len(NLURobot.robots):
+        # watcher thread of preloaded robots is not forked.
+        NLURobot.watcher.start()
+    while True:
+        try:
+            request_id, method, args = conn.recv()
+        except (EOFError, OSError):
+            break
+        if method == "stop":
+            conn.send((request_id, True, None))
+            break
+        try:
+            result = handlers[method](name, *args)
+        except Exception as e:
+            log.exception("WORKER_ERROR {0} {1}".format(name, method))
+            conn.send((request_id, False, "{0}: {1}".format(
+                e.__class__.__name__, e)))
+        else:
+            conn.send((request_id, True, result))
+    log.info("STOP WORKER: {0}".format(name))
+
+
+class Supervisor(object):
+    """ Fork worker processes and route robots to them.
+
+    Each `robot_id` belongs to one worker by consistent hashing, so
+    dialogue status of a robot stays in the worker's `DMRobot.robots_pool`.
+    When workers are added or removed, robots moving to another worker are
+    released with their dialogue status and adopted by the new owner.
+    Crashed workers are restarted, their robots are restored from the state
+    store if they were spilled.  Workers are forked by a `WorkerTemplate`
+    forked in `start`.
+
+    Attributes
+    ----------
+    HANDLERS : dict, `{method: handler(worker name, *args)}` of workers.
+    """
+    HANDLERS = {
+        "process_question": lambda name, data: process_question(data),
+        "process_questions": lambda name, data: process_questions(data),
+        "train": lambda name, data: train(data),
+        "release": release,
+        "adopt": adopt,
+        "stats": stats
+    }
+
+    def __init__(self, workers=None, handlers=None):
+        """
+        Parameters
+        ----------
+        workers : int, number of workers, number of cores if `None`.
+        handlers : dict, see `HANDLERS`.
+        """
+        self.size = os.cpu_count() if workers is None else workers
+        self._handlers = self.HANDLERS if handlers is None else handlers
+        self._ring = HashRing()
+        self._workers = {}
+        self._names = itertools.count()
+        self._lock = threading.RLock()
+        self._stopping = False
+        self._template = None
+
+    def start(self):
+        """ Fork the template and workers, invoked before threads are
+        started.
+        """
+        with self._lock:
+            if self._template is None:
+                self._template = WorkerTemplate(self._handlers)
+            for _ in range(self.size - len(self._workers)):
+                name = "worker-{0}".format(next(self._names))
+                self._workers[name] = WorkerHandle(
+                    name, self._template).listen()
+                self._ring.add(name)
+
+    def add_worker(self):
+        """ Fork a worker and move robots belonging to it.  """
+        with self._lock:
+            name = "worker-{0}".format(next(self._names))
+            self._workers[name] = WorkerHandle(name, self._template).listen()
+            self._ring.add(name)
+            self._rebalance()
+            return name
+
+    def remove_worker(self, name):
+        """ Move robots of the worker to others and stop it.  """
+        with self._lock:
+            self._ring.remove(name)
+            self._rebalance()
+            self._workers.pop(name).stop()
+
+    def _rebalance(self):
+        nodes = self._ring.nodes
+        released = [worker.send("release", nodes)
+                    for worker in self._workers.values()]
+        adopted = {}
+        for future in released:
+            for robotid, state in future.result().items():
+                adopted.setdefault(self._ring.node(robotid),
+                                   {})[robotid] = state
+        for name, states in adopted.items():
+            self._workers[name].call("adopt", states)
+        log.info("REBALANCE: {0} robots moved, workers {1}".format(
+            sum([len(c) for c in adopted.values()]), nodes))
+
+    def call(self, robot_id, method, *args):
+        """ Process a request in the worker of the robot.
+
+        Raises
+        ------
+        WorkerError.
+
+        """
+        with self._lock:
+            worker = self._worker(self._ring.node(robot_id))
+            # sent in order with rebalancing.
+            future = worker.send(method, *args)
+        return future.result()
+
+    def _worker(self, name):
+        """ Return the worker, restarted if it's dead.  """
+        worker = self._workers[name]
+        if not worker.alive and not self._stopping:
+            log.warning("RESTART WORKER: {0}".format(name))
+            worker = self._workers[name] = WorkerHandle(
+                name, self._template).listen()
+        return worker
+
+    def process_question(self, data):
+        return self.call(data["robot_id"], "process_question", data)
+
+    def process_questions(self, data):
+        """ Process a batch of requests in workers of their robots in
+        parallel.
+
+        Returns
+        -------
+        [dict], response of each request in order, see
+        `process_questions`.
+
+        """
+        with self._lock:
+            batches = {}  # {worker name: [request indexes]}
+            for i, request in enumerate(data):
+                batches.setdefault(self._ring.node(request["robot_id"]),
+                                   []).append(i)
+            futures = []
+            for name, indexes in batches.items():
+                try:
+                    future = self._worker(name).send(
+                        "process_questions", [data[i] for i in indexes])
+                except WorkerError as e:
+                    future = Future()
+                    future.set_exception(e)
+                futures.append((indexes, future))
+        rst = [None] * len(data)
+        for indexes, future in futures:
+            try:
+                responses = future.result()
+            except WorkerError as e:
+                responses = [error_response(500, str(e))] * len(indexes)
+            for i, response in zip(indexes, responses):
+                rst[i] = response
+        return rst
+
+    def train(self, data):
+        return self.call(data["robot_id"], "train", data)
+
+    def stats(self):
+        with self._lock:
+            futures = [self._worker(name).send("stats")
+                       for name in list(self._workers)]
+        return [future.result() for future in futures]
+
+    def stop(self):
+        with self._lock:
+            self._stopping = True
+            for worker in self._workers.values():
+                worker.stop()
+            self._workers.clear()
+            if self._template is not None:
+                self._template.stop()
+                self._template = None
+
+
+__all__ = ["WorkerError", "LocalBackend", "WorkerTemplate", "Supervisor",
+           "process_question", "process_questions", "train", "preload"]
@@ -10,6 +10,8 @@ class _ConfigApp:
     _host = "127.0.0.1"
     _port = 9999
     _debug = "True"
+    _workers = 0  # DM worker processes, 0 to process in the server
+    _preload_domains = ""  # comma separated, loaded before forking workers
 
     @staticmethod
     def init_app(app):
@@ -30,6 +32,17 @@ class _ConfigApp:
         debug = os.environ.get("DEBUG")
         return debug if debug is not None else self._debug
 
+    @property
+    def workers(self):
+        workers = os.environ.get("DM_WORKERS")
+        return workers if workers is not None else self._workers
+
+    @property
+    def preload_domains(self):
+        domains = os.environ.get("PRELOAD_DOMAINS")
+        domains = domains if domains is not None else self._preload_domains
+        return [c.strip() for c in domains.split(",") if c.strip()]
+
 
 class _ConfigLog(object):
     _log_level = 'DEBUG'
@@ -8,6 +8,7 @@ from py2neo import Graph
 from evashare.log import init_logger
 from eva.config import ConfigApp, ConfigLog
 from eva.robot import EvaRobot
+from eva.serving import predict_response
 
 
 app = Flask(__name__)
@@ -19,26 +20,11 @@ log = logging.getLogger(__name__)
 @app.route("/nlu/predict/", methods=["GET", "POST"])
 def predict():
     data = json.loads(request.data)
-    robot = EvaRobot(data["robot_id"],
-                     data["project"],
-                     data["project"])
-    rst = robot.process_question(data["question"])
-    # hack code
-    if rst["response_id"] == "search_event":
-        rst["nlu"]["slots"]["country"] = rst["nlu"]["slots"]["event_country"]
-        del rst["nlu"]["slots"]["event_country"]
-    target = {
-        'code': 0,
-        'result': {
-            'event_id': rst["response_id"],
-            'arguments': rst['nlu']["slots"],
-            'sid': 0
-        }
-    }
-    if rst["response_id"] == "service":
-        target["result"]["speak"] = "您好，有什么我可以帮你的？"
-    if rst["response_id"] == "correlation_analysis_without_time":
-        target["result"]["speak"] = "您好，请问您想分析的是哪个时间段？"
+    with EvaRobot(data["robot_id"],
+                  data["project"],
+                  data["project"]) as robot:
+        rst = robot.process_question(data["question"])
+    target = predict_response(rst)
     return jsonify(target)
 
 
@@ -101,10 +87,10 @@ def show_graph():
 @app.route("/nlu/train/", methods=["GET", "POST"])
 def train():
     data = json.loads(request.data)
-    robot = EvaRobot(data["robot_id"],
-                     data["project"],
-                     data["project"])
-    robot.train()
+    with EvaRobot(data["robot_id"],
+                  data["project"],
+                  data["project"]) as robot:
+        robot.train()
     return jsonify({"code": 0})
 
 
@@ -1,16 +1,37 @@
+from collections import OrderedDict, deque
+
 from evadm.robot import DMRobot
 from evanlu.robot import NLURobot
 
 
 class EvaRobot(object):
+    """ DM and NLU robots of a device, the DM robot is kept in the pool
+    until `close`, used as `with EvaRobot(...) as robot`.
+    """
     def __init__(self, robot_id, domain_id, domain_name):
-        self._dm_robot = DMRobot.get_robot(robot_id, domain_id, domain_name)
         self._nlu_robot = NLURobot.get_robot(domain_id)
+        self._dm_robot = DMRobot.get_robot(robot_id, domain_id, domain_name,
+                                           pin=True)
+
+    def close(self):
+        self._dm_robot.unpin()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
 
     def process_question(self, question):
         question = question.strip(' \n')
-        context = self._dm_robot.get_context()
-        ret = self._nlu_robot.predict(context, question)
+        ret = self._nlu_robot.predict(self.get_context(), question)
+        return self.respond(ret)
+
+    def get_context(self):
+        return self._dm_robot.get_context()
+
+    def respond(self, ret):
+        """ Process NLU result of a question by DM.  """
         ret = self._dm_robot.process_request(ret["intent"],
                                              ret["entities"],
                                              ret["target_entities"],
@@ -20,3 +41,69 @@ class EvaRobot(object):
 
     def train(self):
         self._nlu_robot.train()
+
+
+def process_questions(requests):
+    """ Process questions of many robots and domains.
+
+    Questions are processed in rounds, each round takes the next question of
+    every robot, so questions of a robot are processed in order.  In a
+    round, questions of a domain are predicted by one
+    `NLURobot.predict_many` call, with the same snapshot.
+
+    Parameters
+    ----------
+    requests : [dict], `{"robot_id": str, "project": str, "question": str}`
+
+    Returns
+    -------
+    [dict or Exception], result of `EvaRobot.process_question` of each
+    request, or the exception raised by it.
+
+    """
+    results = [None] * len(requests)
+    queues = OrderedDict()  # {robot_id: deque of request indexes}
+    for i, request in enumerate(requests):
+        queues.setdefault(request["robot_id"], deque()).append(i)
+    while queues:
+        robots = []
+        try:
+            _process_round(requests, queues, results, robots)
+        finally:
+            for robot in robots:
+                robot.close()
+    return results
+
+
+def _process_round(requests, queues, results, robots):
+    """ Process the next question of every robot in `queues`, robots used
+    are appended to `robots` to be closed.
+    """
+    domains = OrderedDict()  # {domain_id: [(index, robot, context)]}
+    for robot_id in list(queues):
+        i = queues[robot_id].popleft()
+        if not queues[robot_id]:
+            del queues[robot_id]
+        domain_id = requests[i]["project"]
+        try:
+            robot = EvaRobot(robot_id, domain_id, domain_id)
+            robots.append(robot)
+            context = robot.get_context()
+        except Exception as e:
+            results[i] = e
+            continue
+        domains.setdefault(domain_id, []).append((i, robot, context))
+    for domain_id, items in domains.items():
+        try:
+            predicted = NLURobot.get_robot(domain_id).predict_many(
+                [(context, requests[i]["question"].strip(' \n'))
+                 for i, _, context in items])
+        except Exception as e:
+            for i, _, _ in items:
+                results[i] = e
+            continue
+        for (i, robot, _), ret in zip(items, predicted):
+            try:
+                results[i] = robot.respond(ret)
+            except Exception as e:
+                results[i] = e
@@ -0,0 +1,313 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import asyncio
+import bisect
+import contextlib
+import logging
+import os
+import resource
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+log = logging.getLogger(__name__)
+
+
+class Overloaded(Exception):
+    """ Raised when too many requests are waiting.  """
+    pass
+
+
+class LatencyHistogram(object):
+    """ Histogram of request latency.
+
+    Attributes
+    ----------
+    BUCKETS : [float], Upper bounds of buckets in seconds, the last bucket
+        is unbounded.
+    count : int
+    total : float, Seconds of all requests.
+    max : float
+    """
+    BUCKETS = [0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0,
+               2.0, 5.0]
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+
+    def quantile(self, q):
+        """ Return upper bound of the bucket containing quantile `q`,
+        `None` if the quantile is in the unbounded bucket.
+        """
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return None
+
+    def stats(self):
+        """ Return the histogram.
+
+        Returns
+        -------
+        {
+            "count": int,
+            "avg": float,  // seconds
+            "max": float,
+            "p50": float,  // upper bound of bucket
+            "p99": float,
+            "buckets": [[upper bound, count]]  // cumulative
+        }
+
+        """
+        cumulative = []
+        seen = 0
+        for bound, count in zip(self.buckets + ["+Inf"], self.counts):
+            seen += count
+            cumulative.append([bound, seen])
+        return {
+            "count": self.count,
+            "avg": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+            "buckets": cumulative
+        }
+
+
+class KeyedExecutor(object):
+    """ Run blocking functions on a bounded thread pool from the event loop,
+    functions of the same key never run concurrently.
+
+    Requests are rejected by `Overloaded` instead of queued without limit,
+    when `max_pending` requests are waiting or running, or `max_key_pending`
+    requests of the key.  It must be used in one event loop.
+
+    Attributes
+    ----------
+    WORKERS : int, Default number of threads.
+    MAX_PENDING : int, Default maximum number of pending requests.
+    MAX_KEY_PENDING : int, Default maximum number of pending requests of a
+        key.
+    pending : int, Number of requests waiting or running.
+    rejected : int, Count of requests rejected.
+    """
+    WORKERS = 8
+    MAX_PENDING = 1024
+    MAX_KEY_PENDING = 16
+
+    def __init__(self, workers=WORKERS, max_pending=MAX_PENDING,
+                 max_key_pending=MAX_KEY_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_key_pending = max_key_pending
+        self.pending = 0
+        self.rejected = 0
+        self._executor = ThreadPoolExecutor(workers)
+        self._keys = {}  # {key: [asyncio.Lock, pending of the key]}
+
+    async def run(self, key, func, *args):
+        """ Run `func(*args)` in the thread pool after previous requests of
+        the key finished, and return it's result.
+
+        Raises
+        ------
+        Overloaded.
+
+        """
+        return await self.run_many([key], func, *args)
+
+    async def run_many(self, keys, func, *args):
+        """ Run `func(*args)` as a request of all the keys, after previous
+        requests of them finished.
+
+        Locks of keys are acquired in sorted order, so requests sharing
+        keys never wait for each other in a cycle.
+
+        Raises
+        ------
+        Overloaded.
+
+        """
+        keys = sorted(set(keys), key=str)
+        items = [self._keys.get(key) for key in keys]
+        if self.pending >= self.max_pending or\
+                any(item is not None and item[1] >= self.max_key_pending
+                    for item in items):
+            self.rejected += 1
+            raise Overloaded(keys)
+        for i, key in enumerate(keys):
+            if items[i] is None:
+                items[i] = self._keys[key] = [asyncio.Lock(), 0]
+            items[i][1] += 1
+        self.pending += 1
+        try:
+            async with contextlib.AsyncExitStack() as stack:
+                for item in items:
+                    await stack.enter_async_context(item[0])
+                loop = asyncio.get_event_loop()
+                return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            self.pending -= 1
+            for key, item in zip(keys, items):
+                item[1] -= 1
+                if item[1] == 0:
+                    del self._keys[key]
+
+    def stats(self):
+        """ Return counters of the executor.
+
+        Returns
+        -------
+        {
+            "workers": int,
+            "pending": int,
+            "max_pending": int,
+            "keys": int,  // keys with pending requests
+            "rejected": int
+        }
+
+        """
+        return {
+            "workers": self.workers,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "keys": len(self._keys),
+            "rejected": self.rejected
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+class ProcessStats(object):
+    """ Requests processed by current process, created again in forked
+    workers.
+
+    Attributes
+    ----------
+    started_at : float, as `time.time()`.
+    first_request : float, Seconds of the first request, `None` if no
+        request processed.
+    latency : LatencyHistogram
+    """
+    def __init__(self):
+        self.started_at = time.time()
+        self.first_request = None
+        self.latency = LatencyHistogram()
+
+    def observe(self, seconds):
+        if self.first_request is None:
+            self.first_request = seconds
+        self.latency.observe(seconds)
+
+    def stats(self):
+        return {
+            "pid": os.getpid(),
+            "uptime": time.time() - self.started_at,
+            "first_request": self.first_request,
+            "latency": self.latency.stats(),
+            "memory": memory_usage()
+        }
+
+
+# fields of /proc/self/smaps_rollup
+MEMORY_FIELDS = {
+    "Rss": "rss",
+    "Pss": "pss",
+    "Shared_Clean": "shared",
+    "Shared_Dirty": "shared",
+    "Private_Clean": "private",
+    "Private_Dirty": "private"
+}
+
+
+def memory_usage():
+    """ Return memory of current process in bytes.
+
+    Returns
+    -------
+    {
+        "rss": int,
+        "pss": int,      // rss with shared pages divided by sharers
+        "shared": int,   // pages shared with other processes
+        "private": int
+    }
+    only `max_rss` is returned if `/proc` is not available.
+
+    """
+    usage = {}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in MEMORY_FIELDS:
+                    field = MEMORY_FIELDS[key]
+                    usage[field] = usage.get(field, 0) +\
+                        int(value.split()[0]) * 1024
+    except (IOError, OSError, ValueError):
+        usage = {}
+    if not usage:
+        usage["max_rss"] = resource.getrusage(
+            resource.RUSAGE_SELF).ru_maxrss * 1024
+    return usage
+
+
+def check_request(data, question=True):
+    """ Return error message of an invalid `/nlu/predict/` request, or
+    `/nlu/train/` request without `question`, `None` if it's valid.
+    """
+    if not isinstance(data, dict):
+        return "request must be an object"
+    for field in ["robot_id", "project"]:
+        if data.get(field) is None:
+            return "missing {0}".format(field)
+    if question and not isinstance(data.get("question"), str):
+        return "invalid question"
+    return None
+
+
+def error_response(code, message):
+    return {"code": code, "message": message}
+
+
+def predict_response(rst):
+    """ Convert result of `EvaRobot.process_question` to response of
+    `/nlu/predict/`.
+    """
+    # hack code
+    if rst["response_id"] == "search_event":
+        rst["nlu"]["slots"]["country"] = rst["nlu"]["slots"]["event_country"]
+        del rst["nlu"]["slots"]["event_country"]
+    target = {
+        'code': 0,
+        'result': {
+            'event_id': rst["response_id"],
+            'arguments': rst['nlu']["slots"],
+            'sid': 0
+        }
+    }
+    if rst["response_id"] == "service":
+        target["result"]["speak"] = "您好，有什么我可以帮你的？"
+    if rst["response_id"] == "correlation_analysis_without_time":
+        target["result"]["speak"] = "您好，请问您想分析的是哪个时间段？"
+    return target
+
+
+__all__ = ["Overloaded", "LatencyHistogram", "KeyedExecutor",
+           "ProcessStats", "memory_usage", "check_request", "error_response",
+           "predict_response"]
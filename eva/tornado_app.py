@@ -1,19 +1,170 @@
+import json
+import logging
+
 import tornado.ioloop
 import tornado.web
 
+from evashare.log import init_logger
+from eva.cluster import LocalBackend, Supervisor, preload
+from eva.config import ConfigApp, ConfigLog
+from eva.serving import (KeyedExecutor, LatencyHistogram, Overloaded,
+                          check_request, error_response)
+
+init_logger(level=ConfigLog.log_level, path=ConfigLog.log_path)
+log = logging.getLogger(__name__)
+
+
+class BaseHandler(tornado.web.RequestHandler):
+    """ Run robot work of `backend` on the shared `KeyedExecutor`, and
+    record latency of the route.
+    """
+    def initialize(self, backend, executor, histograms):
+        self.backend = backend
+        self.executor = executor
+        self.histograms = histograms
+
+    def load_body(self):
+        try:
+            return json.loads(self.request.body)
+        except ValueError:
+            raise tornado.web.HTTPError(400, "invalid json")
+
+    def load_request(self, question=True):
+        """ Return the request of a robot, see `check_request`.  """
+        data = self.load_body()
+        message = check_request(data, question)
+        if message is not None:
+            raise tornado.web.HTTPError(400, message)
+        return data
+
+    async def run(self, key, func, *args):
+        return await self.run_many([key], func, *args)
+
+    async def run_many(self, keys, func, *args):
+        """ Run `func(*args)` serialized with requests of robots `keys`.  """
+        try:
+            return await self.executor.run_many(keys, func, *args)
+        except Overloaded:
+            self.set_header("Retry-After", "1")
+            raise tornado.web.HTTPError(503, "overloaded")
+
+    def write_error(self, status_code, **kwargs):
+        message = self._reason
+        error = kwargs.get("exc_info", (None, None, None))[1]
+        if isinstance(error, tornado.web.HTTPError) and error.log_message:
+            message = error.log_message
+        self.finish({"code": status_code, "message": message})
+
+    def on_finish(self):
+        histogram = self.histograms.get(self.request.path)
+        if histogram is not None:
+            histogram.observe(self.request.request_time())
+
+
+class PredictHandler(BaseHandler):
+    async def post(self):
+        data = self.load_request()
+        # DialogEngine of a robot is not thread safe.
+        self.write(await self.run(data["robot_id"],
+                                  self.backend.process_question, data))
+
+    get = post
+
+
+class BatchPredictHandler(BaseHandler):
+    """ Predict a list of requests of `/nlu/predict/`, possibly of many
+    robots and domains, posted as a list or `{"requests": list}`.
+
+    Responses are returned in order of requests, an invalid or failed
+    request gets it's own error code instead of failing the batch.
+
+    Attributes
+    ----------
+    MAX_REQUESTS : int, Maximum number of requests in a batch.
+    """
+    MAX_REQUESTS = 256
+
+    async def post(self):
+        data = self.load_body()
+        if isinstance(data, dict):
+            data = data.get("requests")
+        if not isinstance(data, list):
+            raise tornado.web.HTTPError(400, "requests must be a list")
+        if len(data) > self.MAX_REQUESTS:
+            raise tornado.web.HTTPError(413, "too many requests")
+        rst = [None] * len(data)
+        valid = []
+        for i, request in enumerate(data):
+            message = check_request(request)
+            if message is None:
+                valid.append(i)
+            else:
+                rst[i] = error_response(400, message)
+        if valid:
+            # serialized with other requests of robots in the batch.
+            responses = await self.run_many(
+                [data[i]["robot_id"] for i in valid],
+                self.backend.process_questions, [data[i] for i in valid])
+            for i, response in zip(valid, responses):
+                rst[i] = response
+        self.write({"code": 0, "results": rst})
+
+
+class TrainHandler(BaseHandler):
+    async def post(self):
+        data = self.load_request(question=False)
+        await self.run(data["robot_id"], self.backend.train, data)
+        self.write({"code": 0})
+
+    get = post
+
 
-class MainHandler(tornado.web.RequestHandler):
-    def get(self):
-        self.write("Hello, world")
+class HealthHandler(BaseHandler):
+    async def get(self):
+        # asking workers blocks.
+        workers = await tornado.ioloop.IOLoop.current().run_in_executor(
+            None, self.backend.stats)
+        self.write({
+            "status": "UP",
+            "executor": self.executor.stats(),
+            "workers": workers,
+            "latency": dict((path, histogram.stats()) for path, histogram in
+                            self.histograms.items())
+        })
 
 
-def make_app():
+def make_app(backend=None, executor=None):
+    """
+    Parameters
+    ----------
+    backend : LocalBackend or Supervisor, processing requests in current
+        process by default.
+    executor : KeyedExecutor
+    """
+    backend = LocalBackend() if backend is None else backend
+    executor = KeyedExecutor() if executor is None else executor
+    routes = [
+        (r"/nlu/predict/", PredictHandler),
+        (r"/nlu/predict_batch/", BatchPredictHandler),
+        (r"/nlu/train/", TrainHandler),
+        (r"/health", HealthHandler)
+    ]
+    histograms = dict((path, LatencyHistogram()) for path, _ in routes)
+    kwargs = {"backend": backend, "executor": executor,
+              "histograms": histograms}
     return tornado.web.Application([
-        (r"/nlu/", MainHandler),
+        (path, handler, kwargs) for path, handler in routes
     ])
 
 
 if __name__ == "__main__":
-    app = make_app()
-    app.listen(8888)
+    backend = None
+    if int(ConfigApp.workers) > 0:
+        # fork workers before any thread started, preloaded domains are
+        # shared by workers.
+        preload(ConfigApp.preload_domains)
+        backend = Supervisor(int(ConfigApp.workers))
+        backend.start()
+    app = make_app(backend)
+    app.listen(int(ConfigApp.port), address=ConfigApp.host)
     tornado.ioloop.IOLoop.current().start()
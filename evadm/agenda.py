@@ -3,10 +3,14 @@
 from evashare.collections import OrderedSet
 from evadm.units import (
     Agent,
-    MixAgency
+    MixAgency,
+    TargetAgency,
+    ClusterAgency
 )
 
+import itertools
 import logging
+from types import MappingProxyType
 log = logging.getLogger(__name__)
 
 
@@ -15,48 +19,107 @@ class ExpectAgenda(object):
     Manage the visibility of bizunits and related intents and slots,
     given specific stack state.
 
+    Visibility is computed over the shared `UnitSpec` of units, so untouched
+    units of the robot are never created.  It only depends on units in the
+    stack, so the result is cached by identifiers of stack units in an
+    `LRUCache` shared by all robots of the domain.  The cached values must
+    not be modified.
+
     Attributes
     ----------
+    cache : LRUCache
+        `{stack signature: (visible_agents, visible_rank, visible_slots,
+        visible_intents, agents, intent_map, version)}`, no caching if
+        `None`.
     visible_agents : OrderdSet
-        the visible agents, given specific context.
+        the `UnitSpec` of visible agents, given specific context.
+    visible_rank : dict
+        priority of visible agents, `{UnitSpec: index in visible_agents}`
     visible_slots : set
         the visible slots, given specific context.
     visible_intents : set
         the visible intents, given specific context.
+    agents : tuple
+        `((tag, intent, node identifier), ...)` of visible agents, ordered by
+        priority, node of agents in TargetAgency or ClusterAgency is the
+        parent, read only since shared by robots.
+    intent_map : MappingProxyType
+        `{intent: (priority, node identifier)}` of the most prior visible
+        agent of each intent, read only since shared by robots.
+    version : int
+        identifier of the visibility, unique in the process, robots with the
+        same cached visibility have the same version.
 
     """
+    VERSIONS = itertools.count(1)
+
     def __init__(self, stack):
         self._visible_tree_agents = None
         self._stack = stack
+        self.cache = None
         self.visible_slots = None
-        self.visible_slots = None
+        self.visible_intents = None
         self.visible_agents = None
+        self.visible_rank = None
+        self.agents = None
+        self.intent_map = None
+        self.version = 0
 
     def compute_visible_units(self):
         """
 
         Calculate visible bizunits, intents, slots
         """
+        signature = tuple([unit.identifier for unit in self._stack.items])
+        visibility = None
+        if self.cache is not None:
+            visibility = self.cache.get(signature)
+        if visibility is None:
+            visibility = self._compute_visibility()
+            if self.cache is not None:
+                self.cache.put(signature, visibility)
+        (self.visible_agents, self.visible_rank, self.visible_slots,
+         self.visible_intents, self.agents, self.intent_map,
+         self.version) = visibility
+
+    def _compute_visibility(self):
         # ordered by context priority
         candicates = self._visible_agents_of_focus_hierachy()
         if self._visible_tree_agents is None:
+            # visible agents of the tree when only root in the stack.
+            root = self._stack.items[0].spec
             self._visible_tree_agents = self._visible_descendant_agents(
-                self._stack.items[0])
+                root, set([root]))
         candicates.extend(self._visible_tree_agents)
 
-        self.visible_intents = set()
+        visible_intents = set()
         slots = []
         for agent in candicates:
             slots.extend(agent.target_slots)
             slots.extend(agent.trigger_slots)
             for slot in agent.trigger_slots:
                 if slot.key == "intent":
-                    self.visible_intents.add(slot.value)
+                    visible_intents.add(slot.value)
 
         #  TODO: valid_slots
-        self.visible_slots = set([c.key for c in slots])
-        self.visible_slots.remove("intent")
-        self.visible_agents = OrderedSet(candicates)
+        visible_slots = set([c.key for c in slots])
+        visible_slots.remove("intent")
+        visible_agents = OrderedSet(candicates)
+        visible_rank = dict(
+            (agent, i) for i, agent in enumerate(visible_agents))
+
+        agents = []
+        intent_map = {}
+        for i, agent in enumerate(visible_agents):
+            parent = agent.parent
+            identifier = agent.identifier
+            if parent.is_a(TargetAgency) or parent.is_a(ClusterAgency):
+                identifier = parent.identifier
+            agents.append((agent.tag, agent.intent, identifier))
+            intent_map.setdefault(agent.intent, (i, identifier))
+        return (visible_agents, visible_rank, visible_slots, visible_intents,
+                tuple(agents), MappingProxyType(intent_map),
+                next(self.VERSIONS))
 
     def _visible_agents_of_focus_hierachy(self):
         """
@@ -65,31 +128,35 @@ class ExpectAgenda(object):
 
         """
         candicates = []
+        active = set([unit.spec for unit in self._stack.items])
         for unit in self._none_root_ancestors_of_focus_agent():
-            candicates.extend(self._visible_descendant_agents(unit))
+            candicates.extend(self._visible_descendant_agents(unit, active))
         return candicates
 
     def show_visible_agents(self):
         return [agent.tag for agent in self.visible_agents]
 
     def _none_root_ancestors_of_focus_agent(self):
-        focus = self._stack.top()
-        unit = focus
-        while not unit.is_root():
-            yield unit
-            unit = unit.parent
+        return self._stack.top().spec.ancestors
+
+    def _visible_descendant_agents(self, bizunit, active):
+        """
+        Parameters
+        ----------
+        bizunit : UnitSpec
+        active : set, `UnitSpec` of units in the stack.
 
-    def _visible_descendant_agents(self, bizunit):
+        """
         agents = []
 
         def visit_tree(unit):
-            if isinstance(unit, Agent):
+            if unit.is_a(Agent):
                 agents.append(unit)
-            elif isinstance(unit, MixAgency):
+            elif unit.is_a(MixAgency):
                 for child in unit.children:
                     # entrancable children of MixAgency node in the tree and
                     # children of active MixAgency node.
-                    if child.entrance or unit in self._stack.items:
+                    if child.data['entrance'] or unit in active:
                         visit_tree(child)
             else:
                 for child in unit.children:
@@ -1,68 +1,301 @@
 #!/usr/bin/env python
 # encoding: utf-8
+import copy
 import logging
 import json
 import pprint
 import treelib
 
-from evadm.units.agent import Agent
+from evadm.cache import LRUCache
+from evadm.context import SlotTable
+from evadm.units.agent import Agent, TargetAgent
 from evadm.units.agency import Agency
 log = logging.getLogger(__name__)
 
 
+class TriggerIndex(object):
+    """ Inverted index from trigger slots to agents, built at load time.
+
+    Each agent is indexed by one of it's required trigger slots, a slot with
+    specific value if any, else a slot with any value(`@`).  Agents without
+    required slots are always candidates.
+
+    Attributes
+    ----------
+    _by_value : dict, `{(key, value): [UnitSpec]}`
+    _by_key : dict, `{key: [UnitSpec]}`
+    _always : [UnitSpec]
+    """
+    def __init__(self):
+        self._by_value = {}
+        self._by_key = {}
+        self._always = []
+
+    def add(self, spec):
+        """ Index an agent by it's trigger slots. """
+        required = [c for c in spec.trigger_slots if not c.optional]
+        specified = [c for c in required if not c.value.startswith("@")]
+        if specified:
+            key = (specified[0].key, str(specified[0].value))
+            self._by_value.setdefault(key, []).append(spec)
+        elif required:
+            self._by_key.setdefault(required[0].key, []).append(spec)
+        else:
+            self._always.append(spec)
+
+    def candidates(self, context):
+        """ Return agents could be satisfied by the assigned slots of context.
+
+        Parameters
+        ----------
+        context : Context
+
+        Returns
+        -------
+        [UnitSpec], may contain duplicated agents.
+        """
+        agents = list(self._always)
+        for slot in context.dirty_slots():
+            agents.extend(self._by_value.get((slot.key, str(slot.value)), []))
+            agents.extend(self._by_key.get(slot.key, []))
+        return agents
+
+
+class Topology(object):
+    """ Flat read-only topology of a compiled `BizTree`.
+
+    Nodes are numbered breadth first, so children of a node are stored
+    contiguously and found by slicing instead of walking the tree.
+
+    Attributes
+    ----------
+    specs : [UnitSpec], nodes ordered by index.
+    index : dict, `{identifier: index}`.
+    parents : [int], index of parent node, `-1` for root.
+    child_start : [int], index of the first child.
+    child_end : [int], index after the last child.
+    depths : [int], depth of node, `0` for root.
+    ancestors : [tuple], the node and it's ancestors excluding root,
+        bottom up.
+    """
+    def __init__(self, tree):
+        self.specs = []
+        self.index = {}
+        self.parents = []
+        self.child_start = []
+        self.child_end = []
+        self.depths = []
+        self.ancestors = []
+        self._append(tree.get_node(tree.root), -1)
+        i = 0
+        while i < len(self.specs):
+            self.child_start.append(len(self.specs))
+            for child in tree.children(self.specs[i].identifier):
+                self._append(child, i)
+            self.child_end.append(len(self.specs))
+            i += 1
+
+    def _append(self, spec, parent):
+        i = len(self.specs)
+        self.specs.append(spec)
+        self.index[spec.identifier] = i
+        self.parents.append(parent)
+        if parent < 0:
+            self.depths.append(0)
+            self.ancestors.append(())
+        else:
+            self.depths.append(self.depths[parent] + 1)
+            self.ancestors.append((spec,) + self.ancestors[parent])
+        spec.index = i
+        spec.topology = self
+
+    def spec(self, identifier):
+        """ Return the node with given identifier. """
+        return self.specs[self.index[identifier]]
+
+    def parent(self, i):
+        """ Return parent of the i-th node, `None` for root. """
+        parent = self.parents[i]
+        return None if parent < 0 else self.specs[parent]
+
+    def children(self, i):
+        """ Return children of the i-th node. """
+        return self.specs[self.child_start[i]:self.child_end[i]]
+
+    def __len__(self):
+        return len(self.specs)
+
+
 class BizTree(treelib.Tree):
     """ Dialog configure tree.
 
+    The tree is compiled once per domain and shared by all `DialogEngine`
+    instances of the domain, each node is an `UnitSpec`.  Dialogue status of
+    a robot is kept by `BizTreeOverlay`.
+
     We can print tree through `to_json` function, with `with_data` argument
     setting to `True` or `False`. Alternative, We can call `show` function to
-    show the tree topology.
+    show the tree topology.  Lookups at runtime go through `topology` built
+    by `compile`, not the `treelib.Tree` itself.
 
+    Attributes
+    ----------
+    topology : Topology, Flat topology of the tree, see `compile`.
+    slots : SlotTable, Initial slots of context.
+    trigger_index : TriggerIndex, Agents indexed by trigger slots.
+    target_dependents : dict, `{"key1": [UnitSpec], ..}`, `TargetAgent`
+        depend on the slot to complete.
+    visibility_cache : LRUCache, Visible units by stack, see `ExpectAgenda`.
     """
     TAG_ROOT = "root"
+    VISIBILITY_CACHE_SIZE = 1024
 
     def __init__(self):
         super(BizTree, self).__init__()
+        self.slots = SlotTable()
+        self.trigger_index = TriggerIndex()
+        self.target_dependents = {}
+        self.visibility_cache = LRUCache(BizTree.VISIBILITY_CACHE_SIZE)
+        self.topology = None
 
-    def add_subtree_from_dict(self, dict_subtree, parent, dm):
+    def add_subtree_from_dict(self, dict_subtree, parent):
         """ Add a subtree to parent node.
 
         Parameters
         ----------
         dict_subtree : dict,
-        parent: treelib.Node
+        parent: UnitSpec
 
         """
-        self._parse_tree(dict_subtree, parent, dm)
+        self._parse_tree(dict_subtree, parent)
 
-    def init_from_dict(self, dict_tree, dm):
+    def init_from_dict(self, dict_tree):
         """ Constructing a biz tree with dict data.
 
-        Each tree node is instance of some subtype of `BizUnit`
+        Each tree node is `UnitSpec` of some subtype of `BizUnit`
 
         Parameters
         ----------
         dict_tree : dict, dict tree data
 
         """
-        self.add_subtree_from_dict(dict_tree, None, dm)
+        self.add_subtree_from_dict(dict_tree, None)
         self.get_node(self.root).tag = BizTree.TAG_ROOT
 
-    def _parse_tree(self, dict_node, parent, dm):
+    def compile(self):
+        """ Build `topology` of the tree, invoked after all subtrees added.
+
+        Returns
+        -------
+        Topology.
+
+        """
+        self.topology = Topology(self)
+        return self.topology
+
+    def _parse_tree(self, dict_node, parent):
         data = dict_node['data']
         tag = data['tag']
         log.debug("parse node: [%s]" % data['tag'])
         if data["type"] in [Agency.TYPE_MIX, Agency.TYPE_TARGET,
                             Agency.TYPE_CLUSTER]:
-            tr_node = Agency.get_agency(dm, tag, data)
+            tr_node = Agency.compile_agency(tag, data)
             self.add_node(tr_node, parent)
         else:
-            tr_node = Agent.get_agent(dm, tag, data)
+            tr_node = Agent.compile_agent(tag, data)
             self.add_node(tr_node, parent)
+            self.trigger_index.add(tr_node)
+            if tr_node.is_a(TargetAgent):
+                for key in tr_node.target_keys:
+                    self.target_dependents.setdefault(key, []).append(tr_node)
+            for slot in tr_node.trigger_slots + tr_node.target_slots:
+                if slot.key not in self.slots.index:
+                    slot = copy.deepcopy(slot)
+                    slot.value = None
+                    self.slots.add(slot)
         for child in dict_node['children']:
-            self._parse_tree(child, tr_node, dm)
-        tr_node.parent = parent
+            self._parse_tree(child, tr_node)
 
     def __repr__(self):
         self.show()
         detail = pprint.pformat(json.loads(self.to_json(with_data=True)))
         return "--------------------------\n{0}".format(detail)
+
+
+class BizTreeOverlay(object):
+    """ Dialogue status of a robot over a shared `BizTree`.
+
+    `BizUnit` instances are created from their `UnitSpec` the first time
+    they are touched, so the cost of a robot grows with the units it visits
+    instead of the size of the tree.
+
+    Attributes
+    ----------
+    tree : BizTree, the shared tree.
+    _units : dict, `{identifier: BizUnit}` of touched units.
+    """
+    def __init__(self, dm, tree):
+        self.tree = tree
+        self._dm = dm
+        self._units = {}
+
+    @property
+    def root(self):
+        return self.tree.root
+
+    def get_unit(self, spec):
+        """ Return the unit of the robot created from `spec`. """
+        unit = self._units.get(spec.identifier, None)
+        if unit is None:
+            unit = spec.unit_class(self._dm, spec)
+            parent = spec.parent
+            if parent is not None:
+                unit.parent = self.get_unit(parent)
+            self._units[spec.identifier] = unit
+        return unit
+
+    def get_node(self, identifier):
+        """ Return the unit of the robot with given identifier. """
+        unit = self._units.get(identifier, None)
+        if unit is None:
+            unit = self.get_unit(self.tree.topology.spec(identifier))
+        return unit
+
+    def children(self, identifier):
+        """ Return children units of the unit with given identifier. """
+        topology = self.tree.topology
+        return [self.get_unit(spec)
+                for spec in topology.children(topology.index[identifier])]
+
+    def parent(self, identifier):
+        """ Return parent unit of the unit with given identifier. """
+        topology = self.tree.topology
+        spec = topology.parent(topology.index[identifier])
+        if spec is None:
+            return None
+        return self.get_unit(spec)
+
+    def units(self):
+        """ Return `(identifier, unit)` of touched units. """
+        return list(self._units.items())
+
+    def all_nodes_itr(self):
+        """ Iterate all units of the tree, debugging only. """
+        for spec in self.tree.topology.specs:
+            yield self.get_unit(spec)
+
+    def show(self):
+        self.tree.show()
+
+    def to_dict(self, with_data=False):
+        """ Return the tree with dialogue status of touched units. """
+        def visit(spec):
+            tag = spec.tag
+            if spec.identifier in self._units:
+                tag = "{0}({1})".format(
+                    tag, self._units[spec.identifier].state)
+            node = {tag: {"children": [visit(c) for c in spec.children]}}
+            if with_data:
+                node[tag]["data"] = spec.data
+            return node
+        return visit(self.tree.topology.specs[0])
@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import hashlib
+import json
+import logging
+import os
+import pickle
+
+from evadm.errors import DomainError
+from evadm.units.agency import Agency
+
+log = logging.getLogger(__name__)
+
+
+class DomainBundle(object):
+    """ Precompiled DM json files of a domain, stored as one binary file.
+
+    The bundle is rebuilt when modification time or size of any source file
+    changes, `digest` tells if the content changed.
+
+    Attributes
+    ----------
+    VERSION : int, Format version, bundles of other versions are rebuilt.
+    digest : str, Content hash of source files.
+    manifest : [(path, mtime, size)], Source files in loading order.
+    files : [(file_name, dict)], Dict tree of each json file under `dm`
+        directory.
+    casual_talk : dict, Dict tree of casual talk.
+    """
+    VERSION = 1
+
+    def __init__(self, digest, manifest, files, casual_talk):
+        self.digest = digest
+        self.manifest = manifest
+        self.files = files
+        self.casual_talk = casual_talk
+
+    @classmethod
+    def compile(cls, sources, casual_talk_path):
+        """ Validate and compile source files.
+
+        Parameters
+        ----------
+        sources : [(file_name, path)], json files under `dm` directory.
+        casual_talk_path : str, path of casual talk json file.
+
+        Returns
+        -------
+        DomainBundle.
+
+        """
+        paths = [path for _, path in sources] + [casual_talk_path]
+        manifest = scan(paths)
+        contents = [read_file(path) for path in paths]
+        files = []
+        for (file_name, path), content in zip(sources, contents):
+            files.append((file_name, parse_tree(path, content)))
+        casual_talk = parse_tree(casual_talk_path, contents[-1])
+        return cls(content_digest(paths, contents), manifest,
+                   files, casual_talk)
+
+    @classmethod
+    def load(cls, path):
+        """ Return the bundle stored in `path`, `None` if not valid. """
+        try:
+            with open(path, 'rb') as file_obj:
+                version, fields = pickle.load(file_obj)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            log.warning("INVALID_BUNDLE {0}".format(path), exc_info=True)
+            return None
+        if version != cls.VERSION:
+            return None
+        return cls(*fields)
+
+    def dump(self, path):
+        """ Write the bundle to `path` atomically.  """
+        tmp_path = "{0}.{1}.tmp".format(path, os.getpid())
+        try:
+            with open(tmp_path, 'wb') as file_obj:
+                pickle.dump((self.VERSION, (self.digest, self.manifest,
+                                            self.files, self.casual_talk)),
+                            file_obj, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except OSError:
+            log.warning("SAVE_BUNDLE_FAILED {0}".format(path), exc_info=True)
+
+
+def scan(paths):
+    """ Return `(path, mtime, size)` of files.  """
+    manifest = []
+    for path in paths:
+        st = os.stat(path)
+        manifest.append((path, st.st_mtime_ns, st.st_size))
+    return manifest
+
+
+def read_file(path):
+    with open(path, 'rb') as file_obj:
+        return file_obj.read()
+
+
+def content_digest(paths, contents):
+    """ Return hash of bundle version, name and content of files.  """
+    sha = hashlib.sha1(str(DomainBundle.VERSION).encode("utf-8"))
+    for path, content in zip(paths, contents):
+        sha.update(os.path.basename(path).encode("utf-8"))
+        sha.update(b"\0")
+        sha.update(content)
+        sha.update(b"\0")
+    return sha.hexdigest()
+
+
+def parse_tree(path, content):
+    """ Parse and validate the dict tree of a json file.  """
+    try:
+        tree = json.loads(content.decode("utf-8"))
+    except ValueError as e:
+        raise DomainError(path=path, reason=str(e))
+    validate_tree(path, tree)
+    return tree
+
+
+def validate_tree(path, tree):
+    """ Check ids, types and slots of nodes in the dict tree.
+
+    Raises
+    ------
+    DomainError.
+
+    """
+    ids = set()
+
+    def error(reason, data=None):
+        if data is not None:
+            reason = "{0}: {1}".format(data.get("id"), reason)
+        return DomainError(path=path, reason=reason)
+
+    def visit(node):
+        if not isinstance(node, dict) or not isinstance(node.get('data'),
+                                                        dict):
+            raise error("node without data")
+        data = node['data']
+        for key in ['id', 'tag']:
+            if not isinstance(data.get(key), str) or not data[key]:
+                raise error("invalid {0}".format(key), data)
+        if data['id'] in ids:
+            raise error("duplicated id", data)
+        ids.add(data['id'])
+        if not isinstance(data.get('type', ""), str):
+            raise error("invalid type", data)
+        if data.get('type') not in [Agency.TYPE_MIX, Agency.TYPE_TARGET,
+                                    Agency.TYPE_CLUSTER]:
+            validate_agent(data)
+        children = node.get('children')
+        if not isinstance(children, list):
+            raise error("invalid children", data)
+        for child in children:
+            visit(child)
+
+    def validate_agent(data):
+        if 'timeout' in data:
+            try:
+                float(data['timeout'])
+            except (TypeError, ValueError):
+                raise error("invalid timeout", data)
+        for key in ['trigger_slots', 'target_slots', 'optional_slots']:
+            if not isinstance(data.get(key, []), list):
+                raise error("invalid {0}".format(key), data)
+        for kv in data.get('trigger_slots', []):
+            if not isinstance(kv, str):
+                raise error("invalid trigger slot {0}".format(kv), data)
+            key, sep, value = kv.partition('=')
+            if not key or not sep or not value:
+                raise error("invalid trigger slot '{0}'".format(kv), data)
+
+    visit(tree)
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import logging
+import threading
+from collections import OrderedDict
+
+log = logging.getLogger(__name__)
+
+
+class LRUCache(object):
+    """ Bounded mapping which discards the least recently used items.
+
+    Attributes
+    ----------
+    maxsize : int, maximum number of items.
+    hits : int, number of `get` calls found the key.
+    misses : int, number of `get` calls missed the key.
+    evictions : int, number of items discarded for space.
+    """
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """ Return value of the key and mark it as most recently used.  """
+        with self._lock:
+            try:
+                value = self._items[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """ Set value of the key, discard least recently used items if full.
+
+        Returns
+        -------
+        [(key, value)], discarded items.
+
+        """
+        evicted = []
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                evicted.append(self._items.popitem(last=False))
+                self.evictions += 1
+        return evicted
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self._items.pop(key, default)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def stats(self):
+        """ Return counters of the cache.
+
+        Returns
+        -------
+        {
+            "size": int,
+            "maxsize": int,
+            "hits": int,
+            "misses": int,
+            "evictions": int
+        }
+
+        """
+        return {
+            "size": len(self._items),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+
+__all__ = ["LRUCache"]
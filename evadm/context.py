@@ -1,26 +1,26 @@
 # coding=utf-8
 import logging
-from json import JSONEncoder
+import sys
 
 log = logging.getLogger(__name__)
 
 
-class Slot(JSONEncoder):
+class Slot(object):
     """
     概念类，包含键值对。
     """
     LIFE_STACK = "LIFE_STACK"
 
+    __slots__ = ("_key", "_value", "_hash", "life_type", "optional")
+
     def __init__(self, key, value=None,
                  optional=False, life_type="LIFE_STACK"):
-        self._key = key
+        self._key = sys.intern(key) if isinstance(key, str) else key
         self._value = value
+        self._hash = None
         self.life_type = life_type
         self.optional = optional
 
-    def default(self, o):
-        return o.__dict__
-
     @property
     def key(self):
         return self._key
@@ -32,47 +32,99 @@ class Slot(JSONEncoder):
     @value.setter
     def value(self, v):
         self._value = v
-        if hasattr(self, '_hash'):
-            self._hash = hash(str(self))
+        self._hash = None
 
     @property
     def dirty(self):
-        return self.value is not None
+        return self._value is not None
 
     def __str__(self):
-        return "Slot({0}={1})".format(self.key, self.value)
+        return "Slot({0}={1})".format(self._key, self._value)
 
     def __hash__(self):
-        if hasattr(self, '_hash'):
-            return self._hash
-        self._hash = hash(str(self))
+        if self._hash is None:
+            self._hash = hash(str(self))
         return self._hash
 
     def __eq__(self, r):
-        try:
-            return self._hash == r._hash
-        except AttributeError:
-            return hash(self) == hash(r)
+        return hash(self) == hash(r)
 
     def __repr__(self):
-        try:
-            return self.__str__()
-        except Exception as e:
-            raise e
+        return self.__str__()
+
+
+class SlotTable(object):
+    """ Slot keys of a domain with their index, shared by contexts.
+
+    Attributes
+    ----------
+    index : dict, {"key1": 0, "key2": 1}
+    slots : [Slot], initial slots with `None` value, ordered by index.
+    """
+
+    def __init__(self, slots=()):
+        self.index = {}
+        self.slots = []
+        for slot in slots:
+            self.add(slot)
+
+    def add(self, slot):
+        """ Add a initial slot if the key not exist, return it's index.  """
+        i = self.index.get(slot.key, None)
+        if i is None:
+            i = len(self.slots)
+            self.index[slot.key] = i
+            self.slots.append(slot)
+        return i
+
+    def copy(self):
+        return SlotTable(self.slots)
+
+    def __len__(self):
+        return len(self.slots)
 
 
 class Context(object):
     """ System have one context instance,
     which is used to manage a set of slots(Memory).
 
+    Keys are mapped to index by a `SlotTable` shared by contexts of the same
+    domain, a context only keeps a flat list of slots.  Initial slots with
+    `None` value are shared too, they are replaced instead of modified when
+    updating.
+
     Attributes
     ----------
-    _all_slots : dict, {"key1": slot1, "key2": slot2}
+    _table : SlotTable, index of slot keys.
+    _slots : [Slot], slots ordered by index.
+    _dependents : dict, {"key1": [agent1, agent2], ..}, agents with
+        target slot of the key.
+    _filled : dict, {agent: number of assigned target slots}
+    completed_agents : dict, agents with all target slots assigned, used as
+        an ordered set.
 
     """
 
-    def __init__(self):
-        self._all_slots = {}
+    def __init__(self, table=None, dependents=None):
+        self._own_table = table is None
+        self._table = SlotTable() if table is None else table
+        self._slots = list(self._table.slots)
+        self._dependents = dependents if dependents else {}
+        self._filled = {}
+        self.completed_agents = {}
+
+    def _on_dirty_changed(self, key, dirty):
+        """ Count assigned target slots of agents depend on the key.  """
+        for agent in self._dependents.get(key, []):
+            count = self._filled.get(agent, 0) + (1 if dirty else -1)
+            if count:
+                self._filled[agent] = count
+            else:
+                del self._filled[agent]
+            if count == len(agent.target_keys):
+                self.completed_agents[agent] = True
+            else:
+                self.completed_agents.pop(agent, None)
 
     def add_slot(self, slot):
         """ Add one slot instance to memory.
@@ -83,7 +135,19 @@ class Context(object):
 
         """
         slot.value = None
-        self._all_slots[slot.key] = slot
+        i = self._table.index.get(slot.key, None)
+        if i is None:
+            if not self._own_table:
+                # copy on write, the shared table is never modified.
+                self._table = self._table.copy()
+                self._own_table = True
+            i = self._table.add(slot)
+            self._slots.append(slot)
+            return
+        old = self._slots[i]
+        self._slots[i] = slot
+        if old.dirty:
+            self._on_dirty_changed(slot.key, False)
 
     def update_slot_by_value(self, key, value):
         """
@@ -107,10 +171,14 @@ class Context(object):
 
         """
         assert(key == slot.key)
-        if key not in self._all_slots:
+        i = self._table.index.get(key, None)
+        if i is None:
             log.error("不存在概念{0}".format(key))
             return
-        self._all_slots[key] = slot
+        old = self._slots[i]
+        self._slots[i] = slot
+        if old.dirty != slot.dirty:
+            self._on_dirty_changed(key, slot.dirty)
 
     def reset_slot(self, key):
         """ Set specific slot with `None` value.
@@ -120,11 +188,14 @@ class Context(object):
         key : str, used to identify slot.
 
         """
-        slot = self._all_slots.get(key, None)
-        if slot:
-            slot.value = None
+        i = self._table.index.get(key, None)
+        if i is None:
+            log.error("不存在概念{0}".format(key))
             return
-        log.error("不存在概念{0}".format(key))
+        slot = self._slots[i]
+        if slot.dirty:
+            slot.value = None
+            self._on_dirty_changed(key, False)
 
     def get_slot(self, key):
         """ Get specific slot by string key.
@@ -134,10 +205,16 @@ class Context(object):
         key : str, used to identify slot.
 
         """
-        return self._all_slots[key]
+        return self._slots[self._table.index[key]]
 
     def __getitem__(self, key):
-        return self._all_slots[key]
+        return self._slots[self._table.index[key]]
+
+    def __iter__(self):
+        return iter(self._slots)
+
+    def __len__(self):
+        return len(self._slots)
 
     def satisfied(self, slot):
         """ Check if memory have a slot equal to target slot.
@@ -147,7 +224,7 @@ class Context(object):
         slot: Slot, target comparing slot.
 
         """
-        target = self._all_slots[slot.key]
+        target = self._slots[self._table.index[slot.key]]
         if target.dirty and slot.value.startswith("@") or\
                 slot.optional and not target.dirty or\
                 target == slot:
@@ -162,17 +239,45 @@ class Context(object):
         key : str, key of specific slot.
 
         """
-        target = self._all_slots.get(key, None)
-        if target and target.dirty:
-            return True
-        if target is None:
+        i = self._table.index.get(key, None)
+        if i is None:
             log.error("不存在概念{0}".format(key))
-        return False
+            return False
+        return self._slots[i].dirty
+
+    def dirty_slots(self):
+        """ Iterate slots with value asigned.  """
+        for slot in self._slots:
+            if slot.dirty:
+                yield slot
+
+    def snapshot(self):
+        """ Return values of slots ordered by index.
+
+        Returns
+        -------
+        tuple.
+
+        """
+        return tuple([slot.value for slot in self._slots])
+
+    def restore(self, values):
+        """ Restore values of slots from `snapshot`.
+
+        Parameters
+        ----------
+        values : tuple, returned by `snapshot`.
+
+        """
+        assert(len(values) == len(self._slots))
+        for slot, value in zip(self._table.slots, values):
+            if value is None:
+                self.reset_slot(slot.key)
+            else:
+                self.update_slot_by_value(slot.key, value)
 
     def __str__(self):
-        slots = []
-        for key in sorted(self._all_slots.keys()):
-            slots.append(self._all_slots[key])
+        slots = sorted(self._slots, key=lambda c: c.key)
         return "\n                ".join(["\n            Context:"] +
                                          [str(c) for c in slots])
 
@@ -1,25 +1,21 @@
 #!/usr/bin/env python
 # encoding: utf-8
-import copy
-import json
 import logging
 import pprint
 import time
-import os
+from types import MappingProxyType
 
-from evashare.timer import TimerReset
-from evadm.util import PROJECT_DIR
+from evadm.timer import scheduler
 from evadm.stack import Stack
 from evadm.context import Context
 from evadm.topic import TopicController
-from evadm.biztree import BizTree
+from evadm.biztree import BizTree, BizTreeOverlay
 from evadm.agenda import ExpectAgenda
 from evadm.units import (
     Agent,
     BizUnit,
     TargetAgent,
     TargetAgency,
-    ClusterAgency,
     AbnormalHandler
 )
 
@@ -56,12 +52,24 @@ class DialogEngine(object):
         used to recover from endless loop if there is a bug.
     MAX_CONTEXT_RESERVED_ROUND : int
         The maximum rounds that context will reserved.
+    biz_trees : dict
+        `{(domain_id, including): (bundle digest, BizTree)}`, compiled
+        `BizTree` shared by all instances of the same domain.
+    biz_tree : BizTreeOverlay
+        maintaining the unit status of device over the shared `BizTree`.
     context : Context
         maintaining the slot status of device.
     stack : Stack
         maintaining the active interaction history.
-    _timer : TimerRest
-        Calling handle function when timeout.
+    _timer : Timer
+        Calling handle function when timeout, dispatched by the
+        process-wide `TimerScheduler`.
+    _timer_generation : int
+        Increased by starting and cancelling timers, a fired timer of an
+        older generation is ignored.
+    mailbox : Mailbox
+        Messages of the owner robot, fired timers are handled through it
+        when set, otherwise in the timer thread.
     _agenda : ExpectAgenda
         Manage the visiblility of bizunit.
     _session : Session
@@ -73,20 +81,24 @@ class DialogEngine(object):
     """
     SAFE_UPPER_LIMIT = 100
     MAX_CONTEXT_RESERVED_ROUND = 2
+    biz_trees = {}
 
     def __init__(self, topic_controller, io):
         self.context = Context()
-        self.biz_tree = BizTree()
+        self.biz_tree = None
         self.stack = Stack()
         self._session = Session()
         self._agenda = ExpectAgenda(self.stack)
+        self._visible_context = None
         self._topic = topic_controller
         self._topic.stack = self.stack
         self.countdown_round = 0
         self.countdown_unit = None
 
         self._timer = None
+        self._timer_generation = 0
         self._debug_timer_count = 0
+        self.mailbox = None
         self._io = io
         self.debug_loop = 0
         self.debug_timeunit = 1  # 为了测试的时候加速时间计数
@@ -117,11 +129,76 @@ class DialogEngine(object):
         return self.stack.top().state in [BizUnit.STATUS_WAIT_ACTION_CONFIRM,
                                           BizUnit.STATUS_WAIT_TARGET]
 
+    @property
+    def evictable(self):
+        """ If dialogue status could be saved by `dump_state`.
+
+        DM waiting for a timer, or with units not in the tree in stack, are
+        not evictable.
+        """
+        if self._timer is not None and not self._timer.cancelled:
+            return False
+        return all([unit.spec.topology is not None
+                    for unit in self.stack.items])
+
+    def dump_state(self):
+        """ Return dialogue status, see `load_state`.
+
+        Returns
+        -------
+        {
+            "stack": [identifier],
+            "units": {identifier: dict},
+            "slots": {key: value},   // assigned slots
+            "countdown_unit": identifier,
+            "countdown_round": int,
+            "sid": str
+        }
+
+        """
+        assert(self.evictable)
+        countdown_unit = self.countdown_unit
+        return {
+            "stack": [unit.identifier for unit in self.stack.items],
+            "units": dict([(identifier, unit.dump_state())
+                           for identifier, unit in self.biz_tree.units()]),
+            "slots": dict([(slot.key, slot.value)
+                           for slot in self.context.dirty_slots()]),
+            "countdown_unit": None if countdown_unit is None else
+            countdown_unit.identifier,
+            "countdown_round": self.countdown_round,
+            "sid": self._session._sid
+        }
+
+    def load_state(self, state):
+        """ Restore dialogue status returned by `dump_state`, invoked after
+        `load_data`.
+
+        Raises
+        ------
+        KeyError, if the units not exist in the tree.
+
+        """
+        for identifier, unit_state in state["units"].items():
+            self.biz_tree.get_node(identifier).load_state(unit_state)
+        del self.stack.items[:]
+        for identifier in state["stack"]:
+            self.stack.push(self.biz_tree.get_node(identifier))
+        for key, value in state["slots"].items():
+            self.context.update_slot_by_value(key, value)
+        if state["countdown_unit"] is not None:
+            self.countdown_unit = self.biz_tree.get_node(
+                state["countdown_unit"])
+        self.countdown_round = state["countdown_round"]
+        self._session.begin_session(state["sid"])
+        self._agenda.compute_visible_units()
+
     def load_data(self, including=[]):
         """ Initialize DM from database.
 
-        It will call `evecms.get_dm_biztree`.
-        If failed, return `DMError.RPCError`
+        The `BizTree` of domain is compiled by the first instance and shared
+        with the others until the domain files are modified, only dialogue
+        status is initialized per instance.
 
         Parameters
         ----------
@@ -133,18 +210,20 @@ class DialogEngine(object):
         None
 
         """
-        tree = self._io.get_dict_tree(including)
-
-        path = os.path.join(PROJECT_DIR, "data", "casual_talk.json")
-        with open(path, 'r') as file_obj:
-            casual_talk_json = file_obj.read()
-
-        self.biz_tree.init_from_dict(tree, self)
-        root = self.biz_tree.get_node(self.biz_tree.root)
-        self.biz_tree.add_subtree_from_dict(
-            json.loads(casual_talk_json), root, self)
-
-        self._init_context()
+        # the bundle is rebuilt if the files are modified, so is the tree.
+        bundle = self._io.load_bundle()
+        key = (self._io.domain_id, tuple(including))
+        item = DialogEngine.biz_trees.get(key, None)
+        if item is None or item[0] != bundle.digest:
+            tree = self._compile_biz_tree(bundle, including)
+            DialogEngine.biz_trees[key] = (bundle.digest, tree)
+        else:
+            tree = item[1]
+        self.biz_tree = BizTreeOverlay(self, tree)
+        self.context = Context(tree.slots, tree.target_dependents)
+        self._topic.biz_tree = self.biz_tree
+        self._topic.context = self.context
+        self._agenda.cache = tree.visibility_cache
 
         node = self.biz_tree.get_node(self.biz_tree.root)
         node.set_state(BizUnit.STATUS_STACKWAIT)
@@ -152,12 +231,16 @@ class DialogEngine(object):
 
         self._agenda.compute_visible_units()
 
-    def _init_context(self):
-        for bizunit in self.biz_tree.all_nodes_itr():
-            if isinstance(bizunit, Agent):
-                for slot in bizunit.trigger_slots + bizunit.target_slots:
-                    slot = copy.deepcopy(slot)
-                    self.context.add_slot(slot)
+    def _compile_biz_tree(self, bundle, including):
+        tree = self._io.get_dict_tree(including, bundle)
+        casual_talk = self._io.get_casual_talk(bundle)
+
+        biz_tree = BizTree()
+        biz_tree.init_from_dict(tree)
+        root = biz_tree.get_node(biz_tree.root)
+        biz_tree.add_subtree_from_dict(casual_talk, root)
+        biz_tree.compile()
+        return biz_tree
 
     def execute_focus_agent(self):
         """
@@ -223,7 +306,8 @@ class DialogEngine(object):
         self._session.begin_session(sid)
         self._update_slots(slots)
         self._mark_completed_bizunits()
-        new_focus = self._topic.trigger_bizunit(self._agenda.visible_agents)
+        new_focus = self._topic.trigger_bizunit(self._agenda.visible_agents,
+                                                self._agenda.visible_rank)
         if new_focus is None:
             log.debug("INVALID AGENTS")
             log.debug(
@@ -257,12 +341,10 @@ class DialogEngine(object):
                 self.context.update_slot(slot.key, slot)
 
     def _mark_completed_bizunits(self):
-        for bizunit in self.biz_tree.all_nodes_itr():
-            if isinstance(bizunit, TargetAgent):
-                completed = all([self.context.dirty(c.key)
-                                 for c in bizunit.target_slots])
-                if completed:
-                    bizunit.set_state(BizUnit.STATUS_TARGET_COMPLETED)
+        # maintained by `Context` when slots assigned or reset.
+        for spec in self.context.completed_agents:
+            bizunit = self.biz_tree.get_unit(spec)
+            bizunit.set_state(BizUnit.STATUS_TARGET_COMPLETED)
 
     def process_confirm(self, sid, data):
         """ Process action confirmation from device.
@@ -340,16 +422,39 @@ class DialogEngine(object):
 
         """
         assert(self._debug_timer_count == 0)
-        self._timer = TimerReset(bizunit, seconds * self.debug_timeunit,
-                                 function, *args, **kwargs)
         self._start_time = time.time()
         self._debug_timer_count += 1
-        self._timer.start()
+        self._timer_generation += 1
+        self._timer = scheduler.schedule(
+            bizunit, seconds * self.debug_timeunit, self._fire_timer,
+            self._timer_generation, function, args, kwargs)
 
     def cancel_timer(self):
         self._debug_timer_count -= 1
+        self._timer_generation += 1
         self._timer.cancel()
 
+    def release(self):
+        """ Cancel the pending timer, invoked before the DM is discarded
+        while waiting.
+        """
+        if self._timer is not None and not self._timer.cancelled:
+            self.cancel_timer()
+
+    def _fire_timer(self, generation, function, args, kwargs):
+        if self.mailbox is not None:
+            self.mailbox.post(self._handle_timer, generation, function,
+                              args, kwargs)
+        else:
+            self._handle_timer(generation, function, args, kwargs)
+
+    def _handle_timer(self, generation, function, args, kwargs):
+        if generation != self._timer_generation:
+            # cancelled after fired, before handled.
+            log.debug("IGNORE CANCELLED TIMER {0}".format(generation))
+            return
+        function(*args, **kwargs)
+
     def update_by_remote(self, slots):
         """ Called directly by thirdparty service like recommendation system,
         to update slots.
@@ -367,25 +472,40 @@ class DialogEngine(object):
         self._agenda.compute_visible_units()
 
     def get_visible_units(self):
-        """ Return visible units at the moment. """
-        # self._agenda.compute_visible_units()
-        # visible agents ordered by priority.
-        agents = []
-        for agent in self._agenda.visible_agents:
-            parent = agent.parent
-            identifier = agent.identifier
-            if isinstance(parent, TargetAgency) or\
-                    isinstance(parent, ClusterAgency):
-                identifier = parent.identifier
-            agents.append((agent.tag, agent.intent, identifier))
+        """ Return visible units at the moment.
 
-        return {
-            "visible_slots": list(self._agenda.visible_slots),
-            # "visible_intents": list(self._agenda.visible_intents),
-            "intent": self.context["intent"].value,
-            "agents": agents  # sorted by priority
+        The result is reused until visibility or intent of context changes,
+        and shared with robots of the same visibility, so it's read only.
+
+        Returns
+        -------
+        MappingProxyType
+        {
+            "visible_slots": tuple,
+
+            "intent": str,
+
+            "agents": ((tag, intent, node identifier), ...), sorted by
+                priority,
+
+            "intent_map": {intent: (priority, node identifier)},
+
+            "version": int, version of visibility.
         }
 
+        """
+        agenda = self._agenda
+        key = (agenda.version, self.context["intent"].value)
+        if self._visible_context is None or self._visible_context[0] != key:
+            self._visible_context = key, MappingProxyType({
+                "visible_slots": tuple(agenda.visible_slots),
+                "intent": key[1],
+                "agents": agenda.agents,
+                "intent_map": agenda.intent_map,
+                "version": agenda.version
+            })
+        return self._visible_context[1]
+
     def reset_countdown_round(self):
         """ Reset count down round to zero.
 
@@ -19,3 +19,7 @@ class DMError(Exception):
 
 class RPCError(DMError):
     msg = "RPC远程调用失败"
+
+
+class DomainError(DMError):
+    msg = "业务配置错误 {path}: {reason}"
@@ -1,29 +1,154 @@
 import os
-import json
+import hashlib
 import logging
+import threading
+import time
 
 from evadm.util import PROJECT_DIR
+from evadm.bundle import DomainBundle, scan
+from evadm.config import ConfigData
 
 log = logging.getLogger(__name__)
 
 
 class DMFileIO(object):
+    """ Load DM json files of a domain.
+
+    Json files under `dm` directory and casual talk are compiled into a
+    `DomainBundle` stored in `bundle_dir`, later loadings read the bundle
+    instead of parsing the files while they are not modified.  Loaded
+    bundles are shared by instances of the domain, the files are checked
+    for modification at most once every `CHECK_INTERVAL` seconds.
+
+    Attributes
+    ----------
+    CHECK_INTERVAL : float, Seconds a loaded bundle is used without
+        checking the files.
+    bundles : dict, `{(domain_id, sources, bundle_dir): (DomainBundle,
+        checked time)}`, loaded bundles.
+    bundle_dir : str, Directory of bundle files, `None` to use the cache
+        data path in config.
+    """
+    CHECK_INTERVAL = 5.0
+    bundles = {}
+    _bundles_lock = threading.Lock()
+
     def __init__(self, domain_id):
         self._domain_id = domain_id
         self._project_path = os.path.join(
             PROJECT_DIR, "data", "projects", domain_id)
+        self._casual_talk_path = os.path.join(
+            PROJECT_DIR, "data", "casual_talk.json")
+        self.bundle_dir = None
 
     @property
     def domain_id(self):
         return self._domain_id
 
-    def get_dict_tree(self, including=[]):
+    @property
+    def bundle_path(self):
+        """ Path of the bundle, named by domain and source directory.  """
+        bundle_dir = self.bundle_dir
+        if bundle_dir is None:
+            bundle_dir = os.path.join(ConfigData.cache_data_path, "dm")
+        os.makedirs(bundle_dir, exist_ok=True)
+        source = os.path.realpath(self._project_path).encode("utf-8")
+        return os.path.join(bundle_dir, "{0}-{1}.bundle".format(
+            self._domain_id, hashlib.sha1(source).hexdigest()[:12]))
+
+    @property
+    def _bundle_key(self):
+        return (self._domain_id, self._project_path, self._casual_talk_path,
+                self.bundle_dir)
+
+    def _sources(self):
+        sources = []
+        dir_path = os.path.join(self._project_path, "dm")
+        for path, dirs, files in os.walk(dir_path):
+            for f in files:
+                if f.endswith('json'):
+                    sources.append((f.rstrip(".json"), os.path.join(path, f)))
+        return sources
+
+    def compile_domain(self):
+        """ Validate DM json files and rewrite the bundle.
+
+        Returns
+        -------
+        DomainBundle.
+
+        """
+        bundle = DomainBundle.compile(self._sources(),
+                                      self._casual_talk_path)
+        bundle.dump(self.bundle_path)
+        DMFileIO.bundles[self._bundle_key] = (bundle, time.time())
+        log.info("COMPILE_DOMAIN {0} {1}".format(self._domain_id,
+                                                 bundle.digest))
+        return bundle
+
+    def load_bundle(self, reload=False):
+        """ Return the bundle of domain, rebuild it if sources changed.
+
+        Parameters
+        ----------
+        reload : boolean, If check the files even if they were checked
+            less than `CHECK_INTERVAL` seconds ago.
+
+        Returns
+        -------
+        DomainBundle.
+
+        """
+        key = self._bundle_key
+        item = DMFileIO.bundles.get(key, None)
+        if item is not None and not reload and\
+                time.time() - item[1] < self.CHECK_INTERVAL:
+            return item[0]
+        with DMFileIO._bundles_lock:
+            now = time.time()
+            sources = self._sources()
+            manifest = scan([path for _, path in sources] +
+                            [self._casual_talk_path])
+            item = DMFileIO.bundles.get(key, None)
+            if item is not None and item[0].manifest == manifest:
+                bundle = item[0]
+            else:
+                bundle = self._load_bundle(sources, manifest)
+            DMFileIO.bundles[key] = (bundle, now)
+        return bundle
+
+    def _load_bundle(self, sources, manifest):
+        path = self.bundle_path
+        bundle = DomainBundle.load(path)
+        if bundle is None or bundle.manifest != manifest:
+            compiled = DomainBundle.compile(sources, self._casual_talk_path)
+            if bundle is None or bundle.digest != compiled.digest:
+                log.info("COMPILE_DOMAIN {0} {1}".format(self._domain_id,
+                                                         compiled.digest))
+            # manifest is updated even if content not changed.
+            bundle = compiled
+            bundle.dump(path)
+        return bundle
+
+    def get_casual_talk(self, bundle=None):
+        """ Return dict tree of casual talk.
+
+        Parameters
+        ----------
+        bundle : DomainBundle, `None` to use `load_bundle`.
+        """
+        if bundle is None:
+            bundle = self.load_bundle()
+        return bundle.casual_talk
+
+    def get_dict_tree(self, including=[], bundle=None):
         """ construct a tree from json files.
 
         Parameters
         ----------
         including : list
             used for testing
+        bundle : DomainBundle, `None` to use `load_bundle`.
 
         Returns
         -------
@@ -32,17 +157,12 @@ class DMFileIO(object):
         """
         trees = []
         opened_file_names = []
-        dir_path = os.path.join(self._project_path, "dm")
-        for path, dirs, files in os.walk(dir_path):
-            for f in files:
-                if f.endswith('json'):
-                    file_name = f.rstrip(".json")
-                    if len(including) == 0 or file_name in including:
-                        file_path = os.path.join(path, f)
-                        with open(file_path, 'r') as file_obj:
-                            trees.append(
-                                json.loads(file_obj.read()))
-                        opened_file_names.append(file_name)
+        if bundle is None:
+            bundle = self.load_bundle()
+        for file_name, tree in bundle.files:
+            if len(including) == 0 or file_name in including:
+                trees.append(tree)
+                opened_file_names.append(file_name)
         if including:
             assert(set(opened_file_names) == set(including))
         root = {
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import functools
+import logging
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+log = logging.getLogger(__name__)
+
+
+class Mailbox(object):
+    """ Messages of a robot, processed one by one in order.
+
+    Requests, confirms, backend updates and timer expirations of a robot are
+    put in it's mailbox, so the robot is never entered by two threads at
+    the same time, while different robots run in parallel.
+
+    A thread calling `call` on an idle mailbox processes messages itself
+    until it's own message is done, and hands the rest over to the shared
+    thread pool.  Messages from `post` are processed in the pool, so timer
+    thread is never blocked by robots.
+
+    Attributes
+    ----------
+    WORKERS : int, Number of threads of the shared pool.
+    """
+    WORKERS = 8
+    _executor = None
+    _executor_pid = None
+    _executor_lock = threading.Lock()
+
+    def __init__(self):
+        self._messages = deque()
+        self._lock = threading.Lock()
+        self._active = False
+        self._drainer = None
+
+    @classmethod
+    def executor(self):
+        """ Return the shared pool, recreated in forked processes.  """
+        with self._executor_lock:
+            if Mailbox._executor_pid != os.getpid():
+                Mailbox._executor = ThreadPoolExecutor(self.WORKERS)
+                Mailbox._executor_pid = os.getpid()
+            return Mailbox._executor
+
+    @property
+    def idle(self):
+        """ If no message is waiting or processing.  """
+        return not self._active and not self._messages
+
+    def post(self, func, *args, **kwargs):
+        """ Put a message without waiting.
+
+        Returns
+        -------
+        concurrent.futures.Future, result of `func(*args, **kwargs)`, the
+        exception is also logged.
+
+        """
+        future = Future()
+        future.add_done_callback(log_error)
+        with self._lock:
+            self._messages.append((future, func, args, kwargs))
+            start = not self._active
+            self._active = True
+        if start:
+            self.executor().submit(self._drain)
+        return future
+
+    def call(self, func, *args, **kwargs):
+        """ Put a message and wait for it's result.
+
+        Calls from the message being processed run directly.
+
+        Raises
+        ------
+        Exception raised by `func`.
+
+        """
+        if self._drainer == threading.get_ident():
+            return func(*args, **kwargs)
+        future = Future()
+        with self._lock:
+            self._messages.append((future, func, args, kwargs))
+            drain = not self._active
+            self._active = True
+        if drain:
+            self._drain(future)
+        return future.result()
+
+    def _drain(self, until=None):
+        """ Process messages until empty or `until` is done.  """
+        self._drainer = threading.get_ident()
+        while True:
+            with self._lock:
+                if not self._messages or\
+                        (until is not None and until.done()):
+                    self._drainer = None
+                    handover = bool(self._messages)
+                    self._active = handover
+                    break
+                future, func, args, kwargs = self._messages.popleft()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(func(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+        if handover:
+            self.executor().submit(self._drain)
+
+
+def log_error(future):
+    if not future.cancelled() and future.exception() is not None:
+        log.error("MESSAGE_ERROR", exc_info=future.exception())
+
+
+def serialized(method):
+    """ Run the method through `self.mailbox`.  """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        return self.mailbox.call(method, self, *args, **kwargs)
+    return wrapper
+
+
+__all__ = ["Mailbox", "serialized"]
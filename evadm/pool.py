@@ -0,0 +1,256 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import hashlib
+import logging
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from evadm.config import ConfigData
+
+log = logging.getLogger(__name__)
+
+
+class RobotPool(object):
+    """ Bounded pool of robots, discards least recently used and idle ones.
+
+    Robots are discarded when the pool is full or they are not used for
+    `idle_timeout` seconds, robots refused by `evictable` and pinned robots
+    are kept.  A robot is pinned by `get` or `put` while it's used, until
+    `unpin`.
+
+    Attributes
+    ----------
+    maxsize : int, maximum number of robots.
+    idle_timeout : float, seconds, `None` to disable idle eviction.
+    evictable : function, `evictable(robot)` returns if robot could be
+        discarded, `None` for always.
+    hits : int, number of `get` calls found the robot.
+    misses : int, number of `get` calls missed the robot.
+    evictions : int, number of robots discarded.
+    restores : int, number of robots restored, see `record_restore`.
+    restore_time : float, total seconds of restoring.
+    max_restore_time : float, maximum seconds of restoring a robot.
+    """
+    def __init__(self, maxsize=10000, idle_timeout=None, evictable=None):
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self.evictable = evictable
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.restores = 0
+        self.restore_time = 0.0
+        self.max_restore_time = 0.0
+        # {key: [robot, last access time, pins]}
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None, pin=False):
+        """ Return robot of the key and mark it as most recently used, also
+        pin it if `pin`.
+        """
+        with self._lock:
+            item = self._items.get(key, None)
+            if item is None:
+                self.misses += 1
+                return default
+            self._items.move_to_end(key)
+            item[1] = time.time()
+            if pin:
+                item[2] += 1
+            self.hits += 1
+            return item[0]
+
+    def put(self, key, robot, pin=False):
+        """ Add a robot, pinned if `pin`, then discard robots if full or
+        idle.
+
+        Returns
+        -------
+        [(key, robot)], discarded robots.
+
+        """
+        with self._lock:
+            self._items[key] = [robot, time.time(), 1 if pin else 0]
+            self._items.move_to_end(key)
+        return self.evict()
+
+    def unpin(self, key, robot):
+        """ Unpin a robot pinned by `get` or `put`, ignored if the robot is
+        not in the pool any more.
+        """
+        with self._lock:
+            item = self._items.get(key, None)
+            if item is not None and item[0] is robot and item[2] > 0:
+                item[1] = time.time()
+                item[2] -= 1
+
+    def pop(self, key, default=None):
+        with self._lock:
+            item = self._items.pop(key, None)
+        return default if item is None else item[0]
+
+    def pinned(self, key):
+        """ If the robot of the key is pinned.  """
+        with self._lock:
+            item = self._items.get(key, None)
+            return item is not None and item[2] > 0
+
+    def discard(self, key):
+        """ Remove the robot of the key if it's not pinned and evictable.
+
+        Returns
+        -------
+        robot, `None` if not found or kept.
+
+        """
+        with self._lock:
+            item = self._items.get(key, None)
+            if item is None or item[2] or (self.evictable is not None and
+                                           not self.evictable(item[0])):
+                return None
+            del self._items[key]
+            return item[0]
+
+    def evict(self, now=None):
+        """ Discard robots over `maxsize` and idle robots.
+
+        Returns
+        -------
+        [(key, robot)], discarded robots.
+
+        """
+        now = time.time() if now is None else now
+        evicted = []
+        with self._lock:
+            over = len(self._items) - self.maxsize
+            for key, (robot, last_access, pins) in list(self._items.items()):
+                idle = self.idle_timeout is not None and\
+                    now - last_access > self.idle_timeout
+                if over <= 0 and not idle:
+                    # the rest are used more recently.
+                    break
+                if pins or (self.evictable is not None and
+                            not self.evictable(robot)):
+                    continue
+                del self._items[key]
+                evicted.append((key, robot))
+                over -= 1
+            self.evictions += len(evicted)
+        return evicted
+
+    def record_restore(self, seconds):
+        """ Count a robot restored in `seconds`.  """
+        with self._lock:
+            self.restores += 1
+            self.restore_time += seconds
+            self.max_restore_time = max(self.max_restore_time, seconds)
+
+    def values(self):
+        """ Return robots in the pool, least recently used first.  """
+        with self._lock:
+            return [item[0] for item in self._items.values()]
+
+    def items(self):
+        """ Return `(key, robot)` in the pool, least recently used first.  """
+        with self._lock:
+            return [(key, item[0]) for key, item in self._items.items()]
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def stats(self):
+        """ Return counters of the pool.
+
+        Returns
+        -------
+        {
+            "size": int,
+            "maxsize": int,
+            "hits": int,
+            "misses": int,
+            "evictions": int,
+            "restores": int,
+            "avg_restore_time": float,  // seconds
+            "max_restore_time": float
+        }
+
+        """
+        return {
+            "size": len(self._items),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "restores": self.restores,
+            "avg_restore_time": self.restore_time / self.restores
+            if self.restores else 0.0,
+            "max_restore_time": self.max_restore_time
+        }
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+
+class RobotStateStore(object):
+    """ Local store of dialogue status of robots evicted from pool.
+
+    Each robot is saved to a file named by hash of it's id.
+
+    Attributes
+    ----------
+    path : str, directory of the store, `None` to use the cache data path
+        in config.
+    """
+    def __init__(self, path=None):
+        self.path = path
+
+    def _file_path(self, key):
+        path = self.path
+        if path is None:
+            path = os.path.join(ConfigData.cache_data_path, "robots")
+        os.makedirs(path, exist_ok=True)
+        name = hashlib.sha1(str(key).encode("utf-8")).hexdigest()
+        return os.path.join(path, name + ".state")
+
+    def save(self, key, state):
+        """ Save state of the key atomically.  """
+        path = self._file_path(key)
+        tmp_path = "{0}.{1}.{2}.tmp".format(path, os.getpid(),
+                                            threading.get_ident())
+        try:
+            with open(tmp_path, 'wb') as file_obj:
+                pickle.dump((key, state), file_obj, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except OSError:
+            log.warning("SAVE_STATE_FAILED {0}".format(key), exc_info=True)
+
+    def pop(self, key):
+        """ Remove and return state of the key, `None` if not exist.  """
+        path = self._file_path(key)
+        try:
+            with open(path, 'rb') as file_obj:
+                saved_key, state = pickle.load(file_obj)
+            os.remove(path)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            log.warning("LOAD_STATE_FAILED {0}".format(key), exc_info=True)
+            return None
+        return state if saved_key == key else None
+
+    def delete(self, key):
+        try:
+            os.remove(self._file_path(key))
+        except FileNotFoundError:
+            pass
+
+
+__all__ = ["RobotPool", "RobotStateStore"]
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import bisect
+import hashlib
+import logging
+
+log = logging.getLogger(__name__)
+
+
+class HashRing(object):
+    """ Consistent hashing of keys to nodes.
+
+    Each node is placed at `replicas` points of the ring, a key belongs to
+    the first node point after it's hash.  Adding or removing a node only
+    moves keys of that node.
+
+    Attributes
+    ----------
+    REPLICAS : int, Default number of points of a node.
+    """
+    REPLICAS = 160
+
+    def __init__(self, nodes=(), replicas=REPLICAS):
+        self.replicas = replicas
+        self._nodes = set()
+        self._points = []  # sorted [(hash, node)]
+        self._hashes = []
+        for node in nodes:
+            self.add(node)
+
+    @property
+    def nodes(self):
+        return sorted(self._nodes)
+
+    def add(self, node):
+        if node in self._nodes:
+            return
+        self._nodes.add(node)
+        for i in range(self.replicas):
+            self._points.append((key_hash("{0}#{1}".format(node, i)), node))
+        self._points.sort()
+        self._hashes = [c[0] for c in self._points]
+
+    def remove(self, node):
+        if node not in self._nodes:
+            return
+        self._nodes.remove(node)
+        self._points = [c for c in self._points if c[1] != node]
+        self._hashes = [c[0] for c in self._points]
+
+    def node(self, key):
+        """ Return node of the key, `None` if no node.  """
+        if not self._points:
+            return None
+        i = bisect.bisect(self._hashes, key_hash(str(key)))
+        return self._points[i % len(self._points)][1]
+
+    def __len__(self):
+        return len(self._nodes)
+
+
+def key_hash(key):
+    return int.from_bytes(
+        hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+
+
+__all__ = ["HashRing"]
@@ -1,10 +1,16 @@
 #!/usr/bin/env python
 # encoding: utf-8
 import logging
+import os
+import threading
+import time
 
 from evadm.context import Slot
 from evadm.dm import DialogEngine
 from evadm.io import DMIO
+from evadm.mailbox import Mailbox, serialized
+from evadm.pool import RobotPool, RobotStateStore
+from evadm.timer import scheduler
 log = logging.getLogger(__name__)
 
 
@@ -12,19 +18,79 @@ log = logging.getLogger(__name__)
 class DMRobot(object):
     """
     Every DMRobot instance corresponds to a device.
+
+    Robots are buffered in a bounded `robots_pool`, dialogue status of robots
+    evicted from the pool is saved to `state_store`, and restored the next
+    time the robot is got.  Idle robots are swept every `SWEEP_INTERVAL`
+    seconds, robots got with `pin` are kept until `unpin`.
+
+    Calls of the robot and it's timers are processed one by one through
+    `mailbox`, so a robot could be used by many threads.
+
+    Robots released to another process while waiting are kept until idle,
+    then their dialogue status is saved to `state_store` by `sweep`.
+
+    Attributes
+    ----------
+    POOL_SIZE : int, maximum number of robots in the pool.
+    IDLE_TIMEOUT : float, seconds before an unused robot is evicted.
+    SWEEP_INTERVAL : float, seconds between two sweeps of idle robots.
+    mailbox : Mailbox
     """
-    robots_pool = {}
+    POOL_SIZE = 10000
+    IDLE_TIMEOUT = 3600.0
+    SWEEP_INTERVAL = 60.0
+    _sweep_pid = None
+    _sweep_lock = threading.Lock()
+    _released = set()  # robot ids released while waiting
+    robots_pool = RobotPool(POOL_SIZE, IDLE_TIMEOUT,
+                            evictable=lambda robot: robot.evictable)
+    state_store = RobotStateStore()
 
     def __init__(self, robot_id, domain_id, domain_name):
+        self.robot_id = robot_id
         self.domain_id = domain_id
         self.domain_name = domain_name
+        self.mailbox = Mailbox()
         self._dm = DialogEngine.get_dm(DMIO(domain_id), "0.1")
+        self._dm.mailbox = self.mailbox
         log.info("CREATE ROBOT: [{0}] of domain [{1}]"
                  .format(robot_id, self.domain_name))
 
     def load_data(self):
         self._dm.load_data()
 
+    @property
+    def evictable(self):
+        return self.mailbox.idle and self._dm.evictable
+
+    @serialized
+    def dump_state(self):
+        """ Return dialogue status of the robot, see `load_state`.  """
+        return self._dump_state()
+
+    def _dump_state(self):
+        return {
+            "domain_id": self.domain_id,
+            "domain_name": self.domain_name,
+            "dm": self._dm.dump_state()
+        }
+
+    @serialized
+    def dump_movable_state(self):
+        """ Return dialogue status like `dump_state`, `None` if the robot is
+        waiting for a timer.
+        """
+        # checked in the mailbox, not changed by other calls of the robot.
+        return self._dump_state() if self._dm.evictable else None
+
+    @serialized
+    def load_state(self, state):
+        """ Restore dialogue status returned by `dump_state`.  """
+        assert(state["domain_id"] == self.domain_id)
+        self._dm.load_state(state["dm"])
+
+    @serialized
     def process_request(self, intent, d_slots, related_slots, sid):
         """ Process question from device.
 
@@ -92,22 +158,18 @@ class DMRobot(object):
             }
         }
 
+    @serialized
     def get_context(self):
         """ Return context for NLU module.
 
         Returns
         -------
-        {
-            "visible_slots": list,
-
-            "visible_intents": list,
-
-            "agents": list
-        }
+        MappingProxyType, read only, see `DialogEngine.get_visible_units`.
 
         """
         return self._dm.get_visible_units()
 
+    @serialized
     def process_slots(self, d_slots, sid):
         """ Process slots input from device
 
@@ -140,6 +202,7 @@ class DMRobot(object):
         """
         pass
 
+    @serialized
     def process_confirm(self, sid, d_confirm):
         """ Process confirm form device.
 
@@ -167,6 +230,7 @@ class DMRobot(object):
         """
         return self._dm.process_confirm(sid, d_confirm)
 
+    @serialized
     def update_slots_by_backend(self, d_slots):
         """ Update by business service.
 
@@ -190,31 +254,54 @@ class DMRobot(object):
         }
 
     @classmethod
-    def get_robot(self, robotid, domain_id, domain_name):
+    def get_robot(self, robotid, domain_id, domain_name, pin=False):
         """ Get a DMRobot instance with device id and it's application id.
 
         If there is no correspond robot instance in the robots buffer,
-        create one. Otherwise, return the buffered one.
+        create one and restore it's dialogue status if it was evicted.
+        Otherwise, return the buffered one.
 
         Parameters
         ----------
         robotid : str, device id.
         domain_id : str, application id.
         domain_name : str, name of domain
+        pin : boolean, if the robot is kept in the pool until `unpin`, so
+            it's not evicted while being used.
 
         Returns
         -------
         DMRobot.
 
         """
-        robot = DMRobot.robots_pool.get(robotid, None)
+        robot = DMRobot.robots_pool.get(robotid, None, pin)
         if robot:
+            # owned again if it was released.
+            DMRobot._released.discard(robotid)
             return robot
         robot = DMRobot(robotid, domain_id, domain_name)
         robot.load_data()
-        DMRobot.robots_pool[robotid] = robot
+        state = DMRobot.state_store.pop(robotid)
+        if state is not None and state["domain_id"] == domain_id:
+            start = time.time()
+            try:
+                robot.load_state(state)
+            except KeyError:
+                # the tree is modified since the robot evicted.
+                log.warning("RESTORE ROBOT FAILED: [{0}]".format(robotid),
+                            exc_info=True)
+                robot = DMRobot(robotid, domain_id, domain_name)
+                robot.load_data()
+            else:
+                DMRobot.robots_pool.record_restore(time.time() - start)
+                log.info("RESTORE ROBOT: [{0}]".format(robotid))
+        DMRobot._add_robot(robotid, robot, pin)
         return robot
 
+    def unpin(self):
+        """ Unpin the robot got with `pin`.  """
+        DMRobot.robots_pool.unpin(self.robot_id, self)
+
     @classmethod
     def reset_robot(self, robotid, domain_id, domain_name):
         """ Delete old robot from buffer and recreate new one.
@@ -227,5 +314,127 @@ class DMRobot(object):
         """
         robot = DMRobot(robotid, domain_id, domain_name)
         robot.load_data()
-        DMRobot.robots_pool[robotid] = robot
+        DMRobot.state_store.delete(robotid)
+        DMRobot._add_robot(robotid, robot)
         return robot
+
+    @classmethod
+    def preload(self, domain_id):
+        """ Compile the `BizTree` of domain without creating a robot, robots
+        created later share it, also in forked processes.
+        """
+        DialogEngine.get_dm(DMIO(domain_id), "0.1").load_data()
+
+    @classmethod
+    def _add_robot(self, robotid, robot, pin=False):
+        DMRobot._save_evicted(DMRobot.robots_pool.put(robotid, robot, pin))
+        DMRobot._start_sweep()
+
+    @classmethod
+    def _save_evicted(self, evicted):
+        for key, robot in evicted:
+            DMRobot.state_store.save(key, robot.dump_state())
+            log.info("EVICT ROBOT: [{0}]".format(key))
+
+    @classmethod
+    def sweep(self):
+        """ Evict idle robots and released robots not waiting any more, their
+        dialogue status is saved.
+        """
+        DMRobot._save_evicted(DMRobot.robots_pool.evict())
+        for robotid in list(DMRobot._released):
+            robot = DMRobot.robots_pool.discard(robotid)
+            if robot is not None:
+                DMRobot._save_evicted([(robotid, robot)])
+            if robotid not in DMRobot.robots_pool:
+                DMRobot._released.discard(robotid)
+
+    @classmethod
+    def _start_sweep(self):
+        """ Schedule sweeping once per process, also in forked ones.  """
+        with DMRobot._sweep_lock:
+            if DMRobot._sweep_pid == os.getpid():
+                return
+            DMRobot._sweep_pid = os.getpid()
+        scheduler.schedule(DMRobot, DMRobot.SWEEP_INTERVAL,
+                           DMRobot._fire_sweep, os.getpid())
+
+    @classmethod
+    def _fire_sweep(self, pid):
+        if pid != os.getpid():
+            # scheduled before forking.
+            return
+        # timer thread is not blocked by saving robots.
+        Mailbox.executor().submit(DMRobot._sweep_periodically)
+
+    @classmethod
+    def _sweep_periodically(self):
+        try:
+            DMRobot.sweep()
+        except Exception:
+            log.exception("SWEEP_ERROR")
+        scheduler.schedule(DMRobot, DMRobot.SWEEP_INTERVAL,
+                           DMRobot._fire_sweep, os.getpid())
+
+    @serialized
+    def release(self):
+        """ Cancel pending timer before the robot is discarded.  """
+        self._dm.release()
+
+    @classmethod
+    def release_robots(self, owned):
+        """ Remove robots not owned any more from the pool, to be adopted by
+        another process.
+
+        Robots waiting for a timer or used are kept until idle, then saved to
+        `state_store` by `sweep`, where the new owner restores them.
+
+        Parameters
+        ----------
+        owned : function, `owned(robotid)` returns if the robot is kept.
+
+        Returns
+        -------
+        {robotid: state}, dialogue status of removed robots.
+
+        """
+        states = {}
+        for robotid, robot in DMRobot.robots_pool.items():
+            if owned(robotid):
+                DMRobot._released.discard(robotid)
+                continue
+            state = None
+            if not DMRobot.robots_pool.pinned(robotid):
+                state = robot.dump_movable_state()
+            if state is None:
+                log.warning("KEEP WAITING ROBOT: [{0}]".format(robotid))
+                DMRobot._released.add(robotid)
+                continue
+            states[robotid] = state
+        # removed after all dumped, so no robot is lost if dumping fails.
+        for robotid in states:
+            robot = DMRobot.robots_pool.pop(robotid)
+            if robot is not None:
+                robot.release()
+        return states
+
+    @classmethod
+    def adopt_robot(self, robotid, state):
+        """ Add a robot with dialogue status released by another process.
+
+        Raises
+        ------
+        KeyError, the tree is modified since the robot released.
+
+        """
+        robot = DMRobot(robotid, state["domain_id"], state["domain_name"])
+        robot.load_data()
+        robot.load_state(state)
+        DMRobot.state_store.delete(robotid)
+        DMRobot._add_robot(robotid, robot)
+        return robot
+
+    @classmethod
+    def stats(self):
+        """ Return counters of the robots pool, see `RobotPool.stats`.  """
+        return DMRobot.robots_pool.stats()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+
+class Timer(object):
+    """ Handle of a call scheduled by `TimerScheduler`.
+
+    Attributes
+    ----------
+    owner : object, instance that start the timer.
+    deadline : float, time to call the function, as `time.time()`.
+    cancelled : boolean, if the timer is cancelled.
+    """
+    def __init__(self, scheduler, owner, deadline, function, args, kwargs):
+        self.owner = owner
+        self.deadline = deadline
+        self.cancelled = False
+        self._scheduler = scheduler
+        self._function = function
+        self._args = args
+        self._kwargs = kwargs
+
+    def cancel(self):
+        """ Cancel the timer in O(1), the entry is dropped lazily.  """
+        self._scheduler.cancel(self)
+
+    def fire(self):
+        self._function(*self._args, **self._kwargs)
+
+
+class TimerScheduler(object):
+    """ Process-wide timer, all timers are dispatched by one thread.
+
+    Timers are kept in a heap ordered by deadline, so the number of threads
+    stays constant however many `DialogEngine` instances are waiting.
+
+    Attributes
+    ----------
+    COMPACT_THRESHOLD : int
+        Minimum cancelled timers in the heap before rebuilding it.
+    """
+    COMPACT_THRESHOLD = 1024
+
+    def __init__(self):
+        self._heap = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._cancelled = 0
+
+    def schedule(self, owner, seconds, function, *args, **kwargs):
+        """ Call `function` after `seconds`.
+
+        Parameters
+        ----------
+        owner : object, instance that start the timer.
+        seconds : float, time interval of the timer in seconds.
+        function : funtion, handle function to call.
+        *args : tuple, args for the handle function.
+        **kwargs : dict, kwargs for the handle function.
+
+        Returns
+        -------
+        Timer.
+
+        """
+        timer = Timer(self, owner, time.time() + seconds,
+                      function, args, kwargs)
+        with self._condition:
+            heapq.heappush(self._heap,
+                           (timer.deadline, next(self._counter), timer))
+            if self._thread is None or not self._thread.is_alive():
+                # also restart the dispatcher in forked processes.
+                self._thread = threading.Thread(target=self._dispatch,
+                                                name="TimerScheduler")
+                self._thread.daemon = True
+                self._thread.start()
+            self._condition.notify()
+        return timer
+
+    def cancel(self, timer):
+        """ Cancel a timer, ignored if it's fired or cancelled already. """
+        with self._condition:
+            if timer.cancelled:
+                return
+            timer.cancelled = True
+            self._cancelled += 1
+            if self._cancelled > self.COMPACT_THRESHOLD and\
+                    self._cancelled * 2 > len(self._heap):
+                self._heap = [c for c in self._heap if not c[2].cancelled]
+                heapq.heapify(self._heap)
+                self._cancelled = 0
+
+    def __len__(self):
+        return len(self._heap) - self._cancelled
+
+    def _next_timer(self):
+        with self._condition:
+            while True:
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+                deadline, _, timer = self._heap[0]
+                if timer.cancelled:
+                    heapq.heappop(self._heap)
+                    self._cancelled -= 1
+                    continue
+                delta = deadline - time.time()
+                if delta > 0:
+                    self._condition.wait(delta)
+                    continue
+                heapq.heappop(self._heap)
+                # fired timer can't be cancelled any more.
+                timer.cancelled = True
+                return timer
+
+    def _dispatch(self):
+        while True:
+            timer = self._next_timer()
+            try:
+                timer.fire()
+            except Exception:
+                log.exception("TIMER_ERROR {0}".format(timer.owner))
+
+
+scheduler = TimerScheduler()
+
+__all__ = ["Timer", "TimerScheduler", "scheduler"]
@@ -18,6 +18,8 @@ class TopicController(object):
     """"""
     def __init__(self):
         self.stack = None
+        self.biz_tree = None
+        self.context = None
 
     def ancestor_in_stack(self, unit):
         temp = unit  # inlcude itself
@@ -78,14 +80,27 @@ class TopicController(object):
             ancestor.parent.trigger_child = ancestor
             return ancestor.parent
 
-    def trigger_bizunit(self, visible_agents):
+    def trigger_bizunit(self, visible_agents, visible_rank):
+        """ Trigger the visible agent of top priority satisfied by context.
+
+        Only agents indexed by assigned slots of context are checked.
+
+        Parameters
+        ----------
+        visible_agents : OrderedSet, `UnitSpec` of visible agents.
+        visible_rank : dict, priority of visible agents.
+
+        """
         # 如果多个，都执行，就需要多个反馈，可能需要主动推送功能。
         # 目前只支持返回一个。
-        for bizunit in visible_agents:
-            if not isinstance(bizunit, Agent):
-                continue
-            if not bizunit.satisfied():
+        index = self.biz_tree.tree.trigger_index
+        candidates = [agent for agent in index.candidates(self.context)
+                      if agent in visible_rank]
+        candidates.sort(key=visible_rank.get)
+        for spec in candidates:
+            if not spec.satisfied(self.context):
                 continue
+            bizunit = self.biz_tree.get_unit(spec)
             log.debug("Init Trigger: {0}".format(bizunit))
             new_focus = self.hierarchy_trigger(bizunit)
             # Remove units not in the hierarchy path,
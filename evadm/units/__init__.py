@@ -1,5 +1,5 @@
 
 from evadm.units.agent import Agent, TargetAgent, TriggerAgent
-from evadm.units.bizunit import BizUnit
+from evadm.units.bizunit import BizUnit, State
 from evadm.units.agency import Agency, ClusterAgency, TargetAgency, MixAgency
 from evadm.units.abnormal import AbnormalHandler, DefaultHandlerAgent
@@ -30,8 +30,8 @@ class AbnormalHandler(BizUnit):
         data = {
             'trigger_slots': []
         }
-        super(AbnormalHandler, self).__init__(dm, 'AbnormalHandler',
-                                              'AbnormalHandler', data)
+        super(AbnormalHandler, self).__init__(
+            dm, self.compile('AbnormalHandler', 'AbnormalHandler', data))
         self.set_state(BizUnit.STATUS_TRIGGERED)
         self.parent = None
         self.target_slots = []
@@ -62,8 +62,8 @@ class AbnormalHandler(BizUnit):
     def _execute(self):
         log.debug("EXECUTE AbnormalHandler({0})".format(self.handler.tag))
         if self._child_activated:
-            self._mark_abnormal_unit(
-                self._dm.stack, self._dm.biz_tree, self._dm.stack._items[-2])
+            self._mark_abnormal_unit(self._dm.stack,
+                                     self._dm.stack._items[-2])
             self._dm.stack.pop()
             self.set_state(BizUnit.STATUS_TREEWAIT)
             return self.state
@@ -74,11 +74,11 @@ class AbnormalHandler(BizUnit):
         self._child_activated = True
         return self.state
 
-    def _mark_abnormal_unit(self, stack, tree, abnormal_unit):
+    def _mark_abnormal_unit(self, stack, abnormal_unit):
         """
         Mark the abnormal unit and it's Agency parent ABNORMAL.
         """
-        parent = tree.parent(abnormal_unit.identifier)
+        parent = abnormal_unit.parent
         for unit in reversed(stack._items[:-1]):
             if unit == abnormal_unit or\
                     unit == parent and not parent.is_root():
@@ -97,9 +97,8 @@ class DefaultHandlerAgent(Agent):
             'id': 'default_handler',
             'target_slots': [],
         })
-        self._trigger_slots = []
-        self._target_slots = []
-        super(DefaultHandlerAgent, self).__init__(dm, data["id"], data)
+        super(DefaultHandlerAgent, self).__init__(
+            dm, self.compile(data["id"], data["id"], data))
 
     def _execute(self):
         if self.state == BizUnit.STATUS_TRIGGERED:
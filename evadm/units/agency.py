@@ -25,9 +25,9 @@ class Agency(BizUnit):
     TYPE_MIX = "TYPE_MIX"
     TYPE_ROOT = "TYPE_ROOT"
 
-    def __init__(self, dm, tag, data):
-        super(Agency, self).__init__(dm, data["id"], tag, data)
-        self.type = data['type']
+    def __init__(self, dm, spec):
+        super(Agency, self).__init__(dm, spec)
+        self.type = self.data['type']
         self._handler_finished = False
         self._trigger_child = None
         self.api_slot_keys = []
@@ -36,16 +36,16 @@ class Agency(BizUnit):
         return self.tag.encode('utf8')
 
     @classmethod
-    def get_agency(self, dm, tag, data):
-        """ A factory method, return required instance of Agency subclass.  """
+    def compile_agency(self, tag, data):
+        """ A factory method, return spec of required Agency subclass.  """
         if data['type'] == Agency.TYPE_ROOT:
-            return Agency(dm, tag, data)
+            return Agency.compile(data["id"], tag, data)
         elif data['type'] == Agency.TYPE_CLUSTER:
-            return ClusterAgency(dm, tag, data)
+            return ClusterAgency.compile(data["id"], tag, data)
         elif data['type'] == Agency.TYPE_TARGET:
-            return TargetAgency(dm, tag, data)
+            return TargetAgency.compile(data["id"], tag, data)
         elif data['type'] == Agency.TYPE_MIX:
-            return MixAgency(dm, tag, data)
+            return MixAgency.compile(data["id"], tag, data)
         else:
             log.error(data)
             assert(False)
@@ -71,6 +71,21 @@ class Agency(BizUnit):
             log.info("RESET remote slot {0}".format(key))
         self.api_slot_keys = []
 
+    def dump_state(self):
+        state = super(Agency, self).dump_state()
+        state.update({
+            "trigger_child": self._dump_unit(self._trigger_child),
+            "handler_finished": self._handler_finished,
+            "api_slot_keys": list(self.api_slot_keys)
+        })
+        return state
+
+    def load_state(self, state):
+        super(Agency, self).load_state(state)
+        self._trigger_child = self._load_unit(state["trigger_child"])
+        self._handler_finished = state["handler_finished"]
+        self.api_slot_keys = list(state["api_slot_keys"])
+
     @property
     def trigger_child(self):
         """
@@ -89,16 +104,26 @@ class Agency(BizUnit):
 
     @property
     def children(self):
-        for child in self._dm.biz_tree.children(self.identifier):
-            yield child
+        for spec in self.spec.children:
+            yield self._dm.biz_tree.get_unit(spec)
 
 
 class ClusterAgency(Agency):
     """
     A local controller always with one child of type `TriggerAgent`.
     """
-    def __init__(self, dm, tag, data):
-        super(ClusterAgency, self).__init__(dm, tag, data)
+    def __init__(self, dm, spec):
+        super(ClusterAgency, self).__init__(dm, spec)
+        self._child_activated = False
+
+    def dump_state(self):
+        state = super(ClusterAgency, self).dump_state()
+        state["child_activated"] = self._child_activated
+        return state
+
+    def load_state(self, state):
+        super(ClusterAgency, self).load_state(state)
+        self._child_activated = state["child_activated"]
 
     @property
     def trigger_child(self):
@@ -131,19 +156,29 @@ class TargetAgency(Agency):
     ----------
     target_slots : [Slot]
     """
-    def __init__(self, dm, tag, data):
-        super(TargetAgency, self).__init__(dm, tag, data)
+    def __init__(self, dm, spec):
+        super(TargetAgency, self).__init__(dm, spec)
         self.event_id = ""
         self._timer = None
         self._target_slots = set()
         self._context = None
+        self.active_child = None
+
+    def dump_state(self):
+        state = super(TargetAgency, self).dump_state()
+        state["active_child"] = self._dump_unit(self.active_child)
+        return state
+
+    def load_state(self, state):
+        super(TargetAgency, self).load_state(state)
+        self.active_child = self._load_unit(state["active_child"])
 
     @property
     def target_slots(self):
         """ Slots to filled by `TargetAgent` children.  """
         if self._target_slots:
             return self._target_slots
-        for child in self.children:
+        for child in self.spec.children:
             for c in child.target_slots:
                 self._target_slots.add(Slot(c.key, None))
         return self._target_slots
@@ -152,8 +187,8 @@ class TargetAgency(Agency):
     def context(self):
         if self._context:
             return self._context
-        for child in self.children:
-            if isinstance(child, TriggerAgent):
+        for child in self.spec.children:
+            if child.is_a(TriggerAgent):
                 for slot in child.trigger_slots:
                     if slot.key == "intent":
                         self._context = {
@@ -171,7 +206,7 @@ class TargetAgency(Agency):
                 self.set_state(BizUnit.STATUS_TRIGGERED)
         elif isinstance(self.active_child, TriggerAgent):
             self.set_state(BizUnit.STATUS_DELAY_EXIST)
-            self._execute_condition.add(BizUnit.STATUS_DELAY_EXIST)
+            self.add_execute_condition(BizUnit.STATUS_DELAY_EXIST)
         self.active_child = None
 
     def restore_topic_and_focus(self):
@@ -180,13 +215,13 @@ class TargetAgency(Agency):
         """
         assert(self.state in [BizUnit.STATUS_WAIT_TARGET,
                               BizUnit.STATUS_DELAY_EXIST])
-        self._execute_condition.add(self.state)
+        self.add_execute_condition(self.state)
 
     def _execute(self):
         self._dm.context.update_slot_by_value("intent", self.context["intent"])
         log.debug("EXECUTE TargetAgency({0})".format(self.tag))
         if self.state == BizUnit.STATUS_DELAY_EXIST:
-            self._execute_condition.remove(BizUnit.STATUS_DELAY_EXIST)
+            self.remove_execute_condition(BizUnit.STATUS_DELAY_EXIST)
             if self._dm.countdown_unit != self:
                 self._dm.reset_countdown_round()
                 log.debug(
@@ -207,7 +242,7 @@ class TargetAgency(Agency):
             # when swtiched back, context could be cleared by some unit share
             # same slots,  so none child could be triggered
             self.set_state(BizUnit.STATUS_DELAY_EXIST)
-            self._execute_condition.add(BizUnit.STATUS_DELAY_EXIST)
+            self.add_execute_condition(BizUnit.STATUS_DELAY_EXIST)
             log.info(self._dm.stack)
             log.info(self._dm.context)
         return {}
@@ -277,8 +312,8 @@ class MixAgency(Agency):
     """
     An local controller for scope control purpose.
     """
-    def __init__(self, dm, tag, data):
-        super(MixAgency, self).__init__(dm, tag, data)
+    def __init__(self, dm, spec):
+        super(MixAgency, self).__init__(dm, spec)
 
     def restore_focus_after_child_done(self):
         """
@@ -287,19 +322,19 @@ class MixAgency(Agency):
         if self.state == BizUnit.STATUS_ABNORMAL:
             return
         self.set_state(BizUnit.STATUS_DELAY_EXIST)
-        self._execute_condition.add(BizUnit.STATUS_DELAY_EXIST)
+        self.add_execute_condition(BizUnit.STATUS_DELAY_EXIST)
 
     def restore_topic_and_focus(self):
         """ see :meth:`~evadm.units.bizunit.BizUnit.restore_topic_and_focus`
 
         """
         assert(self.state == BizUnit.STATUS_DELAY_EXIST)
-        self._execute_condition.add(self.state)
+        self.add_execute_condition(self.state)
 
     def _execute(self):
         log.debug("EXECUTE MixAgency({0})".format(self.tag))
         if self.state == BizUnit.STATUS_DELAY_EXIST:
-            self._execute_condition.remove(BizUnit.STATUS_DELAY_EXIST)
+            self.remove_execute_condition(BizUnit.STATUS_DELAY_EXIST)
             if self._dm.countdown_unit != self:
                 self._dm.reset_countdown_round()
                 log.debug(
@@ -3,7 +3,7 @@
 
 import json
 import logging
-from evadm.units.bizunit import BizUnit
+from evadm.units.bizunit import BizUnit, UnitSpec
 from evadm.context import Slot
 
 log = logging.getLogger(__name__)
@@ -29,13 +29,17 @@ class Agent(BizUnit):
 
     """
 
-    def __init__(self, dm, tag, data):
+    def __init__(self, dm, spec):
+        self.children = []
+        super(Agent, self).__init__(dm, spec)
+
+    @classmethod
+    def compile(cls, identifier, tag, data):
         try:
             filtered_data = {   # 用于tree.to_json(), 方便调试。
                 'timeout': float(data['timeout']),
                 'entrance': data['entrance'],
                 'response_id': data['response_id'],
-                'state': BizUnit.STATUS_TREEWAIT,
                 'trigger_slots': data['trigger_slots'],
                 'target_slots': data['target_slots'],
                 'optional_slots': data.get('optional_slots', [])
@@ -43,14 +47,12 @@ class Agent(BizUnit):
         except KeyError as e:
             log.error(data)
             raise e
-        self._trigger_slots = list(
-            self._deserialize_trigger_slots(filtered_data))
-        self._target_slots = list(
-            self._deserialize_target_slots(filtered_data))
-        self.children = []
-        super(Agent, self).__init__(dm, data["id"], tag, filtered_data)
+        return UnitSpec(cls, identifier, tag, filtered_data,
+                        cls._deserialize_trigger_slots(filtered_data),
+                        cls._deserialize_target_slots(filtered_data))
 
-    def _deserialize_trigger_slots(self, data):
+    @staticmethod
+    def _deserialize_trigger_slots(data):
         for kv in data['trigger_slots']:
             split_index = kv.find('=')
             key = kv[0: split_index]
@@ -58,25 +60,25 @@ class Agent(BizUnit):
             optional = key in data['optional_slots']
             yield Slot(key, value, optional)
 
-    def _deserialize_target_slots(self, data):
+    @staticmethod
+    def _deserialize_target_slots(data):
         for key in data['target_slots']:
             yield Slot(key)
 
     @classmethod
-    def get_agent(self, dm, tag, data):
-        """ Create and return a instance of subclass of Agent.
+    def compile_agent(self, tag, data):
+        """ Compile and return the spec of required subclass of Agent.
 
         Parameters
         ----------
-        dm : DialogEngine
         tag : str, Readable identifier of bizunit.
         data : dict.
 
         """
         if data["target_slots"] != []:
-            return TargetAgent(dm, tag, data)
+            return TargetAgent.compile(data["id"], tag, data)
         elif data["trigger_slots"] != []:
-            return TriggerAgent(dm, tag, data)
+            return TriggerAgent.compile(data["id"], tag, data)
         assert(False)
 
     def on_confirm(self):
@@ -100,77 +102,56 @@ class Agent(BizUnit):
         """
         Return if all the trigger slots is satisfied.
         """
-        return all(
-            [self._dm.context.satisfied(c)for c in self.trigger_slots])
+        return self.spec.satisfied(self._dm.context)
 
     @property
     def intent(self):
-        if hasattr(self, "_intent"):
-            return self._intent
-        for slot in self.trigger_slots:
-            if slot.key == "intent":
-                self._intent = slot.value
-                return self._intent
+        return self.spec.intent
 
     @property
     def subject(self):
         return self.data['subject']
 
-    @subject.setter
-    def subject(self, value):
-        self.data['subject'] = value
-
     @property
     def scope(self):
         return self.data['scope']
 
-    @scope.setter
-    def scope(self, value):
-        self.data['scope'] = value
-
     @property
     def response_id(self):
         return self.data['response_id']
 
-    @response_id.setter
-    def response_id(self, value):
-        self.data['response_id'] = value
-
     @property
     def timeout(self):
         return self.data['timeout']
 
-    @timeout.setter
-    def timeout(self, value):
-        self.data['timeout'] = value
-
     @property
     def entrance(self):
         return self.data['entrance']
 
     @property
     def trigger_slots(self):
-        return self._trigger_slots
+        return self.spec.trigger_slots
 
     @property
     def target_slots(self):
-        return self._target_slots
+        return self.spec.target_slots
 
     def __str__(self):
-        return json.dumps(self.data)
+        return json.dumps(dict(self.data, state=str(self.state)))
 
 
 class TargetAgent(Agent):
-    def __init__(self, dm, tag, data):
-        super(TargetAgent, self).__init__(dm, tag, data)
-        assert(self._trigger_slots and self._target_slots)
+    @classmethod
+    def compile(cls, identifier, tag, data):
+        spec = super(TargetAgent, cls).compile(identifier, tag, data)
+        assert(spec.trigger_slots and spec.target_slots)
+        return spec
 
     def target_completed(self):
         """
         If all target slots filled.
         """
-        return all([self._dm.context.dirty(c.key)
-                    for c in self.target_slots])
+        return self.spec in self._dm.context.completed_agents
 
     def target_clean(self):
         """ If all target slots clean.
@@ -188,7 +169,7 @@ class TargetAgent(Agent):
             self.set_state(BizUnit.STATUS_ACTION_COMPLETED)
         elif self.state == BizUnit.STATUS_WAIT_TARGET:
             # waiting target again.
-            self._execute_condition.add(BizUnit.STATUS_WAIT_TARGET)
+            self.add_execute_condition(BizUnit.STATUS_WAIT_TARGET)
 
     def _execute(self):
         log.debug("EXECUTE TargetAgent({0})".format(self.tag))
@@ -200,7 +181,7 @@ class TargetAgent(Agent):
             log.debug("START_ACTION_TIMER TargetAgent({0})".format(self.tag))
 
         elif self.state == BizUnit.STATUS_WAIT_TARGET:
-            self._execute_condition.remove(BizUnit.STATUS_WAIT_TARGET)
+            self.remove_execute_condition(BizUnit.STATUS_WAIT_TARGET)
             if self._dm.countdown_unit != self:
                 self._dm.reset_countdown_round()
                 log.debug(
@@ -218,13 +199,15 @@ class TargetAgent(Agent):
         assert(self.state == Agent.STATUS_WAIT_ACTION_CONFIRM)
         self.set_state(BizUnit.STATUS_WAIT_TARGET)
         log.debug("WAIT_INPUT Agent({0})".format(self.tag))
-        self._execute_condition.add(BizUnit.STATUS_WAIT_TARGET)
+        self.add_execute_condition(BizUnit.STATUS_WAIT_TARGET)
 
 
 class TriggerAgent(Agent):
-    def __init__(self, dm, tag, data):
-        super(TriggerAgent, self).__init__(dm, tag, data)
-        assert(self._trigger_slots)
+    @classmethod
+    def compile(cls, identifier, tag, data):
+        spec = super(TriggerAgent, cls).compile(identifier, tag, data)
+        assert(spec.trigger_slots)
+        return spec
 
     def restore_topic_and_focus(self):
         assert(self.state == BizUnit.STATUS_WAIT_ACTION_CONFIRM)
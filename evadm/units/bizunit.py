@@ -1,50 +1,186 @@
 #!/usr/bin/env python
 # encoding: utf-8
 
+import enum
 import treelib
 import logging
 
 log = logging.getLogger(__name__)
 
 
-class BizUnit(treelib.Node):
+class State(enum.IntEnum):
+    """ Dialogue status of `BizUnit`, formatted with it's readable name. """
+    STACKWAIT = 0  # 栈中等待状态
+    TREEWAIT = 1
+    CANDICATE = 2
+    TRIGGERED = 3
+    ACTION_COMPLETED = 4
+    ABNORMAL = 5
+    WAIT_ACTION_CONFIRM = 6
+    WAIT_TARGET = 7
+    TARGET_COMPLETED = 8
+    AGENCY_COMPLETED = 9
+    DELAY_EXIST = 10
+
+    @property
+    def bit(self):
+        return 1 << self.value
+
+    def __str__(self):
+        return "STATUS_" + self.name
+
+    def __format__(self, spec):
+        return format(str(self), spec)
+
+    @staticmethod
+    def mask(*states):
+        """ Return bitmask of the states. """
+        value = 0
+        for state in states:
+            value |= 1 << state
+        return value
+
+
+class UnitSpec(treelib.Node):
+    """
+    Immutable description of a bizunit, compiled once per domain and shared
+    by all `DialogEngine` instances of the domain.
+
+    Attributes
+    -----------
+    unit_class : type, Subclass of `BizUnit` instantiated for each robot.
+    index : int, Index of the node in `topology`.
+    topology : Topology, Flat topology of the tree, `None` if the spec is
+        not in a tree.
+    trigger_slots : [Slot], Slots that could trigger the agent.
+    target_slots : [Slot], Slots that the agent will fill.
+    target_keys : frozenset, Distinct keys of `target_slots`.
+    """
+    def __init__(self, unit_class, identifier, tag, data,
+                 trigger_slots=(), target_slots=()):
+        super(UnitSpec, self).__init__(tag, identifier, data=data)
+        self.unit_class = unit_class
+        self.index = -1
+        self.topology = None
+        self.trigger_slots = list(trigger_slots)
+        self.target_slots = list(target_slots)
+        self.target_keys = frozenset([c.key for c in self.target_slots])
+        self.intent = None
+        for slot in self.trigger_slots:
+            if slot.key == "intent":
+                self.intent = slot.value
+                break
+
+    @property
+    def parent(self):
+        """ Parent node in the tree, `None` for root. """
+        if self.topology is None:
+            return None
+        return self.topology.parent(self.index)
+
+    @property
+    def children(self):
+        """ Children nodes in the tree. """
+        if self.topology is None:
+            return []
+        return self.topology.children(self.index)
+
+    @property
+    def depth(self):
+        """ Depth of the node, `0` for root. """
+        if self.topology is None:
+            return 0
+        return self.topology.depths[self.index]
+
+    @property
+    def ancestors(self):
+        """ The node and it's ancestors excluding root, bottom up. """
+        if self.topology is None:
+            return ()
+        return self.topology.ancestors[self.index]
+
+    def is_root(self):
+        """ If is the root node of the tree.  """
+        return self.topology is None or self.topology.parents[self.index] < 0
+
+    def is_a(self, unit_class):
+        """ If units created from the spec are instances of `unit_class`. """
+        return issubclass(self.unit_class, unit_class)
+
+    def satisfied(self, context):
+        """ Return if all the trigger slots is satisfied by `context`. """
+        return all([context.satisfied(c) for c in self.trigger_slots])
+
+
+class BizUnit(object):
     """
     Base class of all business dealing unit.
 
+    Static configuration is shared by `spec`, the unit itself only holds the
+    dialogue status of a robot.
+
     Attributes
     -----------
+    spec : UnitSpec, Shared configuration of the unit.
+    EXECUTE_CONDITION : int, Bitmask of default transferable states.
+    POP_CONDITION : int, Bitmask of completed states.
+    _execute_condition : int, Bitmask of transferable states of the unit,
+        initialized with `EXECUTE_CONDITION`.
 
     """
-    STATUS_STACKWAIT = "STATUS_STACKWAIT"  # 栈中等待状态
-    STATUS_TREEWAIT = "STATUS_TREEWAIT"
-    STATUS_CANDICATE = "STATUS_CANDICATE"
-    STATUS_TRIGGERED = "STATUS_TRIGGERED"
-    STATUS_ACTION_COMPLETED = "STATUS_ACTION_COMPLETED"
-    STATUS_ABNORMAL = "STATUS_ABNORMAL"
-    STATUS_WAIT_ACTION_CONFIRM = "STATUS_WAIT_ACTION_CONFIRM"
-    STATUS_WAIT_TARGET = "STATUS_WAIT_TARGET"
-    STATUS_TARGET_COMPLETED = "STATUS_TARGET_COMPLETED"
-    STATUS_AGENCY_COMPLETED = "STATUS_AGENCY_COMPLETED"
-    STATUS_DELAY_EXIST = "STATUS_DELAY_EXIST"
-
-    def __init__(self, dm, identifier, tag, data):
-        super(BizUnit, self).__init__(tag, identifier, data=data)
+    STATUS_STACKWAIT = State.STACKWAIT
+    STATUS_TREEWAIT = State.TREEWAIT
+    STATUS_CANDICATE = State.CANDICATE
+    STATUS_TRIGGERED = State.TRIGGERED
+    STATUS_ACTION_COMPLETED = State.ACTION_COMPLETED
+    STATUS_ABNORMAL = State.ABNORMAL
+    STATUS_WAIT_ACTION_CONFIRM = State.WAIT_ACTION_CONFIRM
+    STATUS_WAIT_TARGET = State.WAIT_TARGET
+    STATUS_TARGET_COMPLETED = State.TARGET_COMPLETED
+    STATUS_AGENCY_COMPLETED = State.AGENCY_COMPLETED
+    STATUS_DELAY_EXIST = State.DELAY_EXIST
+
+    EXECUTE_CONDITION = State.mask(
+        State.TRIGGERED,
+        State.TARGET_COMPLETED,
+        State.ACTION_COMPLETED,
+        State.ABNORMAL,
+        State.AGENCY_COMPLETED
+    )
+
+    POP_CONDITION = State.mask(
+        State.ACTION_COMPLETED,
+        State.AGENCY_COMPLETED,
+        State.TARGET_COMPLETED
+    )
+
+    def __init__(self, dm, spec):
+        self.spec = spec
         self.parent = None
         self.set_state(self.STATUS_TREEWAIT)
         self._dm = dm
-        self._execute_condition = set([
-            BizUnit.STATUS_TRIGGERED,
-            BizUnit.STATUS_TARGET_COMPLETED,
-            BizUnit.STATUS_ACTION_COMPLETED,
-            BizUnit.STATUS_ABNORMAL,
-            BizUnit.STATUS_AGENCY_COMPLETED
-        ])
-
-        self._pop_condition = set([
-            BizUnit.STATUS_ACTION_COMPLETED,
-            BizUnit.STATUS_AGENCY_COMPLETED,
-            BizUnit.STATUS_TARGET_COMPLETED
-        ])
+        self._execute_condition = self.EXECUTE_CONDITION
+
+    @classmethod
+    def compile(cls, identifier, tag, data):
+        """ Return the shared `UnitSpec` of units of this class. """
+        return UnitSpec(cls, identifier, tag, data)
+
+    @property
+    def identifier(self):
+        return self.spec.identifier
+
+    @property
+    def tag(self):
+        return self.spec.tag
+
+    @property
+    def data(self):
+        return self.spec.data
+
+    def is_root(self):
+        """ If is a root unit.  """
+        return self.parent is None
 
     def transferable(self):
         """ If the node is in a trasferable state.
@@ -52,11 +188,19 @@ class BizUnit(treelib.Node):
         The main routine of DM will call it's `execute` function if it's in
         a transferable focus state.
         """
-        return self.state in self._execute_condition
+        return bool(self._execute_condition >> self._state & 1)
 
     def is_completed(self):
         """ If the node finish executing, should pop out from stack.  """
-        return self.state in self._pop_condition
+        return bool(self.POP_CONDITION >> self._state & 1)
+
+    def add_execute_condition(self, state):
+        """ Make the unit transferable in `state`. """
+        self._execute_condition |= state.bit
+
+    def remove_execute_condition(self, state):
+        """ Make the unit not transferable in `state`. """
+        self._execute_condition &= ~state.bit
 
     def is_abnormal(self):
         """ If the unit in the ABNORMAL state.  """
@@ -77,12 +221,30 @@ class BizUnit(treelib.Node):
         """
         raise NotImplementedError
 
+    def dump_state(self):
+        """ Return dialogue status of the unit, see `load_state`.  """
+        return {
+            "state": int(self._state),
+            "execute_condition": self._execute_condition
+        }
+
+    def load_state(self, state):
+        """ Restore dialogue status returned by `dump_state`.  """
+        self._state = State(state["state"])
+        self._execute_condition = state["execute_condition"]
+
+    def _dump_unit(self, unit):
+        return None if unit is None else unit.identifier
+
+    def _load_unit(self, identifier):
+        if identifier is None:
+            return None
+        return self._dm.biz_tree.get_node(identifier)
+
     @property
     def state(self):
-        return self.data['state']
+        return self._state
 
     def set_state(self, value):
         """ Set unit state. """
-        self.data['state'] = value
-
-
+        self._state = value
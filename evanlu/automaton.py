@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import logging
+from collections import deque
+
+log = logging.getLogger(__name__)
+
+
+class Automaton(object):
+    """ Aho-Corasick automaton, find occurrences of many words in one pass.
+
+    Words are added with a payload by `add`, then compiled by `build`.
+    A word added several times keeps all it's payloads.
+
+    Attributes
+    ----------
+    _goto : [dict], `{char: state}` transitions of each state.
+    _fail : [int], failure transition of each state.
+    _ends : [list], `[(length, payload)]` of words ending at each state.
+    _output : [list], `_ends` including words of failure states.
+    """
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._ends = [[]]
+        self._output = [[]]
+        self._words = 0
+        self._built = True
+
+    def add(self, word, payload=None):
+        """ Add a word, empty word is ignored.  """
+        if not word:
+            return
+        state = 0
+        for char in word:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._ends.append([])
+            state = next_state
+        self._ends[state].append((len(word), payload))
+        self._words += 1
+        self._built = False
+
+    def build(self):
+        """ Compute failure transitions, invoked after words added.  """
+        self._output = list(self._ends)
+        queue = deque()
+        for state in self._goto[0].values():
+            self._fail[state] = 0
+            queue.append(state)
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(char, 0)
+                self._fail[next_state] = fail
+                if self._output[fail]:
+                    self._output[next_state] = \
+                        self._output[next_state] + self._output[fail]
+        self._built = True
+        return self
+
+    def iter(self, text):
+        """ Iterate all occurrences of words in text, overlapped included.
+
+        Yields
+        ------
+        (start, end, payload), `text[start:end]` is the word.
+
+        """
+        assert(self._built)
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        state = 0
+        for i, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for length, payload in output[state]:
+                yield i + 1 - length, i + 1, payload
+
+    def search(self, text, longest=False):
+        """ Return occurrences of words in text.
+
+        Parameters
+        ----------
+        text : str
+        longest : boolean, If only keep leftmost longest occurrences which
+            are not overlapped.
+
+        Returns
+        -------
+        [(start, end, payload)], ordered by position.
+
+        """
+        hits = list(self.iter(text))
+        if longest:
+            return longest_matches(hits)
+        hits.sort(key=lambda c: (c[0], c[1]))
+        return hits
+
+    def contains(self, text):
+        """ If any word occurs in text.  """
+        for _ in self.iter(text):
+            return True
+        return False
+
+    def __len__(self):
+        return self._words
+
+
+def longest_matches(hits):
+    """ Select leftmost longest occurrences which are not overlapped.
+
+    All payloads of a selected word are kept.
+
+    Parameters
+    ----------
+    hits : [(start, end, payload)]
+
+    Returns
+    -------
+    [(start, end, payload)], ordered by position.
+
+    """
+    hits = sorted(hits, key=lambda c: (c[0], -c[1]))
+    selected = []
+    end = -1
+    span = None
+    for hit in hits:
+        if span == hit[:2]:
+            selected.append(hit)
+        elif hit[0] >= end:
+            selected.append(hit)
+            span = hit[:2]
+            end = hit[1]
+    return selected
+
+
+__all__ = ["Automaton", "longest_matches"]
@@ -1,5 +1,6 @@
 #!/usr/bin/env python
 # encoding: utf-8
+import json
 import logging
 import os
 import pandas
@@ -7,8 +8,8 @@ import pandas
 from collections import namedtuple
 from evanlu.config import ConfigData
 from evanlu.util import PROJECT_DIR
-from evanlp.util import get_stopwords
 from evanlu.io import SearchIO
+from evanlu.normalize import normalizer
 from evanlp.classifier.question_classifier import QuestionClassfier
 
 log = logging.getLogger(__name__)
@@ -18,11 +19,7 @@ LabelData = namedtuple('LabelData', 'label, question, treenode')
 
 
 def remove_stopwords(question):
-    words = []
-    for w in question:
-        if w not in get_stopwords():
-            words.append(w)
-    return ''.join(words)
+    return normalizer.remove_stopwords(question)
 
 
 class QuestionSearch(object):
@@ -46,7 +43,7 @@ class QuestionSearch(object):
         tuple ([IntentQuestion], float) : Return candicate agents list and
                                           the label confidence.
         """
-        normalized_question = remove_stopwords(question)
+        normalized_question = normalizer.normalize(question).search_key
         objects = self._io.search(normalized_question)
         return objects, 1
 
@@ -58,19 +55,53 @@ class QuestionSearch(object):
         label_data : [(label, question)]
             labled question
         """
-        self._io.save(label_data)
+        self._io.save(self._normalize(label_data))
+
+    def append(self, label_data):
+        """ Add labeled questions without retraining.  """
+        self._io.append(self._normalize(label_data))
+
+    def _normalize(self, label_data):
+        # questions are saved normalized as they're searched.
+        return [data._replace(question=normalizer.normalize(
+            data.question, cached=False).search_key) for data in label_data]
 
 
 
 class FuzzyClassifier(object):
+    """
+    Classify question by algorithm model.
+
+    Attributes
+    ----------
+    _labels : set, Labels of trained questions, saved with the model and
+        loaded with it, `None` for models trained without them.
+    """
     def __init__(self, domain_id, algorithm):
         self._domain_id = domain_id
         self._identifier = str(domain_id + "_biz")
         self._classifier = QuestionClassfier.get_classifier(algorithm)
+        self._labels = set()
+        self._load_model()
+
+    def _load_model(self):
         model_fname = os.path.join(ConfigData.model_data_path,
                                    self._identifier)
         if not self._classifier.load_model(model_fname):
             log.warning("Model has not been trained.")
+        try:
+            with open(model_fname + ".labels", "r") as f:
+                # also keys of `{label: [treenode]}` saved before.
+                self._labels = set(json.load(f))
+        except FileNotFoundError:
+            # trained before labels were saved, labels are not checked.
+            self._labels = None
+
+    def _save_labels(self, label_data, model_fname):
+        labels = sorted(set(data[0] for data in label_data))
+        with open(model_fname + ".labels", "w") as f:
+            json.dump(labels, f, ensure_ascii=False)
+        self._labels = set(labels)
 
     def train(self, label_data):
         """ Train model with algorithm and save model to file.
@@ -94,6 +125,7 @@ class FuzzyClassifier(object):
         model_fname = os.path.join(ConfigData.model_data_path,
                                    self._identifier)
         self._classifier.save_model(model_fname)
+        self._save_labels(label_data, model_fname)
         # self._classifier.load_model(model_fname)
         # summary = self._classifier.evaluation(self._classifier.x_valid,
         #                                       self._classifier.y_valid)
@@ -108,13 +140,37 @@ class FuzzyClassifier(object):
 
         Returns
         -------
-        tuple ([IntentQuestion], float) : Return candicate agents list and
-                                          the label confidence.
+        tuple ([str], float) : Return candicate labels and the label
+                               confidence, labels not trained are dropped
+                               if labels of the model are saved.
 
         """
         label, confidence = self._classifier.predict(question)
-        objects = IntentTreeNode.objects(domain=self._domain_id, label=label)
-        return objects, confidence
+        return self._resolve(label), confidence
+
+    def predict_many(self, questions):
+        """ Classify questions with algorithm model one by one, the model
+        has no batch prediction.
+
+        Parameters
+        ----------
+        questions : [str], Questions inputted by users.
+
+        Returns
+        -------
+        [([str], float)], Result of each question, see `predict`.
+
+        """
+        rst = []
+        for question in questions:
+            label, confidence = self._classifier.predict(question)
+            rst.append((self._resolve(label), confidence))
+        return rst
+
+    def _resolve(self, label):
+        if self._labels is None:
+            return [label]
+        return [label] if label in self._labels else []
 
 
 class BizChatClassifier(FuzzyClassifier):
@@ -128,10 +184,7 @@ class BizChatClassifier(FuzzyClassifier):
         self._domain_id = domain_id
         self._identifier = str(domain_id + "casual")
         self._classifier = QuestionClassfier.get_classifier(algorithm)
-        model_fname = os.path.join(ConfigData.model_data_path,
-                                   self._identifier)
-        if not self._classifier.load_model(model_fname):
-            log.warning("Model has not been trained.")
+        self._load_model()
 
     def train(self, label_data):
         biz_chat_data = []
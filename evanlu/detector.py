@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import hashlib
+import logging
+import threading
+import time
+
+from evadm.cache import LRUCache
+
+log = logging.getLogger(__name__)
+
+
+class Detector(object):
+    """ Entity detector loaded from a script of the domain.
+
+    A script is executed in it's own namespace and defines:
+
+        def setup():
+            # optional, invoked once after loaded, precompute patterns and
+            # tables here.
+            ...
+
+        def detect(text):
+            # return value of the entity, or None.
+            ...
+
+    Detectors are cached by name and hash of the script, so reloading an
+    unchanged script neither executes it nor runs `setup` again.
+
+    `strikes` calls in a row taking longer than `budget` seconds make the
+    detector skipped for `cooldown` seconds, so a single call delayed by
+    other threads doesn't.  Skipped calls are logged and return `None`.
+    Exceptions raised by `detect` are logged and return `None` too.
+
+    Attributes
+    ----------
+    BUDGET : float, Default time budget of a call.
+    COOLDOWN : float, Default seconds a slow detector is skipped.
+    STRIKES : int, Default number of slow calls in a row before skipped.
+    CACHE_SIZE : int, Maximum number of cached detectors.
+    cache : LRUCache, `{(name, digest): Detector}`
+    name : str, Entity name, like `@sys.date`.
+    digest : str, Hash of the script.
+    calls : int, Count of calls, skipped ones excluded.
+    errors : int, Count of calls raised exceptions.
+    skips : int, Count of calls skipped.
+    total_time : float, Seconds spent in calls.
+    max_time : float, Maximum seconds of a call.
+    """
+    BUDGET = 0.05
+    COOLDOWN = 60.0
+    STRIKES = 3
+    CACHE_SIZE = 1024
+    cache = LRUCache(CACHE_SIZE)
+    _cache_lock = threading.Lock()
+
+    def __init__(self, name, script, budget=BUDGET, cooldown=COOLDOWN,
+                 strikes=STRIKES):
+        """
+        Parameters
+        ----------
+        name : str, Entity name.
+        script : str, Source code.
+        budget : float
+        cooldown : float
+        strikes : int
+
+        Raises
+        ------
+        Exceptions raised by compiling, executing or `setup` of the script.
+
+        """
+        self.name = name
+        self.digest = script_digest(script)
+        self.budget = budget
+        self.cooldown = cooldown
+        self.strikes = strikes
+        self.calls = 0
+        self.errors = 0
+        self.skips = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self._skip_until = 0.0
+        self._slow_calls = 0  # slow calls in a row
+        self._namespace = {"__name__": name, "__file__": name}
+        exec(compile(script, name, "exec"), self._namespace)
+        setup = self._namespace.get("setup")
+        if setup is not None:
+            setup()
+        self._detect = self._namespace.get("detect")
+        if self._detect is None:
+            log.warning("DETECTOR_WITHOUT_DETECT {0}".format(name))
+
+    @classmethod
+    def load(self, name, script):
+        """ Return detector of the script, reuse the cached one if the
+        script is not changed.
+        """
+        key = (name, script_digest(script))
+        with self._cache_lock:
+            detector = self.cache.get(key)
+            if detector is None:
+                detector = self(name, script)
+                self.cache.put(key, detector)
+        return detector
+
+    def detect(self, text):
+        """ Return value of the entity in text, `None` if not detected.  """
+        if self._detect is None:
+            return None
+        start = time.time()
+        if start < self._skip_until:
+            self.skips += 1
+            log.warning("SKIP_DETECTOR {0}".format(self.name))
+            return None
+        try:
+            return self._detect(text)
+        except Exception:
+            self.errors += 1
+            log.exception("DETECTOR_ERROR {0}".format(self.name))
+            return None
+        finally:
+            elapsed = time.time() - start
+            self.calls += 1
+            self.total_time += elapsed
+            self.max_time = max(self.max_time, elapsed)
+            if elapsed <= self.budget:
+                self._slow_calls = 0
+            else:
+                self._slow_calls += 1
+                log.info("SLOW_CALL {0} {1:.3f}s".format(self.name, elapsed))
+                if self._slow_calls >= self.strikes:
+                    self._slow_calls = 0
+                    self._skip_until = start + elapsed + self.cooldown
+                    log.warning("SLOW_DETECTOR {0} {1} calls over {2}s, "
+                                "skipped for {3}s".format(
+                                    self.name, self.strikes, self.budget,
+                                    self.cooldown))
+
+    def stats(self):
+        """ Return counters of the detector.
+
+        Returns
+        -------
+        {
+            "name": str,
+            "calls": int,
+            "errors": int,
+            "skips": int,
+            "avg_time": float,  // seconds
+            "max_time": float
+        }
+
+        """
+        return {
+            "name": self.name,
+            "calls": self.calls,
+            "errors": self.errors,
+            "skips": self.skips,
+            "avg_time": self.total_time / self.calls if self.calls else 0.0,
+            "max_time": self.max_time
+        }
+
+
+def script_digest(script):
+    return hashlib.sha1(script.encode("utf-8")).hexdigest()
+
+
+__all__ = ["Detector"]
@@ -1,7 +1,10 @@
 #!/usr/bin/env python
 # encoding: utf-8
 import logging
-from evanlp.ner import KeyWordEntity
+from evanlu.automaton import Automaton, longest_matches
+from evanlu.detector import Detector
+from evanlu.normalize import fold_width
+from evanlu.system_entity import system_entities
 log = logging.getLogger(__name__)
 
 
@@ -26,31 +29,51 @@ class EntityRecognizer(object):
                     "value_name2": ["word1", "word2", ..]
                 }
             }
-    _detector_funcs : dict,
-        dict of entity detect function.
+    _detectors : dict,
+        `{entity_name: Detector}` of entities detected by scripts.
+    _system : SystemEntityEngine, built-in `@sys` entities, which are
+        overridden by dictionaries and scripts of the same name.
+    _automaton : Automaton, words of all entities, with payload
+        `(entity_name, index of value, value_name)`.
+    match_policy : str,
+        `MATCH_ALL`, a value is recognized if any of it's words occurs.
+        `MATCH_LONGEST`, words overlapped by a longer word of requested
+        entities are ignored.
+        If several values of an entity are recognized, the last one in
+        `_entities` is chosen.
     """
-    def __init__(self, io):
+    MATCH_ALL = "MATCH_ALL"
+    MATCH_LONGEST = "MATCH_LONGEST"
+
+    def __init__(self, io, match_policy=MATCH_ALL, system=system_entities):
         self._entities = {}
-        self._detector_funcs = {}
+        self._detectors = {}
+        self._system = system
+        self._automaton = Automaton()
+        self.match_policy = match_policy
         self._io = io
 
     def init_entities(self):
-        def detect(text):
-            return []
         result = self._io.get_entities_with_value()
         self._entities = result["entities"]
-        name_space = {}
+        self._automaton = Automaton()
+        for entity_name, values in self._entities.items():
+            for i, (value_name, words) in enumerate(values.items()):
+                for word in words:
+                    # matched with normalized questions.
+                    self._automaton.add(fold_width(word),
+                                        (entity_name, i, value_name))
+        self._automaton.build()
+        detectors = {}
         for name, script in result["scripts"].items():
-            code = compile(script, name, "exec")
-            exec(code, name_space)
-            func = name_space.get("detect", None)
-            if name in self._detector_funcs:
+            if name in detectors:
                 log.warning("重复的脚本名 :{0}".format(name))
-            self._detector_funcs[name] = func
+            detectors[name] = Detector.load(name, script)
+        self._detectors = detectors
 
     @staticmethod
-    def get_entity_recognizer(io):
-        entity = EntityRecognizer(io)
+    def get_entity_recognizer(io, match_policy="MATCH_ALL"):
+        entity = EntityRecognizer(io, match_policy)
         entity.init_entities()
         return entity
 
@@ -68,17 +91,41 @@ class EntityRecognizer(object):
 
         """
         entities = {}
+        values = self._recognize_values(question, entity_names)
         for entity_name in entity_names:
             if entity_name in self._entities:
-                values = self._entities[entity_name]
-                for value_name, value_pattern in values.items():
-                    ret = KeyWordEntity.recognize(question, value_pattern)
-                    if ret:
-                        entities[entity_name] = value_name
+                if entity_name in values:
+                    entities[entity_name] = values[entity_name][1]
             else:
-                detect_func = self._detector_funcs[entity_name]
-                value = detect_func(question)
+                if entity_name in self._detectors:
+                    value = self._detectors[entity_name].detect(question)
+                elif entity_name in self._system.names:
+                    value = self._system.detect(question, entity_name)
+                else:
+                    raise KeyError(entity_name)
                 if value is not None:
                     entities[entity_name] = value
 
         return entities
+
+    def detector_stats(self):
+        """ Return counters of detectors, see `Detector.stats`.  """
+        return [detector.stats() for detector in self._detectors.values()]
+
+    def _recognize_values(self, question, entity_names):
+        """ Recognize values of dictionary entities in one pass.
+
+        Returns
+        -------
+        dict, `{entity_name: (index of value, value_name)}`.
+
+        """
+        names = set(entity_names)
+        hits = [c for c in self._automaton.iter(question) if c[2][0] in names]
+        if self.match_policy == self.MATCH_LONGEST:
+            hits = longest_matches(hits)
+        values = {}
+        for _, _, (entity_name, index, value_name) in hits:
+            if index >= values.get(entity_name, (-1, None))[0]:
+                values[entity_name] = (index, value_name)
+        return values
@@ -1,6 +1,8 @@
 #!/usr/bin/env python
 # encoding: utf-8
 #from evanlu.model import IntentQuestion
+from evanlu.automaton import Automaton
+from evanlu.normalize import fold_width
 
 
 class NonSenseFilter(object):
@@ -22,10 +24,11 @@ class NonSenseFilter(object):
         return nonsense
 
     def init_words(self):
-        """ Initialize nonsense words
+        """ Initialize nonsense words, folded as normalized questions.
 
         """
-        self._words = self._io.get_not_nonsense_words()
+        self._words = set(fold_width(word)
+                          for word in self._io.get_not_nonsense_words())
 
     def detect(self, question):
         """ Check if question is nonsense text.
@@ -48,9 +51,14 @@ class NonSenseFilter(object):
 class SensitiveFilter(object):
     """
     Detect sensitive words from question.
+
+    Words are compiled into an `Automaton`, so a question is scanned once
+    however many words there are.  Calling `init_words` again reloads words
+    and replaces the automaton as a whole.
     """
     def __init__(self, io):
         self._words = []
+        self._automaton = Automaton()
         self._io = io
 
     @staticmethod
@@ -60,10 +68,15 @@ class SensitiveFilter(object):
         return sensitive
 
     def init_words(self):
-        """ Initialize sensitive  words
+        """ Initialize sensitive  words, folded as normalized questions.
 
         """
-        self._words = self._io.get_sensitive_words()
+        words = self._io.get_sensitive_words()
+        automaton = Automaton()
+        for word in words:
+            automaton.add(fold_width(word), word)
+        automaton.build()
+        self._words, self._automaton = words, automaton
 
     def detect(self, question):
         """ Check if question contains sensitive words.
@@ -78,7 +91,20 @@ class SensitiveFilter(object):
         weather question contain sensitive words : boolean
 
         """
-        for word in self._words:
-            if word in question:
-                return True
-        return False
+        return self._automaton.contains(question)
+
+    def find(self, question):
+        """ Return sensitive words in question with their spans.
+
+        Parameters
+        ----------
+        question : str
+            Dialogue text.
+
+        Returns
+        -------
+        [(start, end, word)], `question[start:end]` is the word, overlapped
+        words are included.
+
+        """
+        return self._automaton.search(question)
@@ -2,17 +2,32 @@
 # encoding: utf-8
 import logging
 import jieba
-from evanlp.ner import KeyWordEntity
 
 from evanlu.classifier import (
     QuestionSearch,
     FuzzyClassifier,
     BizChatClassifier
 )
+from evanlu.normalize import normalizer
 
 log = logging.getLogger(__name__)
 
 
+def get_intent_map(agents):
+    """ Return `{intent: (priority, node identifier)}` of visible agents.
+
+    Parameters
+    ----------
+    agents : [(tag, intent, node identifier)], Visible agents ordered by
+        priority.
+
+    """
+    intent_map = {}
+    for i, (tag, intent, node_id) in enumerate(agents):
+        intent_map.setdefault(intent, (i, node_id))
+    return intent_map
+
+
 class IntentRecognizer(object):
     """
     Recognize intent from question.
@@ -135,23 +150,32 @@ class IntentRecognizer(object):
             log.info("FILTERED INTENT: [{0}]".format(objects[0]))
         return intent, confidence, node_id
 
-    def rule_classify(self, context, question):
-        question = question.lower()
+    def rule_classify(self, context, question, rules):
+        """ Classify question by rules, given specific context.
+
+        Parameters
+        ----------
+        context : dict, Context information from DM, used to filter invisible
+                        agents.
+        question : str, Dialogue text from user.
+        rules : RuleClassifier, Rules of the domain.
+
+        Returns
+        -------
+        (label, confidence, node_id) : (str, float, int)
+
+        """
+        question = normalizer.normalize(question).folded
         confidence = 1
-        objects = []
-        intents = {
-            "search": ["利率", "失业率", "interest rate", "unemployment"],
-            "search_event": ["伊朗", "iran"],
-            "correlation_analysis": ["相关", "影响", "correlation", "impact", "effect"]
-        }
-        for label, keywords in intents.items():
-            result = KeyWordEntity.recognize(question, keywords)
-            if len(result) > 0:
-                objects = [label]
+        objects = rules.classify(question)
         if objects:
-            log.info("RULE CLASSIFY to [{0}]".format(objects[0]))
-        intent, node_id = self._get_valid_intent(context, objects)
-        return intent, confidence, node_id
+            log.info("RULE CLASSIFY to {0}".format(objects))
+        # the first visible label by rule priority, not by agent priority.
+        for label in objects:
+            intent, node_id = self._get_valid_intent(context, [label])
+            if intent is not None:
+                return intent, confidence, node_id
+        return None, confidence, None
 
     def fuzzy_classify(self, context, question):
         """ Classify question by algorithm model, given specific context.
@@ -167,24 +191,60 @@ class IntentRecognizer(object):
         (label, confidence, node_id) : (str, float, int)
 
         """
-        objects, confidence = self._biz_chat_classifier.predict(question)
-        if len(objects) == 0 or objects[0].label == 'casual_talk':
-            return('casual_talk', confidence, None)
-        objects, confidence = self._biz_classifier.predict(question)
-        label, node_id = self._get_valid_intent(context, objects)
-        return(label, confidence, node_id)
+        return self.fuzzy_classify_many([(context, question)])[0]
+
+    def fuzzy_classify_many(self, items):
+        """ Classify questions by algorithm model, questions of business are
+        classified by the business model after all are classified to
+        business or casual talk, see `FuzzyClassifier.predict_many`.
+
+        Parameters
+        ----------
+        items : [(context, question)]
+
+        Returns
+        -------
+        [(label, confidence, node_id)], Result of each item.
+
+        """
+        questions = [question for _, question in items]
+        rst = []
+        biz = []
+        for i, (objects, confidence) in enumerate(
+                self._biz_chat_classifier.predict_many(questions)):
+            rst.append(('casual_talk', confidence, None))
+            if objects and objects[0] != 'casual_talk':
+                biz.append(i)
+        predictions = self._biz_classifier.predict_many(
+            [questions[i] for i in biz]) if biz else []
+        for i, (objects, confidence) in zip(biz, predictions):
+            label, node_id = self._get_valid_intent(items[i][0], objects)
+            rst[i] = (label, confidence, node_id)
+        return rst
 
     def _get_valid_intent(self, context, intents):
         """
         Filter intents agents by context, ending with one label.
+
+        Parameters
+        ----------
+        context : dict, `{intent: (priority, node identifier)}` of visible
+            agents, see `get_intent_map`.
+        intents : [str], Candidate intents.
+
+        Returns
+        -------
+        (label, node_id), of the visible agent with highest priority.
+
         """
         if not intents:
             return None, None
-        for unit in context:
-            for intent in intents:
-                # TODO remove useless tag filed
-                tag, intent_, node_id_ = tuple(unit)
-                if intent == intent_:
-                    return intent, node_id_
-        log.info("NO VISIBLE AGENTS SATISFIED!")
-        return None, None
+        valid = None
+        for intent in intents:
+            item = context.get(intent)
+            if item is not None and (valid is None or item[0] < valid[1][0]):
+                valid = intent, item
+        if valid is None:
+            log.info("NO VISIBLE AGENTS SATISFIED!")
+            return None, None
+        return valid[0], valid[1][1]
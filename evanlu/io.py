@@ -2,10 +2,13 @@
 import json
 import os
 import logging
+import sqlite3
+import threading
 
 from evanlu.testing import LabeledData
 from evanlu.util import PROJECT_DIR
 from evanlu.config import ConfigData
+from evanlu.normalize import normalizer
 from evadm.io import DMFileIO
 
 log = logging.getLogger(__name__)
@@ -26,6 +29,27 @@ class NLUFileIO(object):
     def domain_id(self):
         return self._domain_id
 
+    def get_source_files(self):
+        """ Return paths of files loaded in `DomainSnapshot`.
+
+        Returns
+        -------
+        [str]
+        """
+        paths = [
+            os.path.join(self._project_path, "intent", "intent.json"),
+            os.path.join(self._project_path, "intent", "rules.json"),
+            os.path.join(self._project_path, "sensitive.txt"),
+            os.path.join(self._project_path, "not_nonsense.txt")
+        ]
+        for dir_path in [os.path.join(self._project_path, "entity"),
+                         os.path.join(self._sys_path, "entity")]:
+            for path, dirs, files in os.walk(dir_path):
+                for file_name in sorted(files):
+                    if file_name.endswith("txt") or file_name.endswith("py"):
+                        paths.append(os.path.join(path, file_name))
+        return paths
+
     def get_sensitive_words(self):
         """
 
@@ -48,6 +72,20 @@ class NLUFileIO(object):
         words = [line.rstrip('\n') for line in open(path)]
         return words
 
+    def get_rules(self):
+        """
+
+        Returns
+        -------
+        list of classify rules, see `RuleClassifier`, `None` if the domain
+        has no rule file.
+        """
+        path = os.path.join(self._project_path, "intent", "rules.json")
+        if not os.path.isfile(path):
+            return None
+        with open(path, "r") as file:
+            return json.load(file)
+
     def get_all_intent_entities(self):
         """
 
@@ -186,6 +224,7 @@ class FileSearchIO(object):
         with open(self._model_path, "w") as f:
             for data in labeled_data:
                 f.write("{0}@{1}\n".format(data.label, data.question))
+        self._caches = {}
 
     def search(self, question):
         if self._caches:
@@ -201,7 +240,145 @@ class FileSearchIO(object):
         return rst
 
 
+class SqliteSearchIO(object):
+    """ Exact match index from normalized question to labels, stored in a
+    sqlite database shared by processes.
+
+    Searching is a primary key lookup on the memory mapped database, so
+    nothing is loaded per process and trained questions are visible to all
+    processes once committed.  Questions trained by `FileSearchIO` are
+    imported once, normalized as `QuestionSearch` saves them, when the
+    database is never trained.
+
+    Attributes
+    ----------
+    MMAP_SIZE : int, Bytes of the database mapped to memory.
+    """
+    MMAP_SIZE = 256 * 1024 * 1024
+    SCHEMA = [
+        "CREATE TABLE IF NOT EXISTS meta "
+        "(key TEXT PRIMARY KEY, value INTEGER)",
+        "CREATE TABLE IF NOT EXISTS question "
+        "(question TEXT NOT NULL, label TEXT NOT NULL)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS question_label "
+        "ON question (question, label)"
+    ]
+
+    def __init__(self, domain_id, path=None):
+        """
+        Parameters
+        ----------
+        domain_id : str
+        path : str, path of the database, `None` to use `<domain_id>.db`
+            under the model data path in config.  Questions are imported
+            from `<domain_id>.txt` in the same directory.
+        """
+        self._domain_id = domain_id
+        self._model_path = path if path is not None else os.path.join(
+            ConfigData.model_data_path, domain_id + ".db")
+        self._file_path = os.path.join(os.path.dirname(self._model_path),
+                                       domain_id + ".txt")
+        self._local = threading.local()
+
+    @property
+    def _conn(self):
+        """ Connection of current thread, reopened in forked processes.  """
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self._model_path, timeout=30,
+                                   isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA mmap_size={0}".format(self.MMAP_SIZE))
+            for sql in self.SCHEMA:
+                conn.execute(sql)
+            self._import_file(conn)
+            local.conn = conn
+            local.pid = os.getpid()
+        return local.conn
+
+    @property
+    def version(self):
+        """ Training version, increased by each `save` or `append`, 0 if
+        never trained.
+        """
+        row = self._conn.execute(
+            "SELECT value FROM meta WHERE key = 'version'").fetchone()
+        return 0 if row is None else row[0]
+
+    def _import_file(self, conn):
+        """ Import questions saved by `FileSearchIO` if never trained.  """
+        if not os.path.exists(self._file_path) or conn.execute(
+                "SELECT 1 FROM meta WHERE key = 'version'").fetchone():
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # checked again, another process may import it first.
+            if conn.execute(
+                    "SELECT 1 FROM meta WHERE key = 'version'").fetchone():
+                conn.execute("ROLLBACK")
+                return
+            with open(self._file_path, "r") as f:
+                rows = []
+                for line in f.readlines():
+                    label, question = line.rstrip("\n").split(
+                        FileSearchIO.SEP)
+                    # saved raw, normalized as `QuestionSearch` saves them.
+                    rows.append((normalizer.normalize(
+                        question, cached=False).search_key, label))
+            conn.executemany(
+                "INSERT OR IGNORE INTO question (question, label) "
+                "VALUES (?, ?)", rows)
+            conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('version', 1)")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        log.info("IMPORT SEARCH FILE: [{0}] {1} questions".format(
+            self._file_path, len(rows)))
+
+    def _write(self, labeled_data, replace):
+        conn = self._conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if replace:
+                conn.execute("DELETE FROM question")
+            conn.executemany(
+                "INSERT OR IGNORE INTO question (question, label) "
+                "VALUES (?, ?)",
+                [(data.question, data.label) for data in labeled_data])
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES "
+                "('version', COALESCE((SELECT value FROM meta "
+                "WHERE key = 'version'), 0) + 1)")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def save(self, labeled_data):
+        """ Replace trained questions atomically.
+
+        Parameters
+        ----------
+        labeled_data : [(lable, question, node_id]
+            labled questions with node id in the project intent tree.
+        """
+        self._write(labeled_data, True)
+
+    def append(self, labeled_data):
+        """ Add labeled questions to trained ones.  """
+        self._write(labeled_data, False)
+
+    def search(self, question):
+        """ Return labels of the question in trained order.  """
+        rows = self._conn.execute(
+            "SELECT label FROM question WHERE question = ? ORDER BY rowid",
+            (question,)).fetchall()
+        return [row[0] for row in rows]
+
+
 IO = NLUFileIO
-SearchIO = FileSearchIO
+SearchIO = SqliteSearchIO
 
-__all__ = ["IO", "SearchIO", "NLUFileIO", "FileSearchIO"]
+__all__ = ["IO", "SearchIO", "NLUFileIO", "FileSearchIO", "SqliteSearchIO"]
@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import logging
+from collections import namedtuple
+
+from evanlp.util import get_stopwords
+from evadm.cache import LRUCache
+
+log = logging.getLogger(__name__)
+
+
+NormalizedQuestion = namedtuple("NormalizedQuestion",
+                                "raw text folded search_key")
+NormalizedQuestion.__doc__ = """ Views of a normalized question.
+
+Attributes
+----------
+raw : str, question inputted by user.
+text : str, full width characters folded and whitespaces trimmed, used by
+    entity recognition and filters.
+folded : str, `text` in lower case, used by rule classification.
+search_key : str, `folded` without stopwords, used by question search.
+"""
+
+# full width ASCII characters and ideographic space to half width.
+WIDTH_TABLE = dict((c, c - 0xFEE0) for c in range(0xFF01, 0xFF5F))
+WIDTH_TABLE[0x3000] = 0x20
+
+
+def fold_width(text):
+    """ Return `text` with full width characters folded and whitespaces
+    trimmed, as `NormalizedQuestion.text`.  Dictionary words are folded by
+    it, so they match normalized questions.
+    """
+    return text.translate(WIDTH_TABLE).strip()
+
+
+class Normalizer(object):
+    """ Normalize question once, results are cached since questions from
+    devices repeat heavily.
+
+    Attributes
+    ----------
+    CACHE_SIZE : int, Maximum number of cached questions.
+    cache : LRUCache, `{question: NormalizedQuestion}`
+    """
+    CACHE_SIZE = 4096
+
+    def __init__(self, stopwords=get_stopwords, maxsize=CACHE_SIZE):
+        """
+        Parameters
+        ----------
+        stopwords : function, returns stopwords, invoked once when first
+            used.
+        maxsize : int, Maximum number of cached questions.
+        """
+        self._stopwords = stopwords
+        self._stopword_table = None
+        self.cache = LRUCache(maxsize)
+
+    @property
+    def stopword_table(self):
+        """ Translation table deleting stopwords of one character.  """
+        if self._stopword_table is None:
+            self._stopword_table = dict.fromkeys(
+                [ord(w) for w in self._stopwords() if len(w) == 1])
+        return self._stopword_table
+
+    def remove_stopwords(self, text):
+        return text.translate(self.stopword_table)
+
+    def normalize(self, question, cached=True):
+        """ Return normalized views of question.
+
+        Parameters
+        ----------
+        question : str
+        cached : boolean, If look up and save result in `cache`.
+
+        Returns
+        -------
+        NormalizedQuestion.
+
+        """
+        if cached:
+            normalized = self.cache.get(question)
+            if normalized is not None:
+                return normalized
+        text = fold_width(question)
+        folded = text.lower()
+        normalized = NormalizedQuestion(question, text, folded,
+                                        self.remove_stopwords(folded))
+        if cached:
+            self.cache.put(question, normalized)
+        return normalized
+
+
+normalizer = Normalizer()
+
+
+def normalize(question):
+    """ Normalize question by the shared `normalizer`.  """
+    return normalizer.normalize(question)
+
+
+__all__ = ["NormalizedQuestion", "Normalizer", "normalizer", "normalize",
+           "fold_width"]
@@ -1,43 +1,86 @@
 import logging
-from evanlu.intent import IntentRecognizer
-from evanlu.filter import NonSenseFilter, SensitiveFilter
-from evanlu.entity import EntityRecognizer
+import threading
+from evanlu.intent import IntentRecognizer, get_intent_map
 from evanlu.io import IO, NLUFileIO
+from evanlu.normalize import normalizer
+from evanlu.snapshot import DomainSnapshot, SnapshotWatcher
+from evadm.pool import RobotPool
 
 log = logging.getLogger(__name__)
 
 
 class NLURobot(object):
-    robots = {}
+    """ Every NLURobot instance corresponds to a domain.
+
+    Robots of domains are buffered in a bounded pool, evicted robots are
+    initialized again when used.  Data of domain is kept in a
+    `DomainSnapshot`, which is reloaded by `watcher` when files changed.
 
-    """
-    
     Attributes
     ----------
+    POOL_SIZE : int, maximum number of robots in the pool.
+    IDLE_TIMEOUT : float, seconds before an unused robot is evicted.
+    RELOAD_INTERVAL : float, seconds between checks of domain files.
+    FUZZY_CLASSIFY : boolean, if classify questions not matched by question
+        search or rules with algorithm models.
     _io : NLUFileIO
-    
+    _snapshot : DomainSnapshot
+
     """
+    POOL_SIZE = 1000
+    IDLE_TIMEOUT = 3600.0
+    RELOAD_INTERVAL = 5.0
+    FUZZY_CLASSIFY = False
+    robots = RobotPool(POOL_SIZE, IDLE_TIMEOUT)
+    watcher = SnapshotWatcher(lambda: NLURobot.robots.values(),
+                              RELOAD_INTERVAL)
+
     def __init__(self, io: NLUFileIO):
         self.domain_id = io.domain_id
         log.info("CREATE NLU ROBOT: {0}".format(io.domain_id))
-        self._nonsense = None
-        self._sensitive = None
-        self._entity = None
+        self._snapshot = None
         self._intent = None
         self._filtered_intents = ["casual_talk", "sensitive", "nonsense"]
-        self._entities_by_intent = {
-            "casual_talk": [],
-            "sensitive": [],
-            "nonsense": [],
-        }
         self._io = io
+        self._reload_lock = threading.Lock()
 
     def init(self):
-        self._nonsense = NonSenseFilter.get_filter(self._io)
-        self._sensitive = SensitiveFilter.get_filter(self._io)
-        self._entity = EntityRecognizer.get_entity_recognizer(self._io)
+        self._snapshot = DomainSnapshot.load(self._io)
         self._intent = IntentRecognizer.get_intent_recognizer(self._io)
-        self._entities_by_intent = self._io.get_all_intent_entities()
+
+    @property
+    def version(self):
+        """ Version of the domain snapshot. """
+        return self._snapshot.version
+
+    @property
+    def reloaded_at(self):
+        """ Loading time of the domain snapshot, as `time.time()`. """
+        return self._snapshot.loaded_at
+
+    def reload(self):
+        """ Load domain files and replace the snapshot.  """
+        with self._reload_lock:
+            snapshot = DomainSnapshot.load(self._io,
+                                           self._snapshot.version + 1)
+            self._intent.add_custom_words_to_jieba()
+            self._snapshot = snapshot
+        log.info("RELOAD NLU ROBOT: {0} version {1}".format(
+            self.domain_id, snapshot.version))
+        return snapshot
+
+    def reload_if_changed(self):
+        """ Reload the snapshot if domain files are modified.
+
+        Returns
+        -------
+        boolean, if reloaded.
+
+        """
+        if not self._snapshot.changed(self._io):
+            return False
+        self.reload()
+        return True
 
     @classmethod
     def get_robot(cls, domain_id):
@@ -46,14 +89,31 @@ class NLURobot(object):
             return robot
         robot = NLURobot(IO(domain_id))
         robot.init()
-        cls.robots[domain_id] = robot
+        for key, _ in cls.robots.put(domain_id, robot):
+            log.info("EVICT NLU ROBOT: {0}".format(key))
+        cls.watcher.start()
+        return robot
+
+    @classmethod
+    def preload(cls, domain_id):
+        """ Load robot of the domain before forking, `watcher` is not
+        started, forked processes start their own.
+        """
+        if domain_id in cls.robots:
+            return cls.robots.get(domain_id)
+        robot = NLURobot(IO(domain_id))
+        robot.init()
+        for key, _ in cls.robots.put(domain_id, robot):
+            log.info("EVICT NLU ROBOT: {0}".format(key))
         return robot
 
     @classmethod
     def reset_robot(cls, domain_id):
         robot = NLURobot(IO(domain_id))
         robot.init()
-        cls.robots[domain_id] = robot
+        for key, _ in cls.robots.put(domain_id, robot):
+            log.info("EVICT NLU ROBOT: {0}".format(key))
+        cls.watcher.start()
         return robot
 
     def train(self):
@@ -101,49 +161,118 @@ class NLURobot(object):
 
         """
         log.info("----------------%s------------------" % question)
+        # normalized once, classifiers get the same result from cache.
+        normalized = normalizer.normalize(question)
+        snapshot = self._snapshot
+        ret = self._predict_by_context(snapshot, context, normalized)
+        if ret is not None:
+            return ret
+        # detect intent and entities
+        priority = self._get_intent_map(context)
+        classified = self._intent_classify(snapshot, priority, normalized)
+        if classified is None:
+            classified = self._intent.fuzzy_classify(priority, question)
+            log.info("FUZZY CLASSIFY to {0} confidence {1}".format(
+                classified[0], classified[1]))
+        return self._predict_result(snapshot, normalized, *classified)
+
+    def predict_many(self, items):
+        """ Return NLU results of questions in a batch, all with the same
+        snapshot.
 
-        # when context given, detect entities
+        Questions not classified by the earlier stages are classified by
+        the algorithm model after the others, see
+        `FuzzyClassifier.predict_many`.
+
+        Parameters
+        ----------
+        items : [(context, question)]
+
+        Returns
+        -------
+        [dict], result of `predict` of each item.
+
+        """
+        snapshot = self._snapshot
+        rst = []
+        fuzzy = []  # [(index, intent map, normalized)]
+        for context, question in items:
+            normalized = normalizer.normalize(question)
+            ret = self._predict_by_context(snapshot, context, normalized)
+            if ret is None:
+                priority = self._get_intent_map(context)
+                classified = self._intent_classify(snapshot, priority,
+                                                   normalized)
+                if classified is None:
+                    fuzzy.append((len(rst), priority, normalized))
+                else:
+                    ret = self._predict_result(snapshot, normalized,
+                                               *classified)
+            rst.append(ret)
+        if fuzzy:
+            classified = self._fuzzy_classify_many(
+                [(priority, normalized.raw) for _, priority, normalized in
+                 fuzzy])
+            log.info("FUZZY CLASSIFY {0} questions".format(len(fuzzy)))
+            for (i, _, normalized), c in zip(fuzzy, classified):
+                rst[i] = self._predict_result(snapshot, normalized, *c)
+        return rst
+
+    def _predict_by_context(self, snapshot, context, normalized):
+        """ Return result if entities of the intent in context are detected,
+        otherwise `None`.
+        """
+        if context["intent"] is None:
+            return None
+        intent2entities = snapshot.intents
+        intent = context["intent"]
+        slots = intent2entities[intent]["slots"]
+        if intent in self._filtered_intents:
+            entities = []
+        else:
+            entities = intent2entities[intent]["slots"].values()
+        target_slots = intent2entities[intent]["slots"].keys()
+        d_entities = snapshot.entity.recognize(normalized.text, entities)
+        slots = {v: k for k, v in slots.items()}
+        slot_values = {}
+        for entity, value in d_entities.items():
+            slot_values[slots[entity]] = value
+        if not slot_values:
+            return None
+        return {
+            "question": normalized.raw,
+            "intent": intent,
+            "confidence": 1.0,
+            "entities": slot_values,
+            "target_entities": target_slots,
+            "node_id": None
+        }
+
+    def _get_intent_map(self, context):
+        # precomputed by DM, built from agents for other clients.
+        priority = context.get("intent_map")
+        if priority is None:
+            priority = get_intent_map(context["agents"])
+        return priority
+
+    def _predict_result(self, snapshot, normalized, s_intent, confidence,
+                        node_id):
+        """ Detect entities of the classified intent.  """
         slot_values = {}
-        intent2entities = self._io.get_all_intent_entities()
-        if context["intent"] is not None:
-            intent = context["intent"]
-            slots = intent2entities[intent]["slots"]
-            if intent in self._filtered_intents:
-                entities = []
-            else:
-                entities = self._entities_by_intent[intent]["slots"].values()
-            target_slots = self._entities_by_intent[intent]["slots"].keys()
-            d_entities = self._entity.recognize(question, entities)
-            slots = {v: k for k, v in slots.items()}
-            for entity, value in d_entities.items():
-                slot_values[slots[entity]] = value
-            if slot_values:
-                return {
-                    "question": question,
-                    "intent": intent,
-                    "confidence": 1.0,
-                    "entities": slot_values,
-                    "target_entities": target_slots,
-                    "node_id": None
-                }
-        priority = context["agents"]
-        # detect intent and entities
-        s_intent, confidence, node_id = self._intent_classify(priority,
-                                                              question)
         target_slots = []
         if s_intent and s_intent not in self._filtered_intents:
-            slots = intent2entities[s_intent]["slots"]
+            slots = snapshot.intents[s_intent]["slots"]
             target_slots = list(slots.keys())
             assert len(set(slots.values())) == len(slots.values())
-            d_entities = self._entity.recognize(question,
-                                                slots.values())
+            d_entities = snapshot.entity.recognize(normalized.text,
+                                                   slots.values())
             log.debug("ENTITIES DETECT to {0}".format(d_entities))
             slots = {v: k for k, v in slots.items()}
             for entity, value in d_entities.items():
                 slot_values[slots[entity]] = value
 
         return {
-            "question": question,
+            "question": normalized.raw,
             "intent": "casual_talk" if s_intent is None else s_intent,
             "confidence": confidence,
             "entities": slot_values,
@@ -151,9 +280,18 @@ class NLURobot(object):
             "node_id": node_id
         }
 
-    def _intent_classify(self, context, question):
+    def _intent_classify(self, snapshot, context, normalized):
+        """ Classify intent by all stages except the algorithm model.
+
+        Returns
+        -------
+        (intent, confidence, node_id), `None` if the question should be
+        classified by the algorithm model.
+
+        """
+        question = normalized.raw
         log.debug("Sensitive detecting.")
-        if self._sensitive.detect(question):
+        if snapshot.sensitive.detect(normalized.text):
             log.info("FILTERED QUESTION")
             return "sensitive", 1.0, None
 
@@ -163,18 +301,17 @@ class NLURobot(object):
             return intent, confidence, node_id
 
         intent, confidence, node_id = self._intent.rule_classify(
-            context, question)
+            context, question, snapshot.rules)
         if intent:
             return intent, confidence, node_id
 
-        if self._nonsense.detect(question):
+        if snapshot.nonsense.detect(normalized.text):
             log.info("NONSENSE QUESTION")
             return "nonsense", 1.0, None
 
-        return "casual_talk", 1.0, None
+        if not self.FUZZY_CLASSIFY:
+            return "casual_talk", 1.0, None
+        return None
 
-        # intent, confidence, node_id = self._intent.fuzzy_classify(
-        #     context, question)
-        # log.info("FUZZY CLASSIFY to {0} confidence {1}".format(
-        #     intent, confidence))
-        # return intent, confidence, node_id
+    def _fuzzy_classify_many(self, items):
+        return self._intent.fuzzy_classify_many(items)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import logging
+import re
+
+from evanlu.automaton import Automaton
+from evanlu.normalize import fold_width
+
+log = logging.getLogger(__name__)
+
+
+class RuleClassifier(object):
+    """
+    Classify question by keyword and regex rules of the domain.
+
+    Keywords of all rules are compiled into one `Automaton`, so a question
+    is scanned once however many keywords there are.  Regexes are matched
+    one by one, an alternation of them would report only one rule at a
+    position.  Rules are read from `intent/rules.json` of the domain, or
+    `DEFAULT_RULES` if the file doesn't exist:
+
+        [
+            {
+                "label": "search",
+                "priority": 1,          // larger first, default 0
+                "keywords": ["利率"],    // lower case
+                "regex": ["^查一?下"]
+            },
+            ...
+        ]
+
+    Attributes
+    ----------
+    DEFAULT_RULES : list, Rules of domains without rule file.
+    hits : [int], Count of questions matched by each rule.
+    """
+    DEFAULT_RULES = [
+        {
+            "label": "correlation_analysis",
+            "priority": 3,
+            "keywords": ["相关", "影响", "correlation", "impact", "effect"]
+        },
+        {
+            "label": "search_event",
+            "priority": 2,
+            "keywords": ["伊朗", "iran"]
+        },
+        {
+            "label": "search",
+            "priority": 1,
+            "keywords": ["利率", "失业率", "interest rate", "unemployment"]
+        }
+    ]
+
+    def __init__(self, io):
+        self._rules = []
+        self._automaton = Automaton()
+        self._regexes = []
+        self.hits = []
+        self._io = io
+
+    @staticmethod
+    def get_classifier(io):
+        classifier = RuleClassifier(io)
+        classifier.init_rules()
+        return classifier
+
+    def init_rules(self, rules=None):
+        """ Compile rules, read from `io` if not given.
+
+        Raises
+        ------
+        ValueError, rule without label or with invalid regex.
+
+        """
+        if rules is None:
+            rules = self._io.get_rules()
+            if rules is None:
+                rules = self.DEFAULT_RULES
+        # sort by priority, stable for rules of same priority.
+        rules = sorted(rules, key=lambda c: -c.get("priority", 0))
+        automaton = Automaton()
+        regexes = []
+        for i, rule in enumerate(rules):
+            if not rule.get("label"):
+                raise ValueError("rule without label: {0}".format(rule))
+            for keyword in rule.get("keywords", []):
+                automaton.add(fold_width(keyword).lower(), i)
+            for pattern in rule.get("regex", []):
+                try:
+                    regexes.append((i, re.compile(pattern)))
+                except re.error as e:
+                    raise ValueError("invalid regex '{0}' of {1}: {2}".format(
+                        pattern, rule["label"], e))
+        automaton.build()
+        self._rules, self._automaton, self._regexes = \
+            rules, automaton, regexes
+        self.hits = [0] * len(rules)
+
+    def classify(self, question):
+        """ Return labels of rules matched by question.
+
+        Parameters
+        ----------
+        question : str, Normalized question in lower case.
+
+        Returns
+        -------
+        [str], Labels ordered by priority.
+
+        """
+        rules, hits = self._rules, self.hits
+        matched = set(c[2] for c in self._automaton.iter(question))
+        for i, regex in self._regexes:
+            if i not in matched and regex.search(question):
+                matched.add(i)
+        labels = []
+        for i in sorted(matched):
+            hits[i] += 1
+            if rules[i]["label"] not in labels:
+                labels.append(rules[i]["label"])
+        return labels
+
+    def stats(self):
+        """ Return hit counters of rules.
+
+        Returns
+        -------
+        [{"label": str, "priority": int, "hits": int}], Ordered by priority.
+
+        """
+        return [{
+            "label": rule["label"],
+            "priority": rule.get("priority", 0),
+            "hits": hits
+        } for rule, hits in zip(self._rules, self.hits)]
+
+
+__all__ = ["RuleClassifier"]
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import logging
+import os
+import threading
+import time
+
+from evanlu.filter import NonSenseFilter, SensitiveFilter
+from evanlu.entity import EntityRecognizer
+from evanlu.rule import RuleClassifier
+
+log = logging.getLogger(__name__)
+
+
+def scan(paths):
+    """ Return `(path, mtime, size)` of existing files.  """
+    manifest = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            continue
+        manifest.append((path, st.st_mtime_ns, st.st_size))
+    return manifest
+
+
+class DomainSnapshot(object):
+    """ NLU data of a domain, loaded once and shared by requests.
+
+    A snapshot is never modified after loaded, it's replaced as a whole when
+    source files change, so a request always sees consistent data.
+
+    Attributes
+    ----------
+    version : int, Increased by one each reloading.
+    loaded_at : float, Loading time, as `time.time()`.
+    manifest : [(path, mtime, size)], Source files of the snapshot.
+    intents : dict, Entities of intents, see
+        `NLUFileIO.get_all_intent_entities`.
+    entity : EntityRecognizer, Entity dictionaries and detectors.
+    nonsense : NonSenseFilter
+    sensitive : SensitiveFilter
+    rules : RuleClassifier
+    """
+    def __init__(self, version, manifest, intents, entity, nonsense,
+                 sensitive, rules):
+        self.version = version
+        self.loaded_at = time.time()
+        self.manifest = manifest
+        self.intents = intents
+        self.entity = entity
+        self.nonsense = nonsense
+        self.sensitive = sensitive
+        self.rules = rules
+
+    @classmethod
+    def load(cls, io, version=1):
+        """ Load snapshot of the domain from `io`.
+
+        Parameters
+        ----------
+        io : NLUFileIO
+        version : int, Version of the snapshot.
+
+        Returns
+        -------
+        DomainSnapshot.
+
+        """
+        # scan before loading, files modified while loading are reloaded.
+        manifest = scan(io.get_source_files())
+        return cls(version, manifest,
+                   io.get_all_intent_entities(),
+                   EntityRecognizer.get_entity_recognizer(io),
+                   NonSenseFilter.get_filter(io),
+                   SensitiveFilter.get_filter(io),
+                   RuleClassifier.get_classifier(io))
+
+    def changed(self, io):
+        """ If source files are modified since loaded.  """
+        return scan(io.get_source_files()) != self.manifest
+
+
+class SnapshotWatcher(object):
+    """ Reload snapshots in a daemon thread when source files change.
+
+    Attributes
+    ----------
+    interval : float, Seconds between two checks.
+    """
+    def __init__(self, robots, interval=5.0):
+        """
+        Parameters
+        ----------
+        robots : function, returns robots to check, each robot has a
+            `reload_if_changed` method.
+        interval : float
+        """
+        self.interval = interval
+        self._robots = robots
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """ Start the thread if not started, also restart in forked
+        processes.
+        """
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run,
+                                                name="SnapshotWatcher")
+                self._thread.daemon = True
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            for robot in self._robots():
+                try:
+                    robot.reload_if_changed()
+                except Exception:
+                    log.exception("RELOAD_SNAPSHOT_ERROR")
+
+
+__all__ = ["DomainSnapshot", "SnapshotWatcher"]
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import logging
+import re
+
+from evadm.cache import LRUCache
+
+log = logging.getLogger(__name__)
+
+CN_DIGIT = "[零〇一二三四五六七八九]"
+CN_NUMBER = "[零〇一二两三四五六七八九十百千万亿]"
+DAY = r"(?:\d{1,2}|[一二三四五六七八九十]{1,3})"
+YEAR = r"(?:\d{4}|" + CN_DIGIT + "{4})"
+NUMBER = r"(?:\d+(?:\.\d+)?|" + CN_NUMBER + "+)"
+
+
+class SystemEntityEngine(object):
+    """ Extract built-in `@sys` entities, such as dates and numbers.
+
+    Patterns of all entities are compiled into one regex, so a question is
+    scanned once for all of them.  Patterns are tried in order at each
+    position, and matches don't overlap, so "2003年" is a date rather than
+    a number.  Results are cached by question.
+
+    Attributes
+    ----------
+    PATTERNS : [(entity_name, [pattern])], Built-in entities.
+    CACHE_SIZE : int, Maximum number of cached questions.
+    names : set, Names of entities.
+    cache : LRUCache, `{question: {entity_name: [value]}}`
+    """
+    PATTERNS = [
+        ("@sys.date", [
+            r"\d{4}[-/.]\d{1,2}[-/.]\d{1,2}",
+            YEAR + "年" + DAY + "月(?:" + DAY + "[日号])?",
+            DAY + "月" + DAY + "[日号]",
+            YEAR + "年",
+            r"(?<!\d)(?:19|20)\d{2}(?!\d)",
+            "(?:一九|二[零〇])" + CN_DIGIT + "{2}",
+            "大?前天|昨天|今天|明天|大?后天|前年|去年|今年|明年|后年",
+            "(?:上|下|这|本)个?(?:月|周|星期)",
+            "(?:周|星期|礼拜)[一二三四五六日天]"
+        ]),
+        ("@sys.time", [
+            r"\d{1,2}[:：]\d{2}(?:[:：]\d{2})?",
+            "(?:凌晨|早上|上午|中午|下午|晚上)?" + DAY +
+            "[点时](?:半|一刻|三刻|" + DAY + "分)?"
+        ]),
+        ("@sys.duration", [
+            NUMBER + "(?:年|个月|周|个?星期|天|个?小时|个?钟头|分钟|秒钟?)",
+            "半(?:年|个月|天|个?小时)"
+        ]),
+        ("@sys.percent", [
+            NUMBER + "[%％]",
+            "百分之" + NUMBER
+        ]),
+        ("@sys.number", [
+            r"-?\d+(?:\.\d+)?",
+            CN_NUMBER + "{2,}"
+        ])
+    ]
+    CACHE_SIZE = 4096
+
+    def __init__(self, patterns=PATTERNS, maxsize=CACHE_SIZE):
+        self.names = set()
+        self._group_names = {}
+        groups = []
+        for name, regexes in patterns:
+            self.names.add(name)
+            for regex in regexes:
+                group = "g{0}".format(len(groups))
+                self._group_names[group] = name
+                groups.append("(?P<{0}>{1})".format(group, regex))
+        self._regex = re.compile("|".join(groups))
+        self.cache = LRUCache(maxsize)
+
+    def extract(self, question):
+        """ Return all entities in question.
+
+        Parameters
+        ----------
+        question : str, Normalized question.
+
+        Returns
+        -------
+        dict, `{entity_name: [value]}`, values are ordered by position and
+        must not be modified.
+
+        """
+        entities = self.cache.get(question)
+        if entities is None:
+            entities = {}
+            group_names = self._group_names
+            for match in self._regex.finditer(question):
+                entities.setdefault(group_names[match.lastgroup],
+                                    []).append(match.group())
+            self.cache.put(question, entities)
+        return entities
+
+    def detect(self, question, entity_name):
+        """ Return the first value of entity in question, `None` if not
+        found.
+        """
+        values = self.extract(question).get(entity_name)
+        return values[0] if values else None
+
+
+system_entities = SystemEntityEngine()
+
+
+__all__ = ["SystemEntityEngine", "system_entities"]
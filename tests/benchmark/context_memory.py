@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Memory allocated per robot by `DialogEngine` and it's `Context`.
+
+    python tests/benchmark/context_memory.py [robots]
+"""
+import copy
+import sys
+import tracemalloc
+
+from evadm.context import Context
+from evadm.testing import construct_dm
+
+
+def measure(create, count):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    objects = [create() for i in range(count)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    size = sum(stat.size_diff for stat in stats)
+    blocks = sum(stat.count_diff for stat in stats)
+    assert len(objects) == count
+    return size / count, blocks / count
+
+
+def main(count):
+    dm = construct_dm()
+    tree = dm.biz_tree.tree
+
+    def dict_context():
+        # slots deep copied into a dict per robot.
+        return dict((slot.key, copy.deepcopy(slot))
+                    for slot in tree.slots.slots)
+
+    def array_context():
+        return Context(tree.slots, tree.target_dependents)
+
+    for name, create in [("dict context", dict_context),
+                         ("array context", array_context),
+                         ("dialog engine", construct_dm)]:
+        size, blocks = measure(create, count)
+        print("{0:<16}{1:>10.1f} bytes {2:>8.1f} blocks per robot".format(
+            name, size, blocks))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
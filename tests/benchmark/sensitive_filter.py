@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+`SensitiveFilter.detect` compared with substring search of every word.
+
+    python tests/benchmark/sensitive_filter.py [words] [questions]
+"""
+import random
+import sys
+import timeit
+
+from evanlu.filter import SensitiveFilter
+
+
+class WordsIO(object):
+    def __init__(self, words):
+        self._words = words
+
+    def get_sensitive_words(self):
+        return self._words
+
+
+def loop_detect(words, question):
+    for word in words:
+        if word in question:
+            return True
+    return False
+
+
+def main(n_words, n_questions):
+    random.seed(0)
+    chars = [chr(c) for c in range(0x4e00, 0x4e00 + 500)]
+    words = ["".join(random.sample(chars, random.randint(2, 4)))
+             for i in range(n_words)]
+    questions = ["".join(random.choice(chars) for i in range(15))
+                 for j in range(n_questions)]
+    sensitive = SensitiveFilter(WordsIO(words))
+    sensitive.init_words()
+    assert([sensitive.detect(q) for q in questions] ==
+           [loop_detect(words, q) for q in questions])
+
+    for name, detect in [("loop", lambda q: loop_detect(words, q)),
+                         ("automaton", sensitive.detect)]:
+        seconds = timeit.timeit(lambda: [detect(q) for q in questions],
+                                number=3) / 3
+        print("{0:<12}{1:>10.2f} us per question".format(
+            name, seconds / n_questions * 1e6))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 1000)
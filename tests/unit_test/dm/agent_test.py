@@ -2,10 +2,12 @@
 # encoding: utf-8
 import time
 
+import pytest
+
 from evadm.context import Slot
 from evadm.dm import DialogEngine, Stack
 from evadm.testing import file_io, construct_dm
-from evadm.units import Agent
+from evadm.units import Agent, BizUnit, State
 
 
 def test_stack():
@@ -37,15 +39,81 @@ def test_init_biz_from_db():
                 assert(slot.value is not None)
 
     # context testing
-    slots = list(dm.context._all_slots.values())
+    slots = list(dm.context)
     assert(str(slots[0]) == "Slot(intent=None)")
     assert(str(slots[1]) == "Slot(location=None)")
     assert(len(dm.stack) == 1)
     assert(dm.stack.top().tag == 'root')
-    for slot in dm.context._all_slots.values():
+    for slot in dm.context:
         assert(slot.value is None)
 
 
+def test_shared_biz_tree():
+    """
+    Test robots of the same domain share compiled tree and context slots,
+    units are created when touched.
+    """
+    dm0 = construct_dm()
+    dm = construct_dm()
+    assert(dm.biz_tree.tree is dm0.biz_tree.tree)
+    assert(dm.context["intent"] is dm0.context["intent"])
+    assert(list(dm.biz_tree._units.keys()) == ['root'])
+
+    dm.process_slots("sid001", [
+        Slot('intent', 'name.query')
+    ])
+    assert(set(dm.biz_tree._units.keys()) == {'root', 'name.query'})
+    assert(dm.biz_tree.get_node('name.query').state ==
+           Agent.STATUS_WAIT_ACTION_CONFIRM)
+    assert(dm0.biz_tree.get_node('name.query').state ==
+           Agent.STATUS_TREEWAIT)
+    assert(dm0.context["intent"].value is None)
+    dm.cancel_timer()
+
+
+def test_trigger_index():
+    dm = construct_dm()
+    index = dm.biz_tree.tree.trigger_index
+    assert(index.candidates(dm.context) == [])
+    dm.context.update_slot("intent", Slot("intent", "where.query"))
+    candidates = [spec.tag for spec in index.candidates(dm.context)]
+    assert(candidates == ["nike", "zhou_hei_ya"])
+
+
+def test_visibility_cache():
+    dm0 = construct_dm()
+    cache = dm0.biz_tree.tree.visibility_cache
+    cache.clear()
+    dm = construct_dm()
+    assert(cache.stats()["size"] == 1)
+    hits = cache.stats()["hits"]
+    dm.process_slots("sid001", [
+        Slot('intent', 'name.query')
+    ])
+    dm0.process_slots("sid001", [
+        Slot('intent', 'name.query')
+    ])
+    assert(cache.stats()["size"] == 2)
+    assert(cache.stats()["hits"] == hits + 1)
+    assert(dm._agenda.show_visible_agents() ==
+           dm0._agenda.show_visible_agents())
+    assert(dm._agenda.visible_agents is dm0._agenda.visible_agents)
+    context = dm.get_visible_units()
+    assert(context["version"] == dm0.get_visible_units()["version"])
+    assert(dm.get_visible_units() is context)
+    # shared by robots, so read only.
+    with pytest.raises(TypeError):
+        context["intent_map"]["name.query"] = (0, None)
+    with pytest.raises(TypeError):
+        context["agents"] = []
+    for i, (tag, intent, node_id) in enumerate(context["agents"]):
+        priority, node_id_ = context["intent_map"][intent]
+        assert(priority <= i)
+        assert(node_id_ == node_id or priority < i)
+    dm.cancel_timer()
+    dm0.cancel_timer()
+
+
 class TestAgentCase(object):
     '''
     root
@@ -115,3 +183,41 @@ class TestAgentCase(object):
             Stack:
                 root(STATUS_STACKWAIT)''')
         assert(dm.context['intent'].value is None)
+
+
+def test_topology():
+    dm = construct_dm()
+    topology = dm.biz_tree.tree.topology
+    assert(len(topology) == len(dm.biz_tree.tree.nodes))
+    root = topology.specs[0]
+    assert(root.is_root() and root.depth == 0 and root.ancestors == ())
+    for spec in topology.specs:
+        treelib_children = dm.biz_tree.tree.children(spec.identifier)
+        assert(spec.children == treelib_children)
+        for child in spec.children:
+            assert(child.parent is spec)
+            assert(child.depth == spec.depth + 1)
+            assert(child.ancestors[1:] == spec.ancestors)
+    assert([unit.tag for unit in dm.biz_tree.children('root')] ==
+           [spec.tag for spec in root.children])
+
+
+def test_state_condition():
+    dm = construct_dm()
+    unit = dm.biz_tree.get_node('name.query')
+    unit0 = construct_dm().biz_tree.get_node('name.query')
+    assert(unit.state == BizUnit.STATUS_TREEWAIT)
+    assert("{0}".format(unit.state) == "STATUS_TREEWAIT")
+    assert('"state": "STATUS_TREEWAIT"' in str(unit))
+    unit.set_state(State.WAIT_TARGET)
+    assert(not unit.transferable() and not unit.is_completed())
+    unit.add_execute_condition(State.WAIT_TARGET)
+    assert(unit.transferable())
+    unit0.set_state(State.WAIT_TARGET)
+    assert(not unit0.transferable())
+    unit.remove_execute_condition(State.WAIT_TARGET)
+    assert(not unit.transferable())
+    unit.set_state(State.ACTION_COMPLETED)
+    assert(unit.transferable() and unit.is_completed())
+    assert("name.query(STATUS_ACTION_COMPLETED)" in
+           str(dm.biz_tree.to_dict(with_data=True)))
@@ -3,6 +3,7 @@
 import copy
 from evadm.context import Slot
 from evadm.context import Context
+from evadm.testing import construct_dm
 
 
 class TestContext(object):
@@ -29,6 +30,41 @@ class TestContext(object):
         assert ctx["intent"].life_type == "forever"
         ctx.update_slot("intent", c2)
 
+    def test_completed_agents(self):
+        dm = construct_dm()
+        ctx = dm.context
+        tree = dm.biz_tree.tree
+        default = tree.get_node("default@weather.query")
+        city = tree.get_node("city")
+        assert ctx.completed_agents == {}
+        ctx.update_slot_by_value("city", "shenzhen")
+        assert list(ctx.completed_agents) == [city]
+        ctx.update_slot_by_value("city", "beijing")
+        ctx.update_slot_by_value("date", "today")
+        assert default in ctx.completed_agents
+        assert city in ctx.completed_agents
+        ctx.reset_slot("city")
+        assert default not in ctx.completed_agents
+        assert city not in ctx.completed_agents
+        ctx.update_slot("date", Slot("date"))
+        assert ctx.completed_agents == {}
+
+    def test_snapshot(self):
+        dm = construct_dm()
+        ctx = dm.context
+        ctx.update_slot_by_value("city", "shenzhen")
+        ctx.update_slot_by_value("date", "today")
+        values = ctx.snapshot()
+        ctx.reset_slot("city")
+        ctx.update_slot_by_value("intent", "weather.query")
+
+        ctx = construct_dm().context
+        ctx.restore(values)
+        assert ctx.snapshot() == values
+        assert ctx["city"].value == "shenzhen"
+        assert not ctx.dirty("intent")
+        assert len(ctx.completed_agents) == 3
+
 
 if __name__ == '__main__':
     tc = TestContext()
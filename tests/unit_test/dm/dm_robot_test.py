@@ -1,10 +1,14 @@
 import logging
 import os
+import time
 
-from evashare.log import init_logger
-from evadm import util as dm_util
-dm_util.PROJECT_DIR = os.path.join(dm_util.PROJECT_DIR, "tests")
+import pytest
 
+from evashare.log import init_logger
+from evadm import io as dm_io
+from evadm.context import Slot
+from evadm.pool import RobotPool, RobotStateStore
+from evadm.ring import HashRing
 from evadm.robot import DMRobot
 from evadm.config import ConfigLog
 
@@ -13,6 +17,14 @@ log = logging.getLogger(__name__)
 
 
 TEST_PROJECT = "project_cn_test"
+TESTS_DIR = os.path.realpath(os.path.join(os.path.dirname(__file__), "..",
+                                          ".."))
+
+
+@pytest.fixture(autouse=True)
+def project_dir(monkeypatch):
+    # read by DMFileIO when created, whatever other modules imported.
+    monkeypatch.setattr(dm_io, "PROJECT_DIR", TESTS_DIR)
 
 
 def test_robot():
@@ -25,3 +37,154 @@ def test_robot():
     robot0 = DMRobot.get_robot(TEST_PROJECT, TEST_PROJECT, TEST_PROJECT)
     assert id(robot0) == id(robot)
 
+
+
+def test_robot_eviction(tmp_path):
+    pool, store = DMRobot.robots_pool, DMRobot.state_store
+    DMRobot.robots_pool = RobotPool(1, 3600.0,
+                                    evictable=lambda robot: robot.evictable)
+    DMRobot.state_store = RobotStateStore(str(tmp_path))
+    try:
+        robot = DMRobot.get_robot("robot0", TEST_PROJECT, TEST_PROJECT)
+        robot._process_slots([Slot("intent", "weather.query")], "sid001")
+        robot.process_confirm("sid001", {"code": 0})
+        robot.process_slots({"city": "北京"}, "sid002")
+        robot.process_confirm("sid002", {"code": 0})
+        state = robot.dump_state()
+        context = robot.get_context()
+
+        # evict robot0
+        robot1 = DMRobot.get_robot("robot1", TEST_PROJECT, TEST_PROJECT)
+        assert("robot0" not in DMRobot.robots_pool)
+        assert(DMRobot.robots_pool.stats()["evictions"] == 1)
+        assert(robot1.dump_state()["dm"]["slots"] == {})
+
+        restored = DMRobot.get_robot("robot0", TEST_PROJECT, TEST_PROJECT)
+        assert(restored is not robot)
+        assert(restored.dump_state() == state)
+        assert(restored.get_context() == context)
+        stats = DMRobot.stats()
+        assert(stats["restores"] == 1 and stats["evictions"] == 2)
+
+        # idle robots are evicted
+        assert(DMRobot.robots_pool.evict(time.time() + 3601) ==
+               [("robot0", restored)])
+    finally:
+        DMRobot.robots_pool, DMRobot.state_store = pool, store
+
+
+def test_robot_sweep(tmp_path):
+    pool, store = DMRobot.robots_pool, DMRobot.state_store
+    interval, pid = DMRobot.SWEEP_INTERVAL, DMRobot._sweep_pid
+    DMRobot.robots_pool = RobotPool(10, 0.0,
+                                    evictable=lambda robot: robot.evictable)
+    DMRobot.state_store = RobotStateStore(str(tmp_path))
+    try:
+        # pinned robots are kept until unpinned
+        robot = DMRobot.get_robot("robot0", TEST_PROJECT, TEST_PROJECT,
+                                  pin=True)
+        assert(DMRobot.get_robot("robot0", TEST_PROJECT, TEST_PROJECT,
+                                 pin=True) is robot)
+        time.sleep(0.01)
+        DMRobot.sweep()
+        assert("robot0" in DMRobot.robots_pool)
+        robot.unpin()
+        time.sleep(0.01)
+        DMRobot.sweep()
+        assert("robot0" in DMRobot.robots_pool)
+        robot.unpin()
+        time.sleep(0.01)
+        DMRobot.sweep()
+        assert("robot0" not in DMRobot.robots_pool)
+        assert(DMRobot.state_store.pop("robot0") is not None)
+
+        # idle robots are swept periodically
+        DMRobot.SWEEP_INTERVAL, DMRobot._sweep_pid = 0.05, None
+        DMRobot.get_robot("robot1", TEST_PROJECT, TEST_PROJECT)
+        DMRobot.SWEEP_INTERVAL = interval
+        for _ in range(50):
+            if "robot1" not in DMRobot.robots_pool:
+                break
+            time.sleep(0.02)
+        assert("robot1" not in DMRobot.robots_pool)
+    finally:
+        DMRobot.robots_pool, DMRobot.state_store = pool, store
+        DMRobot.SWEEP_INTERVAL, DMRobot._sweep_pid = interval, pid
+
+
+def test_robot_migration(tmp_path):
+    pool, store = DMRobot.robots_pool, DMRobot.state_store
+    DMRobot.robots_pool = RobotPool(10, 3600.0,
+                                    evictable=lambda robot: robot.evictable)
+    DMRobot.state_store = RobotStateStore(str(tmp_path))
+    try:
+        ring = HashRing(["worker-0", "worker-1"])
+        robots = ["robot{0}".format(i) for i in range(6)]
+        for robotid in robots:
+            robot = DMRobot.get_robot(robotid, TEST_PROJECT, TEST_PROJECT)
+            robot.process_slots({"intent": "weather.query"}, "sid001")
+            robot.process_confirm("sid001", {"code": 0})
+        states = DMRobot.release_robots(
+            lambda robotid: ring.node(robotid) == "worker-0")
+        moved = [c for c in robots if ring.node(c) != "worker-0"]
+        assert(sorted(states.keys()) == moved)
+        assert(len(DMRobot.robots_pool) == len(robots) - len(moved))
+
+        for robotid, state in states.items():
+            DMRobot.adopt_robot(robotid, state)
+        for robotid in robots:
+            assert(robotid in DMRobot.robots_pool)
+        assert(DMRobot.robots_pool.get(moved[0]).dump_state() ==
+               states[moved[0]])
+    finally:
+        DMRobot.robots_pool, DMRobot.state_store = pool, store
+
+
+def test_robot_release_waiting(tmp_path):
+    pool, store = DMRobot.robots_pool, DMRobot.state_store
+    DMRobot.robots_pool = RobotPool(10, 3600.0,
+                                    evictable=lambda robot: robot.evictable)
+    DMRobot.state_store = RobotStateStore(str(tmp_path))
+    try:
+        robots = ["robot{0}".format(i) for i in range(4)]
+        for robotid in robots:
+            robot = DMRobot.get_robot(robotid, TEST_PROJECT, TEST_PROJECT)
+            robot.process_slots({"intent": "weather.query"}, "sid001")
+            if robotid != "robot2":
+                robot.process_confirm("sid001", {"code": 0})
+        # robot2 is waiting for the confirm timer.
+        waiting = DMRobot.robots_pool.get("robot2")
+        assert(not waiting.evictable)
+        states = DMRobot.release_robots(lambda robotid: robotid == "robot0")
+        assert(sorted(states.keys()) == ["robot1", "robot3"])
+        assert(sorted(c for c, _ in DMRobot.robots_pool.items()) ==
+               ["robot0", "robot2"])
+
+        # saved by sweep when it's not waiting any more.
+        DMRobot.sweep()
+        assert("robot2" in DMRobot.robots_pool)
+        waiting.process_confirm("sid001", {"code": 0})
+        state = waiting.dump_state()
+        DMRobot.sweep()
+        assert("robot2" not in DMRobot.robots_pool)
+        assert(DMRobot.state_store.pop("robot2") == state)
+        assert(not DMRobot._released)
+    finally:
+        DMRobot.robots_pool, DMRobot.state_store = pool, store
+        DMRobot._released.clear()
+
+
+def test_hash_ring():
+    ring = HashRing(["worker-0", "worker-1", "worker-2"])
+    keys = ["robot{0}".format(i) for i in range(3000)]
+    nodes = dict((key, ring.node(key)) for key in keys)
+    counts = [list(nodes.values()).count(c) for c in ring.nodes]
+    assert(min(counts) > 600)
+
+    ring.add("worker-3")
+    moved = [key for key in keys if ring.node(key) != nodes[key]]
+    assert(all([ring.node(key) == "worker-3" for key in moved]))
+    assert(500 < len(moved) < 1000)
+    ring.remove("worker-3")
+    assert(all([ring.node(key) == nodes[key] for key in keys]))
+    assert(HashRing().node("robot0") is None)
@@ -1,4 +1,12 @@
 import os
+import json
+
+import pytest
+
+from evadm.bundle import DomainBundle
+from evadm.context import Slot
+from evadm.dm import DialogEngine
+from evadm.errors import DomainError
 from evadm.io import DMFileIO
 from evadm.util import PROJECT_DIR
 from evadm.testing import file_io
@@ -27,3 +35,90 @@ def test_get_tree_label_data():
         PROJECT_DIR, "tests", "data", "projects", "project_cn_test")
     rst = file_io.get_tree_label_data()
 
+
+
+def _write_agent(path, trigger_slot, identifier="name.query"):
+    with open(path, "w") as file_obj:
+        json.dump({
+            "data": {
+                "id": identifier,
+                "tag": identifier,
+                "entrance": True,
+                "response_id": identifier,
+                "trigger_slots": [trigger_slot],
+                "target_slots": [],
+                "timeout": "5",
+                "type": "TYPE_SIMPLE"
+            },
+            "children": []
+        }, file_obj)
+
+
+def test_domain_bundle(tmp_path):
+    os.makedirs(str(tmp_path / "project" / "dm"))
+    agent_path = str(tmp_path / "project" / "dm" / "name_query.json")
+    _write_agent(agent_path, "intent=name.query")
+    _write_agent(str(tmp_path / "casual_talk.json"), "intent=casual_talk")
+
+    def construct_io():
+        io = DMFileIO("bundle_test")
+        io._project_path = str(tmp_path / "project")
+        io._casual_talk_path = str(tmp_path / "casual_talk.json")
+        io.bundle_dir = str(tmp_path / "bundle")
+        return io
+
+    bundle = construct_io().compile_domain()
+    assert(DomainBundle.load(construct_io().bundle_path).digest ==
+           bundle.digest)
+    io = construct_io()
+    tree = io.get_dict_tree(["name_query"])
+    assert(tree["children"][0]["data"]["trigger_slots"] ==
+           ["intent=name.query"])
+    assert(io.get_casual_talk()["data"]["id"] == "name.query")
+    assert(io.load_bundle() is io.load_bundle())
+
+    # shared by instances, sources are checked once every CHECK_INTERVAL.
+    _write_agent(agent_path, "intent=who.query")
+    assert(construct_io().load_bundle() is io.load_bundle())
+
+    # rebuild if sources changed
+    tree = io.get_dict_tree(["name_query"], io.load_bundle(reload=True))
+    assert(tree["children"][0]["data"]["trigger_slots"] ==
+           ["intent=who.query"])
+    assert(DomainBundle.load(io.bundle_path).digest != bundle.digest)
+    assert(construct_io().load_bundle() is io.load_bundle())
+
+    _write_agent(agent_path, "intent")
+    with pytest.raises(DomainError):
+        construct_io().load_bundle(reload=True)
+
+
+def test_biz_tree_reloaded(tmp_path, monkeypatch):
+    """
+    Test robots created after DM files modified get the new tree.
+    """
+    monkeypatch.setattr(DMFileIO, "CHECK_INTERVAL", 0.0)
+    os.makedirs(str(tmp_path / "project" / "dm"))
+    agent_path = str(tmp_path / "project" / "dm" / "name_query.json")
+    _write_agent(agent_path, "intent=name.query")
+    _write_agent(str(tmp_path / "casual_talk.json"), "intent=casual_talk",
+                 "casual_talk")
+
+    def construct_dm():
+        io = DMFileIO("reload_test")
+        io._project_path = str(tmp_path / "project")
+        io._casual_talk_path = str(tmp_path / "casual_talk.json")
+        io.bundle_dir = str(tmp_path / "bundle")
+        dm = DialogEngine.get_dm(io, "0.1")
+        dm.load_data()
+        return dm
+
+    dm0 = construct_dm()
+    assert(construct_dm().biz_tree.tree is dm0.biz_tree.tree)
+    _write_agent(agent_path, "intent=who.query")
+    dm = construct_dm()
+    assert(dm.biz_tree.tree is not dm0.biz_tree.tree)
+    assert(str(dm.biz_tree.get_node("name.query").trigger_slots[0]) ==
+           str(Slot("intent", "who.query")))
+    assert(str(dm0.biz_tree.get_node("name.query").trigger_slots[0]) ==
+           str(Slot("intent", "name.query")))
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import threading
+import time
+
+import pytest
+
+from evadm.mailbox import Mailbox, serialized
+
+
+class Counter(object):
+    def __init__(self):
+        self.mailbox = Mailbox()
+        self.value = 0
+        self.events = []
+
+    @serialized
+    def add(self, event):
+        value = self.value
+        time.sleep(0.001)
+        self.value = value + 1
+        self.events.append(event)
+        return self.value
+
+    @serialized
+    def add_twice(self, event):
+        self.add(event)
+        return self.add(event)
+
+    @serialized
+    def fail(self):
+        raise ValueError("fail")
+
+
+def test_mailbox():
+    counter = Counter()
+    assert(counter.add("a") == 1)
+    # reentrant calls run directly.
+    assert(counter.add_twice("b") == 3)
+    with pytest.raises(ValueError):
+        counter.fail()
+    assert(counter.mailbox.idle)
+
+    threads = [threading.Thread(target=counter.add, args=(i,))
+               for i in range(20)]
+    for thread in threads:
+        thread.start()
+    futures = [counter.mailbox.post(counter.add, "post{0}".format(i))
+               for i in range(5)]
+    for thread in threads:
+        thread.join()
+    assert([future.result(5) for future in futures] ==
+           sorted([future.result() for future in futures]))
+    assert(counter.value == 28)
+    # posted messages are processed in order.
+    posted = [c for c in counter.events if str(c).startswith("post")]
+    assert(posted == ["post{0}".format(i) for i in range(5)])
+    for _ in range(100):
+        if counter.mailbox.idle:
+            break
+        time.sleep(0.01)
+    assert(counter.mailbox.idle)
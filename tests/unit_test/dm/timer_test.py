@@ -0,0 +1,31 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import threading
+import time
+
+from evadm.timer import TimerScheduler
+
+
+def test_timer_scheduler():
+    scheduler = TimerScheduler()
+    fired = []
+    scheduler.schedule("t2", 0.2, fired.append, "t2")
+    scheduler.schedule("t1", 0.1, fired.append, "t1")
+    timer = scheduler.schedule("t3", 0.1, fired.append, "t3")
+    timer.cancel()
+    assert(len(scheduler) == 2)
+    time.sleep(0.4)
+    assert(fired == ["t1", "t2"])
+    assert(len(scheduler) == 0)
+    timer.cancel()
+    assert(len(scheduler) == 0)
+
+
+def test_timer_scheduler_single_thread():
+    scheduler = TimerScheduler()
+    count = threading.active_count()
+    timers = [scheduler.schedule(i, 10, lambda: None) for i in range(1000)]
+    assert(threading.active_count() <= count + 1)
+    for timer in timers:
+        timer.cancel()
+    assert(len(scheduler) == 0)
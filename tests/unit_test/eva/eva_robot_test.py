@@ -8,7 +8,7 @@ from evanlu import util as nlu_util
 dm_util.PROJECT_DIR = os.path.join(dm_util.PROJECT_DIR, "tests")
 nlu_util.PROJECT_DIR = os.path.join(nlu_util.PROJECT_DIR, "tests")
 
-from eva.robot import EvaRobot
+from eva.robot import EvaRobot, process_questions
 from evadm.config import ConfigLog
 
 init_logger(level="DEBUG", path=ConfigLog.log_path)
@@ -36,3 +36,20 @@ def test_eva_robot():
         'sid': 0
     }
     assert same_dict(rst, target)
+
+
+def test_process_questions():
+    requests = [
+        {"robot_id": "batch_robot_0", "project": TEST_PROJECT,
+         "question": "帮我查一下北京今天的天气"},
+        {"robot_id": "batch_robot_1", "project": "project_not_exist",
+         "question": "帮我查一下北京今天的天气"},
+        {"robot_id": "batch_robot_0", "project": TEST_PROJECT,
+         "question": "帮我查一下北京今天的天气"}
+    ]
+    rst = process_questions(requests)
+    assert len(rst) == 3
+    assert isinstance(rst[1], Exception)
+    for ret in [rst[0], rst[2]]:
+        assert ret["intent"] == "weather.query"
+        assert ret["nlu"]["slots"] == {"city": "北京", "date": "今天"}
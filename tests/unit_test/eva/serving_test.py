@@ -0,0 +1,110 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from eva.serving import (KeyedExecutor, LatencyHistogram, Overloaded,
+                          ProcessStats, check_request, memory_usage)
+
+
+def test_latency_histogram():
+    histogram = LatencyHistogram([0.01, 0.1])
+    for seconds in [0.005, 0.005, 0.05, 1.0]:
+        histogram.observe(seconds)
+    stats = histogram.stats()
+    assert stats["count"] == 4
+    assert stats["max"] == 1.0
+    assert stats["p50"] == 0.01
+    assert stats["p99"] is None
+    assert stats["buckets"] == [[0.01, 2], [0.1, 3], ["+Inf", 4]]
+
+
+def test_process_stats():
+    stats = ProcessStats()
+    assert stats.stats()["first_request"] is None
+    stats.observe(0.5)
+    stats.observe(0.001)
+    rst = stats.stats()
+    assert rst["first_request"] == 0.5
+    assert rst["latency"]["count"] == 2
+    memory = memory_usage()
+    assert memory.get("rss", memory.get("max_rss")) > 0
+
+
+def test_check_request():
+    assert check_request({"robot_id": "r", "project": "p",
+                          "question": "q"}) is None
+    assert check_request(["r", "p", "q"]) == "request must be an object"
+    assert check_request({"project": "p", "question": "q"}) ==\
+        "missing robot_id"
+    assert check_request({"robot_id": "r", "project": "p",
+                          "question": 1}) == "invalid question"
+    assert check_request({"robot_id": "r", "project": "p"},
+                         question=False) is None
+
+
+def test_keyed_executor():
+    executor = KeyedExecutor(workers=4, max_pending=6, max_key_pending=3)
+    running = {}
+    overlapped = []
+    lock = threading.Lock()
+
+    def work(key):
+        with lock:
+            if running.get(key):
+                overlapped.append(key)
+            running[key] = True
+        time.sleep(0.02)
+        with lock:
+            running[key] = False
+        return key
+
+    async def main():
+        tasks = [executor.run(key, work, key) for key in "aabbcc"]
+        results = await asyncio.gather(*tasks)
+        assert results == list("aabbcc")
+        with pytest.raises(Overloaded):
+            await asyncio.gather(*[executor.run("a", work, "a")
+                                   for _ in range(4)])
+        await asyncio.sleep(0.1)
+
+    start = time.time()
+    asyncio.run(main())
+    assert overlapped == []
+    # keys run in parallel.
+    assert time.time() - start < 0.25
+    stats = executor.stats()
+    assert stats["rejected"] == 1
+    assert stats["pending"] == 0
+    assert stats["keys"] == 0
+    executor.shutdown()
+
+
+def test_keyed_executor_run_many():
+    executor = KeyedExecutor(workers=4)
+    running = set()
+    overlapped = []
+    lock = threading.Lock()
+
+    def work(keys):
+        with lock:
+            if running & set(keys):
+                overlapped.append(keys)
+            running.update(keys)
+        time.sleep(0.02)
+        with lock:
+            running.difference_update(keys)
+        return keys
+
+    async def main():
+        # batches sharing robots in different order, and single requests.
+        tasks = [executor.run_many(keys, work, keys) for keys in
+                 [["a", "b"], ["b", "a"], ["c", "a"], ["b", "c", "b"]]]
+        tasks += [executor.run(key, work, [key]) for key in "abc"]
+        return await asyncio.gather(*tasks)
+
+    results = asyncio.run(main())
+    assert len(results) == 7
+    assert overlapped == []
+    assert executor.stats()["keys"] == 0
@@ -0,0 +1,52 @@
+import json
+
+from tornado.testing import AsyncHTTPTestCase
+
+from eva.tornado_app import make_app
+
+
+class Backend(object):
+    def process_question(self, data):
+        return {"code": 0, "question": data["question"]}
+
+    def process_questions(self, data):
+        return [self.process_question(c) for c in data]
+
+    def train(self, data):
+        pass
+
+    def stats(self):
+        return []
+
+
+class TestTornadoApp(AsyncHTTPTestCase):
+    def get_app(self):
+        return make_app(Backend())
+
+    def post(self, path, data):
+        response = self.fetch(path, method="POST", body=json.dumps(data))
+        return response.code, json.loads(response.body)
+
+    def test_predict(self):
+        assert self.post("/nlu/predict/", {
+            "robot_id": "r", "project": "p", "question": "q"
+        }) == (200, {"code": 0, "question": "q"})
+        assert self.post("/nlu/predict/", {
+            "project": "p", "question": "q"
+        }) == (400, {"code": 400, "message": "missing robot_id"})
+        assert self.post("/nlu/train/", {"robot_id": "r"}) ==\
+            (400, {"code": 400, "message": "missing project"})
+
+    def test_predict_batch(self):
+        code, rst = self.post("/nlu/predict_batch/", [
+            {"robot_id": "r", "project": "p", "question": "1"},
+            {"robot_id": "r", "project": "p"},
+            {"robot_id": "s", "project": "p", "question": "2"}
+        ])
+        assert code == 200
+        assert rst["results"] == [
+            {"code": 0, "question": "1"},
+            {"code": 400, "message": "invalid question"},
+            {"code": 0, "question": "2"}
+        ]
+        assert self.post("/nlu/predict_batch/", {"requests": 1})[0] == 400
@@ -0,0 +1,26 @@
+#!/usr/bin/env python
+# encoding: utf-8
+from evanlu.automaton import Automaton
+
+
+def test_automaton():
+    automaton = Automaton()
+    for word in ["he", "she", "his", "hers", "北京", "北京大学"]:
+        automaton.add(word, word)
+    automaton.add("she", "SHE")
+    automaton.add("")
+    automaton.build()
+    assert(len(automaton) == 7)
+
+    hits = automaton.search("ushers")
+    assert(hits == [(1, 4, "she"), (1, 4, "SHE"), (2, 4, "he"),
+                    (2, 6, "hers")])
+    assert(automaton.search("ushers", longest=True) ==
+           [(1, 4, "she"), (1, 4, "SHE")])
+    assert(automaton.search("我在北京大学", longest=True) ==
+           [(2, 6, "北京大学")])
+    assert([c[2] for c in automaton.search("我在北京大学")] ==
+           ["北京", "北京大学"])
+    assert(automaton.contains("this"))
+    assert(not automaton.contains("北大"))
+    assert(automaton.search("") == [])
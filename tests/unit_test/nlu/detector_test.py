@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import time
+
+from evanlu.detector import Detector
+
+SCRIPT_CITY = """
+cities = []
+
+
+def setup():
+    cities.extend(["北京", "上海"])
+
+
+def detect(text):
+    for city in cities:
+        if city in text:
+            return city
+    return None
+"""
+
+SCRIPT_SLOW = """
+import time
+
+cities = None
+
+
+def detect(text):
+    if text == "error":
+        raise ValueError(text)
+    time.sleep(float(text))
+    return cities
+"""
+
+
+def test_detector():
+    city = Detector.load("@sys.city", SCRIPT_CITY)
+    assert(Detector.load("@sys.city", SCRIPT_CITY) is city)
+    assert(Detector.load("@sys.city", SCRIPT_CITY + "\n") is not city)
+    # namespaces are isolated.
+    slow = Detector("@sys.slow", SCRIPT_SLOW, budget=0.01, cooldown=60)
+    assert(city.detect("去上海") == "上海")
+    assert(city.detect("去广州") is None)
+    assert(slow.detect("0") is None)
+    assert(slow.detect("error") is None)
+    assert(slow.errors == 1)
+
+    # skipped after slow calls in a row.
+    slow.detect("0.02")
+    slow.detect("0")
+    slow.detect("0.02")
+    slow.detect("0.02")
+    assert(slow.skips == 0)
+    slow.detect("0.02")
+    start = time.time()
+    assert(slow.detect("0.02") is None)
+    assert(time.time() - start < 0.01)
+    stats = slow.stats()
+    assert(stats["calls"] == 7)
+    assert(stats["skips"] == 1)
+    assert(stats["max_time"] >= 0.02)
+    assert(city.stats()["calls"] == 2)
@@ -1,6 +1,7 @@
 import os
 from evashare.util import same_dict
-from evanlu.io import NLUFileIO, FileSearchIO
+from evanlu.io import NLUFileIO, FileSearchIO, SqliteSearchIO
+from evanlu.normalize import normalize
 from evanlu.testing import LabeledData
 from evanlu.util import PROJECT_DIR
 
@@ -97,3 +98,47 @@ def test_file_search_io():
     assert search_io._caches != {}
     l_intent_node = search_io.search("什么名字")
     assert l_intent_node == []
+
+
+def test_sqlite_search_io(tmp_path):
+    path = str(tmp_path / "test.db")
+    search_io = SqliteSearchIO(TEST_PROJECT, path)
+    assert search_io.version == 0
+    assert search_io.search("你叫什么名字") == []
+    search_io.save([
+        LabeledData("weather.query", "帮我看看去北京的航班有哪些"),
+        LabeledData("name.query", "你叫什么名字"),
+        LabeledData("name.query", "你叫什么名字")
+    ])
+    assert search_io.version == 1
+    assert search_io.search("你叫什么名字") == ["name.query"]
+    assert search_io.search("什么名字") == []
+
+    # visible to other connections, retraining replaces questions.
+    other_io = SqliteSearchIO(TEST_PROJECT, path)
+    other_io.append([LabeledData("chat.name", "你叫什么名字")])
+    assert search_io.version == 2
+    assert search_io.search("你叫什么名字") == ["name.query", "chat.name"]
+    search_io.save([LabeledData("chat.name", "什么名字")])
+    assert other_io.version == 3
+    assert other_io.search("你叫什么名字") == []
+    assert other_io.search("什么名字") == ["chat.name"]
+
+
+def test_sqlite_search_io_import(tmp_path):
+    path = str(tmp_path / "test.db")
+    with open(str(tmp_path / (TEST_PROJECT + ".txt")), "w") as f:
+        f.write("name.query@你叫什么名字\nchat.name@你叫什么名字\n"
+                "search@ＧＤＰ增长率 \n")
+    search_io = SqliteSearchIO(TEST_PROJECT, path)
+    assert search_io.version == 1
+    assert search_io.search(normalize("你叫什么名字").search_key) == [
+        "name.query", "chat.name"]
+    # imported questions are normalized as searched ones.
+    assert search_io.search(normalize("gdp增长率").search_key) == ["search"]
+
+    # imported only once, never over trained questions.
+    search_io.save([LabeledData("chat.name", "什么名字")])
+    other_io = SqliteSearchIO(TEST_PROJECT, path)
+    assert other_io.version == 2
+    assert other_io.search("你叫什么名字") == []
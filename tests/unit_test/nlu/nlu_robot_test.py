@@ -48,3 +48,21 @@ def test_robot():
          'node_id': 'node4'
     }
     assert same_dict(rst, target)
+
+
+def test_snapshot_reload():
+    robot = NLURobot.reset_robot(TEST_PROJECT)
+    version = robot.version
+    assert not robot.reload_if_changed()
+    path = robot._io.get_source_files()[0]
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+    try:
+        snapshot = robot._snapshot
+        assert robot.reload_if_changed()
+        assert robot.version == version + 1
+        assert robot._snapshot is not snapshot
+        assert robot.reloaded_at >= snapshot.loaded_at
+        assert not robot.reload_if_changed()
+    finally:
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
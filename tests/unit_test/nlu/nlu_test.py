@@ -10,8 +10,9 @@ from evashare.util import same_dict
 from evanlu.config import ConfigLog
 from evanlu.entity import EntityRecognizer
 from evanlu.filter import SensitiveFilter, NonSenseFilter
-from evanlu.intent import IntentRecognizer
+from evanlu.intent import IntentRecognizer, get_intent_map
 from evanlu.io import NLUFileIO
+from evanlu.rule import RuleClassifier
 from evashare.log import init_logger
 from evanlu.testing import LabeledData
 
@@ -29,6 +30,8 @@ def test_sensitive():
     assert set(sensitive._words) == {"共产党", "毛泽东", "法轮功"}
     assert sensitive.detect('共产党万岁')
     assert not sensitive.detect('你叫什么')
+    assert sensitive.find('共产党万岁') == [(0, 3, '共产党')]
+    assert sensitive.find('你叫什么') == []
 
 
 def test_nonsense():
@@ -37,6 +40,27 @@ def test_nonsense():
     assert(not nonsense.detect('晚安'))
 
 
+class FullWidthIO(object):
+    """ Dictionaries with full width words.  """
+    def get_sensitive_words(self):
+        return ["ＦＬＧ"]
+
+    def get_not_nonsense_words(self):
+        return ["ＯＫ"]
+
+    def get_entities_with_value(self):
+        return {"entities": {"tv": {"CCTV": ["ＣＣＴＶ"]}}, "scripts": {}}
+
+
+def test_folded_words():
+    # words are folded as normalized questions.
+    io = FullWidthIO()
+    assert SensitiveFilter.get_filter(io).find("FLG万岁") == [(0, 3, "ＦＬＧ")]
+    assert not NonSenseFilter.get_filter(io).detect("OK")
+    recognizer = EntityRecognizer.get_entity_recognizer(io)
+    assert recognizer.recognize("打开CCTV", ["tv"]) == {"tv": "CCTV"}
+
+
 def test_entity_recognizer():
     recognizer = EntityRecognizer.get_entity_recognizer(file_io)
     result = recognizer.recognize("北京在哪里", ["city"])
@@ -62,6 +86,14 @@ def test_entity_recognizer():
         "@sys.date": "今天"
     }
 
+    recognizer = EntityRecognizer.get_entity_recognizer(
+        file_io, EntityRecognizer.MATCH_LONGEST)
+    result = recognizer.recognize("帝都会下雨吗", ["city", "meteorology"])
+    assert(same_dict(result, {
+        "city": "北京",
+        "meteorology": "雨"
+    }))
+
 
 def test_intent_recognizer():
     recognizer = IntentRecognizer.get_intent_recognizer(file_io)
@@ -72,14 +104,33 @@ def test_intent_recognizer():
         LabeledData("weather.query", "帮我看看去北京的航班有哪些"),
         LabeledData("name.query", "你叫什么名字")
     ]
-    context = [
+    context = get_intent_map([
         ("name.query", "name.query", "node4"),
         ("name.query", "name.query", "node3")
-    ]
+    ])
     recognizer.train(labeled_data)
     result = recognizer.strict_classify(context, "你叫什么名字")
     assert result == ('name.query', 1, 'node4')
 
 
+def test_rule_classify():
+    recognizer = IntentRecognizer.get_intent_recognizer(file_io)
+    rules = RuleClassifier(file_io)
+    rules.init_rules(RuleClassifier.DEFAULT_RULES)
+    labels = ["search", "search_event", "correlation_analysis"]
+    # rule priority decides, whatever the order of agents.
+    for ordered in [labels, labels[::-1]]:
+        context = get_intent_map([(c, c, "node_" + c) for c in ordered])
+        assert recognizer.rule_classify(context, "伊朗局势对利率的影响",
+                                        rules) ==\
+            ("correlation_analysis", 1, "node_correlation_analysis")
+    # the first visible one.
+    context = get_intent_map([("search", "search", "node_search")])
+    assert recognizer.rule_classify(context, "伊朗局势对利率的影响", rules) ==\
+        ("search", 1, "node_search")
+    assert recognizer.rule_classify({}, "伊朗局势对利率的影响", rules) ==\
+        (None, 1, None)
+
+
 if __name__ == '__main__':
     assert(False)
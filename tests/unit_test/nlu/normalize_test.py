@@ -0,0 +1,22 @@
+#!/usr/bin/env python
+# encoding: utf-8
+from evanlu.normalize import Normalizer
+
+
+def test_normalizer():
+    normalizer = Normalizer(lambda: set(["的", "吗", "?", "了吗"]), 2)
+    normalized = normalizer.normalize("  ＧＤＰ的增长率　是多少吗? ")
+    assert(normalized.raw == "  ＧＤＰ的增长率　是多少吗? ")
+    assert(normalized.text == "GDP的增长率 是多少吗?")
+    assert(normalized.folded == "gdp的增长率 是多少吗?")
+    assert(normalized.search_key == "gdp增长率 是多少")
+    assert(normalizer.remove_stopwords("好了吗") == "好了")
+
+    # results are cached and bounded.
+    assert(normalizer.normalize("  ＧＤＰ的增长率　是多少吗? ") is normalized)
+    normalizer.normalize("a")
+    normalizer.normalize("b")
+    assert(len(normalizer.cache) == 2)
+    assert(normalizer.normalize("  ＧＤＰ的增长率　是多少吗? ") is not normalized)
+    assert(normalizer.normalize("c", cached=False).text == "c")
+    assert("c" not in normalizer.cache)
@@ -0,0 +1,34 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import pytest
+
+from evanlu.rule import RuleClassifier
+
+
+def test_rule_classifier():
+    classifier = RuleClassifier(None)
+    classifier.init_rules(RuleClassifier.DEFAULT_RULES)
+    assert(classifier.classify("伊朗局势对利率的影响") ==
+           ["correlation_analysis", "search_event", "search"])
+    assert(classifier.classify("what is the interest rate") == ["search"])
+    assert(classifier.classify("你好") == [])
+
+    classifier.init_rules([
+        {"label": "weather", "keywords": ["天气"]},
+        {"label": "flight", "priority": 2, "regex": [r"^查.*航班$"]},
+        {"label": "weather", "priority": 1, "regex": [r"下雨"]}
+    ])
+    assert(classifier.classify("查一下北京天气和航班") == ["flight", "weather"])
+    assert(classifier.classify("明天下雨吗") == ["weather"])
+    assert(classifier.stats() == [
+        {"label": "flight", "priority": 2, "hits": 1},
+        {"label": "weather", "priority": 1, "hits": 1},
+        {"label": "weather", "priority": 0, "hits": 1}
+    ])
+
+    # keywords are folded as normalized questions.
+    classifier.init_rules([{"label": "gdp", "keywords": ["ＧＤＰ"]}])
+    assert(classifier.classify("gdp增长率") == ["gdp"])
+
+    with pytest.raises(ValueError):
+        classifier.init_rules([{"label": "error", "regex": ["("]}])
@@ -0,0 +1,27 @@
+#!/usr/bin/env python
+# encoding: utf-8
+from evanlu.system_entity import SystemEntityEngine
+
+
+def test_system_entity_engine():
+    engine = SystemEntityEngine()
+    entities = engine.extract("2020-01-05到3月5日明天下午3点半过去3个月上涨5.5%")
+    assert(entities == {
+        "@sys.date": ["2020-01-05", "3月5日", "明天"],
+        "@sys.time": ["下午3点半"],
+        "@sys.duration": ["3个月"],
+        "@sys.percent": ["5.5%"]
+    })
+    assert(engine.extract("二零零三年黄金价格") == {"@sys.date": ["二零零三年"]})
+    assert(engine.extract("一百二十个人等了半小时") == {
+        "@sys.number": ["一百二十"],
+        "@sys.duration": ["半小时"]
+    })
+    assert(engine.extract("查一下") == {})
+    assert(engine.detect("2013的利率", "@sys.date") == "2013")
+    assert(engine.detect("2013的利率", "@sys.number") is None)
+    assert(engine.cache.stats()["hits"] == 1)
+
+    engine = SystemEntityEngine([("@sys.code", [r"[A-Z]{3}\d{3}"])])
+    assert(engine.names == set(["@sys.code"]))
+    assert(engine.extract("航班CAN123") == {"@sys.code": ["CAN123"]})